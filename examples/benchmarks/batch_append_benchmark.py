@@ -0,0 +1,35 @@
+# Compare appending commands one at a time with the column-wise batch append methods
+
+import abb_motion_program_exec as abb
+import numpy as np
+import time
+
+N = 100000
+
+rng = np.random.default_rng(0)
+trans = rng.uniform([300,-200,400],[500,200,600],(N,3))
+rot = np.tile([0.7071068, 0., 0.7071068, 0.], (N,1))
+robconf = np.tile([0.,-2.,1.,0.], (N,1))
+extax = np.zeros((N,6))
+timestamp = "2023-01-01-00-00-00-0000"
+
+t0 = time.perf_counter()
+mp_loop = abb.MotionProgram(timestamp=timestamp)
+for i in range(N):
+    mp_loop.MoveL(abb.robtarget(trans[i],rot[i],abb.confdata(*robconf[i]),extax[i]),abb.v200,abb.z1)
+t1 = time.perf_counter()
+b_loop = mp_loop.get_program_bytes()
+t2 = time.perf_counter()
+
+mp_batch = abb.MotionProgram(timestamp=timestamp)
+mp_batch.MoveL_batch(trans,rot,robconf,extax,abb.v200,abb.z1)
+t3 = time.perf_counter()
+b_batch = mp_batch.get_program_bytes()
+t4 = time.perf_counter()
+
+assert b_loop == b_batch, "Batch program bytes do not match per-command program bytes"
+
+print(f"{N} MoveL commands, {len(b_batch)} bytes")
+print(f"per-command: append {t1-t0:.3f} s, serialize {t2-t1:.3f} s")
+print(f"batch:       append {t3-t2:.3f} s, serialize {t4-t3:.3f} s")
+print(f"speedup:     {(t2-t0)/(t4-t2):.1f}x")
@@ -0,0 +1,46 @@
+# Compare the memory used by CommandListStorage and CompactCommandStorage for a large program, using tracemalloc
+
+import abb_motion_program_exec as abb
+import numpy as np
+import tracemalloc
+import time
+
+N = 200000
+
+rng = np.random.default_rng(0)
+trans = rng.uniform([300,-200,400],[500,200,600],(N,3))
+rot = np.tile([0.7071068, 0., 0.7071068, 0.], (N,1))
+robconf = np.tile([0.,-2.,1.,0.], (N,1))
+extax = np.zeros((N,6))
+timestamp = "2023-01-01-00-00-00-0000"
+
+def build_program(command_storage):
+    mp = abb.MotionProgram(timestamp=timestamp, command_storage=command_storage)
+    for i in range(N):
+        # Copy the rows so each command owns its arrays, the same as a program generated point by point
+        r = abb.robtarget(np.array(trans[i]),np.array(rot[i]),abb.confdata(*robconf[i].tolist()),np.array(extax[i]))
+        mp.MoveL(r,abb.v200,abb.z1)
+    return mp
+
+results = []
+for name, storage_fn in [
+        ("CommandListStorage", lambda: None),
+        ("CompactCommandStorage float64", lambda: abb.CompactCommandStorage(np.float64)),
+        ("CompactCommandStorage float32", lambda: abb.CompactCommandStorage(np.float32))
+    ]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    mp = build_program(storage_fn())
+    t1 = time.perf_counter()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t2 = time.perf_counter()
+    b = mp.get_program_bytes()
+    t3 = time.perf_counter()
+    results.append(b)
+    print(f"{name:30s}: {current/1e6:8.1f} MB current, {peak/1e6:8.1f} MB peak, "
+        f"append {t1-t0:.3f} s, serialize {t3-t2:.3f} s")
+    del mp
+
+assert all(b == results[0] for b in results), "Program bytes do not match"
+print(f"{N} MoveL commands, {len(results[0])} bytes")
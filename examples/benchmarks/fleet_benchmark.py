@@ -0,0 +1,48 @@
+# Benchmark FleetExecutor driving many mock controllers from one event loop. Each mock runs its programs in
+# real time, so with enough concurrency the total time is close to the time of one controller. The mocks share
+# the process with the executor, so the times include their simulation overhead.
+
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.mock_rws import MockRWSServer
+from abb_motion_program_exec.fleet_executor import FleetExecutor
+import asyncio
+import time
+
+N_CONTROLLERS = 14
+N_PROGRAMS = 5
+N_COMMANDS = 20
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+j2 = abb.jointtarget([15,25,35,45,55,65],[0]*6)
+
+mp = abb.MotionProgram()
+for i in range(N_COMMANDS):
+    mp.MoveAbsJ(j1 if i % 2 == 0 else j2, abb.v1000, abb.z10)
+
+servers = [MockRWSServer(time_scale=1) for _ in range(N_CONTROLLERS)]
+for s in servers:
+    s.start()
+
+async def run(max_concurrency):
+    fleet = FleetExecutor({f"cell{i}": s.base_url for i, s in enumerate(servers)}, max_concurrency=max_concurrency)
+    t0 = time.perf_counter()
+    results = await fleet.run_all({name: [mp]*N_PROGRAMS for name in fleet.clients})
+    t = time.perf_counter() - t0
+    failed = sum(m.failed for m in fleet.metrics.values())
+    requests = sum(m.rws_requests for m in fleet.metrics.values())
+    print(f"max_concurrency={max_concurrency:<3} {t:6.2f} s total, {N_CONTROLLERS*N_PROGRAMS} programs, "
+        f"{failed} failed, {requests} RWS requests")
+
+# One controller alone for reference
+async def run_single():
+    fleet = FleetExecutor({"cell0": servers[0].base_url})
+    t0 = time.perf_counter()
+    await fleet.run_all({"cell0": [mp]*N_PROGRAMS})
+    print(f"single controller     {time.perf_counter() - t0:6.2f} s total")
+
+asyncio.run(run_single())
+for max_concurrency in (1, 4, N_CONTROLLERS):
+    asyncio.run(run(max_concurrency))
+
+for s in servers:
+    s.close()
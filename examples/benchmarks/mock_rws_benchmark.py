@@ -0,0 +1,122 @@
+# Benchmark the motion program clients end to end against the in-process mock controller. The mock runs
+# programs as fast as possible (time_scale=0) and the moves are short, so the times are dominated by client and
+# RWS overhead.
+
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.mock_rws import MockRWSServer
+from abb_motion_program_exec.abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from abb_motion_program_exec.driver_client_aio import MotionProgramDriverClientAIO
+import asyncio
+import time
+
+N_PROGRAMS = 20
+N_COMMANDS = 1000
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+j2 = abb.jointtarget([11,21,31,41,51,61],[0]*6)
+
+def make_program(n, first_cmd_num=1, j_b=j2):
+    mp = abb.MotionProgram(first_cmd_num=first_cmd_num)
+    for i in range(n):
+        mp.MoveAbsJ(j1 if i % 2 == 0 else j_b, abb.v1000, abb.z10)
+    return mp
+
+mp = make_program(N_COMMANDS)
+
+def report(name, t):
+    print(f"{name:<24} {t/N_PROGRAMS*1000:8.1f} ms/program")
+
+with MockRWSServer(time_scale=0) as server:
+    call_timings = []
+    client = abb.MotionProgramExecClient(base_url=server.base_url, timing_callback=call_timings.append)
+    t0 = time.perf_counter()
+    for _ in range(N_PROGRAMS):
+        client.execute_motion_program(mp)
+    report("sync", time.perf_counter() - t0)
+    for phase in call_timings[0].phases:
+        print(f"  {phase:<22} {sum(t.phases[phase] for t in call_timings)/len(call_timings)*1000:8.1f} ms")
+    print(f"  {'rws requests':<22} {call_timings[0].rws_requests:8d}")
+
+    async def run_aio():
+        client_aio = MotionProgramExecClientAIO(base_url=server.base_url)
+        t0 = time.perf_counter()
+        for _ in range(N_PROGRAMS):
+            await client_aio.execute_motion_program(mp)
+        report("aio", time.perf_counter() - t0)
+    asyncio.run(run_aio())
+
+    t0 = time.perf_counter()
+    with abb.MotionProgramJobQueue(client) as q:
+        futures = [q.submit(mp) for _ in range(N_PROGRAMS)]
+        for f in futures:
+            f.result()
+    report("job queue", time.perf_counter() - t0)
+
+# Preemption requires the program to still be running, so run long moves in real time
+j3 = abb.jointtarget([-10,15,35,10,95,-95],[0]*6)
+with MockRWSServer(time_scale=1) as server:
+    client = abb.MotionProgramExecClient(base_url=server.base_url)
+    mp_p1 = make_program(10, first_cmd_num=6)
+    seqnum = client.execute_motion_program(make_program(20, j_b=j3), wait=False)
+    client.preempt_motion_program(mp_p1, preempt_number=1, preempt_cmdnum=5)
+    client.wait_motion_program_complete()
+    log_results = client.read_motion_program_result_log(seqnum)
+    print(f"preempt: preempt number {client.get_current_preempt_number():.0f}, "
+        f"{log_results.data.shape[0]} log rows")
+
+    # Let the scheduler choose the crossover for a series of preemptions
+    scheduler = abb.PreemptScheduler(client)
+    scheduler.start(make_program(40, j_b=j3))
+    time.sleep(0.25)
+    for _ in range(3):
+        res = scheduler.preempt(make_program(40, j_b=j3))
+        print(f"  scheduled preempt {res.preempt_number}: queued {res.queued_cmdnum}, crossover "
+            f"{res.preempt_cmdnum}, latency {res.latency*1000:.1f} ms")
+        scheduler.wait_preempt()
+    scheduler.wait_complete()
+
+    # Stream a long program in windows, chained by preempting at the end of each window
+    streamer = abb.StreamingExecutor(client, window_size=50)
+    t0 = time.perf_counter()
+    log_results = streamer.execute(make_program(400))
+    print(f"streaming: {streamer.window_count} windows, {log_results.data.shape[0]} log rows, "
+        f"{time.perf_counter() - t0:.2f} s")
+
+with MockRWSServer(time_scale=0, multimove=True) as server:
+    client = abb.MotionProgramExecClient(base_url=server.base_url)
+    t0 = time.perf_counter()
+    for _ in range(N_PROGRAMS):
+        client.execute_multimove_motion_program([mp, mp])
+    report("multimove", time.perf_counter() - t0)
+
+# Driver mode keeps RAPID running between programs, started with the seqno signals
+with MockRWSServer(time_scale=0, driver_mode=True) as server:
+    driver = abb.MotionProgramDriverClient(base_url=server.base_url)
+    driver.start_driver()
+    t0 = time.perf_counter()
+    for _ in range(N_PROGRAMS):
+        driver.execute_motion_program(mp)
+    report("driver", time.perf_counter() - t0)
+
+    # Submit the next program before reading the result of the previous program
+    t0 = time.perf_counter()
+    seqno = driver.submit_motion_program(mp)
+    for _ in range(N_PROGRAMS - 1):
+        next_seqno = driver.submit_motion_program(mp)
+        driver.read_motion_program_result_log(seqno)
+        seqno = next_seqno
+    driver.read_motion_program_result_log(seqno)
+    report("driver pipelined", time.perf_counter() - t0)
+    timings = list(driver.timings)[-N_PROGRAMS:]
+    for field in ("upload", "queue", "start_latency", "execution", "result_log"):
+        print(f"  {field:<22} {sum(getattr(t, field) for t in timings)/len(timings)*1000:8.1f} ms")
+
+    async def run_driver_aio():
+        driver_aio = MotionProgramDriverClientAIO(base_url=server.base_url)
+        await driver_aio.start_driver()
+        t0 = time.perf_counter()
+        for _ in range(N_PROGRAMS):
+            await driver_aio.execute_motion_program(mp)
+        report("driver aio", time.perf_counter() - t0)
+    asyncio.run(run_driver_aio())
+    driver.stop_driver()
@@ -0,0 +1,46 @@
+# Measure the time to add runs to a MotionProgramRunStore and to query a day of runs by program hash
+
+import abb_motion_program_exec as abb
+import numpy as np
+import tempfile
+import time
+
+N_RUNS = 20000
+N_PROGRAMS = 10
+N_SAMPLES = 250
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+j2 = abb.jointtarget([-10,15,35,10,95,-95],[0]*6)
+
+programs = []
+for i in range(N_PROGRAMS):
+    mp = abb.MotionProgram()
+    for j in range(10 + i):
+        mp.MoveAbsJ(j1 if j % 2 == 0 else j2, abb.v1000, abb.z10)
+    programs.append(mp)
+
+headers = ["timestamp","cmdnum","J1","J2","J3","J4","J5","J6"]
+data = np.zeros((N_SAMPLES,len(headers)), dtype=np.float32)
+data[:,0] = np.arange(N_SAMPLES)*0.004
+log = abb.MotionProgramResultLog("2023-01-01-00-00-00-0000", headers, data)
+
+with tempfile.TemporaryDirectory() as d:
+    store = abb.MotionProgramRunStore(d)
+    t0_run = time.time() - 86400
+    t0 = time.perf_counter()
+    for i in range(N_RUNS):
+        store.add_run(log, programs[i % N_PROGRAMS], seqno=i, run_time=t0_run + i*86400/N_RUNS)
+    t1 = time.perf_counter()
+    print(f"add_run: {(t1-t0)/N_RUNS*1e6:.1f} us/run")
+
+    program_hash = store.get_program_hash(programs[3])
+    t0 = time.perf_counter()
+    runs = store.find_runs(program_hash=program_hash, start_time=t0_run + 43200)
+    t1 = time.perf_counter()
+    logs = store.load_logs(runs)
+    durations = np.array([l.time[-1] - l.time[0] for l in logs])
+    t2 = time.perf_counter()
+    print(f"find_runs: {len(runs)} of {len(store)} runs in {(t1-t0)*1e3:.1f} ms, "
+        f"load_logs and read durations: {(t2-t1)*1e3:.1f} ms")
+    assert len(runs) == N_RUNS // N_PROGRAMS // 2
+    del logs
@@ -1 +1,10 @@
-from .abb_motion_program_exec_client import *
\ No newline at end of file
+from .abb_motion_program_exec_client import *
+from .job_queue import MotionProgramJobQueue
+from .driver_client import MotionProgramDriverClient, DriverProgramTiming
+from .preempt_scheduler import PreemptScheduler, PreemptResult
+from .streaming_executor import StreamingExecutor
+from .run_store import MotionProgramRunStore, MotionProgramRunRecord
+from .log_segments import MotionProgramLogSegments
+from .log_resample import resample_motion_program_result_log, resample_motion_program_result_logs, \
+    get_motion_program_log_jitter, MotionProgramLogJitter, MOTION_PROGRAM_LOG_PERIOD
+from .log_tail import MotionProgramLogTail
\ No newline at end of file
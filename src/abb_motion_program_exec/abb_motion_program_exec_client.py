@@ -15,40 +15,327 @@
 
 
 import re
-from typing import Callable, NamedTuple, Any, List, Union, TYPE_CHECKING
+from typing import Callable, Dict, Iterator, NamedTuple, Any, List, Union, TYPE_CHECKING
 import struct
 import numpy as np
 import io
 import time
 import datetime
-from abb_robot_client.rws import RWS
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from abb_robot_client.rws import RWS, RAPIDExecutionState, SubscriptionResourceRequest, SubscriptionResourceType, \
+    SubscriptionResourcePriority, SubscriptionException, SubscriptionClosed
 from .commands.rapid_types import *
 from .commands import util
 from .commands import commands
 from .commands.command_base import command_append_method
 from .commands import egm_commands
+from .commands import batch_commands
+from .commands.command_storage import CommandListStorage, CompactCommandStorage
+from .commands import program_reader
+from .upload_cache import MotionProgramUploadCache
+from . import upload_cache as _upload_cache
+from .event_log import EventLogCursor, MOTION_PROGRAM_EVENT_CODE, index_entries_by_code
+from .call_timing import MotionProgramCallTiming, _timed_call, _timing_phase, _install_rws_hook
+from .rws_session import _get_rws_session
 from .commands.egm_commands import EGMStreamConfig, EGMJointTargetConfig, EGMPoseTargetConfig, EGMPathCorrectionConfig, \
     egm_minmax, egmframetype
 
+if TYPE_CHECKING:
+    from .log_segments import MotionProgramLogSegments
+
 MOTION_PROGRAM_FILE_VERSION = 10011
 
 class MotionProgramResultLog(NamedTuple):
+    """
+    Result log of a motion program. ``data`` is a float32 2D array with one row per sample, and is a view of the
+    downloaded file or of a memory mapped file loaded with ``load_motion_program_result_log()``. The named column
+    properties are views of ``data`` and do not copy the samples.
+    """
     timestamp: str
     column_headers: List[str]
     data: np.array
 
-def _unpack_motion_program_result_log(b: bytes):
-    f = io.BytesIO(b)
+    @property
+    def time(self) -> np.array:
+        """The time of each sample in seconds"""
+        return self.data[:,0]
+
+    @property
+    def cmd_num(self) -> np.array:
+        """The command number executing at each sample"""
+        return self.data[:,1]
+
+    @property
+    def joints(self) -> np.array:
+        """The joint positions of all robots in degrees, one column per joint"""
+        return self.data[:,2:]
+
+    @property
+    def robots(self) -> List[np.array]:
+        """The joint positions in degrees of each robot. MultiMove logs have one entry per robot"""
+        starts = [i for i, h in enumerate(self.column_headers) if h == "J1" or h.startswith("J1_")]
+        ends = starts[1:] + [len(self.column_headers)]
+        return [self.data[:,a:b] for a, b in zip(starts, ends)]
+
+    @property
+    def segments(self) -> "MotionProgramLogSegments":
+        """
+        The rows, duration, and entry and exit joint positions of each command. Built the first time it is used
+        and cached for the lifetime of ``data``
+        """
+        from .log_segments import _get_log_segments
+        return _get_log_segments(self)
+
+    def column(self, name: str) -> np.array:
+        """
+        Get a column by header name
+
+        :param name: The column header, for example ``J3`` or ``J3_2``
+        :return: The column
+        """
+        try:
+            i = self.column_headers.index(name)
+        except ValueError:
+            raise Exception(f"Unknown result log column {name}") from None
+        return self.data[:,i]
+
+    def save(self, filename: str):
+        """
+        Save the result log in the controller file format, so it can be loaded with
+        ``load_motion_program_result_log()``
+
+        :param filename: The local filename
+        """
+        header_str = ",".join(self.column_headers)
+        with open(filename, "wb") as f:
+            f.write(util.num_to_bin(MOTION_PROGRAM_FILE_VERSION))
+            f.write(util.num_to_bin(len(self.timestamp)) + self.timestamp.encode("ascii"))
+            f.write(util.num_to_bin(len(header_str)) + header_str.encode("ascii"))
+            f.write(np.ascontiguousarray(self.data, dtype="<f4").tobytes())
+
+class PreemptCandidates(NamedTuple):
+    """
+    Candidate preempt programs uploaded by ``prefetch_preempt_motion_programs()``. Each candidate is uploaded with
+    its own preempt number, so the controller opens the file of the candidate that is committed.
+    """
+    task: str
+    """The task the candidates were uploaded for"""
+    preempt_numbers: List[int]
+    """The preempt number of each candidate"""
+    filenames: List[str]
+    """The filename of each candidate on the controller"""
+
+class MotionProgramStatus(NamedTuple):
+    """
+    Values of the motion program signals, read together by ``get_motion_program_status()``. Signals that are
+    not configured on the controller are None.
+    """
+    executing: bool
+    """True if the RAPID task is executing"""
+    current_cmd_num: int
+    """The currently executing ``cmdnum``"""
+    queued_cmd_num: int
+    """The currently queued ``cmdnum``"""
+    current_preempt_number: int
+    """The current preempt number"""
+    preempt_number: int
+    """The requested preempt number"""
+    preempt_cmd_num: int
+    """The requested preempt command number"""
+    seqno: int
+    """The seqno of the running motion program"""
+    motion_logging_enabled: bool
+    """True if motion logging is enabled"""
+    error: bool
+    """True if the RAPID task is in an error state"""
+    driver_seqno_command: int
+    """The seqno of the last program commanded in driver mode"""
+    driver_seqno_started: int
+    """The seqno of the last program started in driver mode"""
+    driver_seqno_complete: int
+    """The seqno of the last program completed in driver mode"""
+
+# Signal name of each MotionProgramStatus field
+_MOTION_PROGRAM_STATUS_SIGNALS = {
+    "executing": "motion_program_executing",
+    "current_cmd_num": "motion_program_current_cmd_num",
+    "queued_cmd_num": "motion_program_queued_cmd_num",
+    "current_preempt_number": "motion_program_preempt_current",
+    "preempt_number": "motion_program_preempt",
+    "preempt_cmd_num": "motion_program_preempt_cmd_num",
+    "seqno": "motion_program_seqno",
+    "motion_logging_enabled": "motion_program_log_motion",
+    "error": "motion_program_error",
+    "driver_seqno_command": "motion_program_seqno_command",
+    "driver_seqno_started": "motion_program_seqno_started",
+    "driver_seqno_complete": "motion_program_seqno_complete"
+}
+
+_MOTION_PROGRAM_STATUS_BOOL_FIELDS = ("executing", "motion_logging_enabled", "error")
+
+# Search for the signals with a single request, instead of reading each signal
+_MOTION_PROGRAM_STATUS_SEARCH_URL = "rw/iosystem/signals?action=signal-search-ex&json=1"
+_MOTION_PROGRAM_STATUS_SEARCH_PAYLOAD = {"vie": 1, "name": "motion_program_"}
+
+# Fields read one at a time when the controller rejects the search. The other fields are None.
+_MOTION_PROGRAM_PROGRESS_FIELDS = ("executing", "current_cmd_num", "queued_cmd_num", "current_preempt_number")
+
+# Time in seconds before the search is tried again after the controller rejected it
+_SIGNAL_SEARCH_RETRY_PERIOD = 60.0
+
+def _motion_program_status_from_values(values: Dict[str,float]) -> MotionProgramStatus:
+    # values maps signal names to values. Missing signals are None.
+    fields = dict()
+    for field, signal in _MOTION_PROGRAM_STATUS_SIGNALS.items():
+        v = values.get(signal, None)
+        if v is not None:
+            v = v > 0 if field in _MOTION_PROGRAM_STATUS_BOOL_FIELDS else int(v)
+        fields[field] = v
+    return MotionProgramStatus(**fields)
+
+def _parse_signal_search(res_json) -> Dict[str,float]:
+    # Returns None if the response does not have the expected shape
+    values = dict()
+    try:
+        for s in res_json["_embedded"]["_state"]:
+            name = s["name"].rsplit("/",1)[-1]
+            values[name] = float(s["lvalue"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    if _MOTION_PROGRAM_STATUS_SIGNALS["current_cmd_num"] not in values:
+        return None
+    return values
+
+class MotionProgramProgressEvent(NamedTuple):
+    """
+    Progress event yielded by ``motion_program_progress()``. ``event_type`` is one of:
+
+    * ``started``: Monitoring started. Always the first event
+    * ``cmd_num``: The current or queued command number changed
+    * ``preempt``: The controller switched to a preempt program
+    * ``log_opened``: The result log file was opened. ``log_filename`` is set
+    * ``log_closed``: The result log file was closed
+    * ``completed``: The program completed. ``result_log`` is set. Always the last event if the program succeeds
+    * ``failed``: The program failed. ``error`` is set. Always the last event if the program fails
+    """
+    event_type: str
+    """The type of the event"""
+    status: MotionProgramStatus
+    """The motion program signals at the time of the event"""
+    log_filename: str = None
+    """The result log filename for ``log_opened`` events"""
+    result_log: MotionProgramResultLog = None
+    """The result log for ``completed`` events"""
+    error: Exception = None
+    """The error for ``failed`` events"""
+
+_RESULT_LOG_FILENAME_RE = re.compile(r"(log\-[\d\-]+\.bin)")
+
+def _find_result_log_filename(msg: str) -> str:
+    # Find the result log filename in the argument of a log file opened message. Returns None if not found.
+    m = _RESULT_LOG_FILENAME_RE.search(msg)
+    return m.group(1) if m else None
+
+def _get_progress_events(status: MotionProgramStatus, prev_status: MotionProgramStatus, entries_by_code) \
+    -> List[MotionProgramProgressEvent]:
+    # Compare the status to the previous poll, and find the log file messages in the new event log entries
+    events = []
+    for e in reversed(entries_by_code.get(MOTION_PROGRAM_EVENT_CODE, [])):
+        if len(e.args) < 1:
+            continue
+        if e.args[0].lower() == "motion program log file opened":
+            events.append(MotionProgramProgressEvent("log_opened", status,
+                log_filename = _find_result_log_filename(e.args[1]) if len(e.args) > 1 else None))
+        elif e.args[0].lower() == "motion program log file closed":
+            events.append(MotionProgramProgressEvent("log_closed", status))
+    if status.current_preempt_number != prev_status.current_preempt_number:
+        events.append(MotionProgramProgressEvent("preempt", status))
+    if status.current_cmd_num != prev_status.current_cmd_num or status.queued_cmd_num != prev_status.queued_cmd_num:
+        events.append(MotionProgramProgressEvent("cmd_num", status))
+    return events
+
+def _unpack_motion_program_result_log_header(f: io.IOBase):
     file_ver = util.read_num(f)
     if not file_ver == MOTION_PROGRAM_FILE_VERSION:
         raise Exception(f"Invalid file version {file_ver}")
     timestamp_str = util.read_str(f)
     header_str = util.read_str(f)
-    headers = header_str.split(",")
-    data_flat = np.frombuffer(b[f.tell():], dtype=np.float32)
-    data = data_flat.reshape((-1,len(headers)))
+    return timestamp_str, header_str.split(",")
+
+def _unpack_motion_program_result_log(b: bytes):
+    f = io.BytesIO(b)
+    timestamp_str, headers = _unpack_motion_program_result_log_header(f)
+    # View the samples in place instead of slicing the buffer. Only complete rows are used, in case the file was
+    # read while the logger was still writing it.
+    offset = f.tell()
+    rows = (len(b) - offset) // (4*len(headers))
+    data = np.frombuffer(b, dtype="<f4", count=rows*len(headers), offset=offset).reshape((rows,len(headers)))
+    return MotionProgramResultLog(timestamp_str, headers, data)
+
+def load_motion_program_result_log(filename: str, mmap: bool = True) -> MotionProgramResultLog:
+    """
+    Load a result log saved to a local file, for example with ``MotionProgramResultLog.save()`` or downloaded from
+    the controller RAMDISK.
+
+    :param filename: The local filename
+    :param mmap: Memory map the file instead of reading it. Samples are only read from disk when they are accessed,
+                 so large logs can be used without loading them into memory
+    :return: The result log
+    """
+    with open(filename, "rb") as f:
+        timestamp_str, headers = _unpack_motion_program_result_log_header(f)
+        offset = f.tell()
+        if not mmap:
+            f.seek(0)
+            return _unpack_motion_program_result_log(f.read())
+        rows = (f.seek(0, io.SEEK_END) - offset) // (4*len(headers))
+    if rows == 0:
+        data = np.zeros((0,len(headers)), dtype="<f4")
+    else:
+        data = np.memmap(filename, dtype="<f4", mode="r", offset=offset, shape=(rows,len(headers)))
     return MotionProgramResultLog(timestamp_str, headers, data)
 
+def _get_result_log_filename(log_after, entries_by_code = None) -> str:
+    # Check the event log entries of a motion program for errors, and find the filename of the result log.
+    # entries_by_code is the index of log_after from index_entries_by_code(), built if not passed.
+    if entries_by_code is None:
+        entries_by_code = index_entries_by_code(log_after)
+    failed = False
+    for l in log_after:
+        if l.msgtype >= 2:
+            if len(l.args) > 0 and l.args[0].lower() == "motion program failed":
+                raise Exception(l.args[1] + " " + l.args[2] + " " + l.args[3] + " " + l.args[4])
+        if l.msgtype >= 3:
+            failed = True
+
+    if failed:
+        raise Exception("Motion Program Failed, see robot error log for details")
+
+    found_log_open = False
+    found_log_close = False
+    log_filename = ""
+
+    for l in reversed(entries_by_code.get(MOTION_PROGRAM_EVENT_CODE, [])):
+        if l.args[0].lower() == "motion program log file closed":
+            if found_log_open:
+                if found_log_close:
+                    raise Exception("Found more than one log closed message")
+                found_log_close = True
+            
+        if l.args[0].lower() == "motion program log file opened":
+            if found_log_open:
+                raise Exception("Found more than one log opened message")
+            found_log_open = True
+            log_filename = _find_result_log_filename(l.args[1])
+            if log_filename is None:
+                raise Exception("Invalid log opened message")
+
+    if not (found_log_open and found_log_close and len(log_filename) > 0):
+        raise Exception("Could not find log file messages in robot event log")
+    return log_filename
+
 def _get_motion_program_file(path: str, motion_program: "MotionProgram", task="T_ROB1", preempt_number=None, seqno = None):
     b = motion_program.get_program_bytes(seqno)
     if not len(b) > 0:
@@ -65,6 +352,55 @@ def _get_motion_program_file(path: str, motion_program: "MotionProgram", task="T
     filename = f"{filename}.bin"
     return filename, b
 
+def _adaptive_poll_delays(start = 0.005, factor = 1.5, max_delay = 0.05):
+    # Poll quickly at first so short programs complete with low latency, then back off to the default 50 ms period
+    delay = start
+    while True:
+        yield delay
+        delay = min(delay * factor, max_delay)
+
+def _run_parallel(fns: List[Callable[[],None]], max_workers: int):
+    # Run the functions using a thread pool and wait for all of them to finish. The timing context of the calling
+    # thread is copied so RWS requests made by the workers are counted in the current call.
+    if len(fns) <= 1 or max_workers <= 1:
+        for fn in fns:
+            fn()
+        return
+    with ThreadPoolExecutor(max_workers=min(len(fns), max_workers)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, fn) for fn in fns]
+    for f in futures:
+        f.result()
+
+def _group_by_digest(filenames: List[str], b: List[bytes]):
+    # Files with the same contents are uploaded in sequence so the upload cache can copy the first upload
+    groups = dict()
+    for filename, b1 in zip(filenames, b):
+        groups.setdefault(MotionProgramUploadCache.get_digest(b1), []).append((filename, b1))
+    return groups
+
+# Time to wait for an execution state event before checking the execution state again, in case an event was missed
+_SUBSCRIPTION_CHECK_PERIOD = 0.5
+
+class _ExecutionStateSubscription:
+    def __init__(self, abb_client: RWS):
+        self.changed = threading.Event()
+        self.failed = False
+        self._sub = abb_client.subscribe([SubscriptionResourceRequest(SubscriptionResourceType.ExecutionState,
+            SubscriptionResourcePriority.Medium)], self._handler)
+
+    def _handler(self, evt):
+        if isinstance(evt, RAPIDExecutionState):
+            self.changed.set()
+        elif isinstance(evt, (SubscriptionException, SubscriptionClosed)):
+            self.failed = True
+            self.changed.set()
+
+    def close(self):
+        try:
+            self._sub.close()
+        except Exception:
+            pass
+
 tool0 = tooldata(True,pose([0,0,0],[1,0,0,0]),loaddata(0.001,[0,0,0.001],[1,0,0,0],0,0,0))
 wobj0 = wobjdata(False, True, "", pose([0,0,0],[1,0,0,0]), pose([0,0,0],[1,0,0,0]))
 load0 = loaddata(0.001,[0,0,0.001],[1,0,0,0],0,0,0)
@@ -78,6 +414,9 @@ class MotionProgram:
     Motion commands are appended to the program by calling one of the motion program command functions. Currently 
     supported commands are ``MoveAbsJ``, ``MoveJ``, ``MoveL``, ``MoveC``, ``WaitTime``, ``CirPathMode``,
     ``SyncMoveOn``, ``SyncMoveOff``, ``EGMRunJoint``, ``EGMRunPose``, ``EGMMoveL``, and ``EGMMoveC``
+
+    Large blocks of ``MoveAbsJ``, ``MoveJ``, and ``MoveL`` commands can be appended from NumPy arrays using
+    ``MoveAbsJ_batch``, ``MoveJ_batch``, and ``MoveL_batch``. Each row of the arrays is one motion command.
         
     :param first_cmd_num: The first command number for the motion program. Defaults to 1
     :param tooldata: The tooldata to use for the motion program. Defaults to tool0
@@ -87,6 +426,15 @@ class MotionProgram:
                        joint control, pose control, or path correction
     :param seqno: The sequence number of the command. Used by drivers commanding the robot
     :param gripload: The loaddata for the payload currently held by the robot
+    :param command_storage: The storage for the commands of the program. Defaults to ``CommandListStorage``.
+                            Use ``CompactCommandStorage`` to reduce the memory used by very large programs.
+                            ``CompactCommandStorage`` copies the commands when they are appended, so appended
+                            commands cannot be modified
+
+    The encoded program is cached, so calling ``get_program_bytes()`` repeatedly on a growing program only encodes
+    the new commands. Assigning an attribute of a command that has already been appended is detected
+    automatically. Call ``invalidate_program_cache()`` after modifying the arrays of an appended command in place.
+    With ``CompactCommandStorage``, assigning an attribute of an appended command raises an exception.
 
     """
 
@@ -105,11 +453,20 @@ class MotionProgram:
     EGMMoveL = command_append_method(egm_commands.EGMMoveLCommand)
     EGMMoveC = command_append_method(egm_commands.EGMMoveCCommand)
 
+    MoveAbsJ_batch = command_append_method(batch_commands.MoveAbsJBatchCommand)
+    MoveJ_batch = command_append_method(batch_commands.MoveJBatchCommand)
+    MoveL_batch = command_append_method(batch_commands.MoveLBatchCommand)
+
     def __init__(self,first_cmd_num: int=1, tool: tooldata = None, wobj: wobjdata = None, timestamp: str = None, 
         egm_config: Union[EGMStreamConfig,EGMJointTargetConfig,EGMPoseTargetConfig,EGMPathCorrectionConfig] = None, 
-        seqno: int = 0, gripload: loaddata = None):
+        seqno: int = 0, gripload: loaddata = None, command_storage = None):
 
-        self._commands = []
+        if command_storage is None:
+            command_storage = CommandListStorage()
+        if len(command_storage) != 0:
+            raise Exception("command_storage must be empty")
+        self._commands = command_storage
+        self._header_cache = None
 
         if timestamp is None:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f")[:-2]
@@ -133,17 +490,94 @@ class MotionProgram:
         self._egm_config = egm_config
         self._seqno = seqno
 
-    def _append_command(self, cmd):
-        self._commands.append(cmd)
+    @classmethod
+    def from_bytes(cls, b: bytes, use_batch: bool = False, command_storage = None) -> "MotionProgram":
+        """
+        Read a binary motion program created by ``get_program_bytes()`` or ``write_program()``.
 
-    def write_program(self, f: io.IOBase, seqno = None):
+        :param b: The binary motion program
+        :param use_batch: Read runs of ``MoveAbsJ``, ``MoveJ``, and ``MoveL`` commands as batch commands, the same
+                          as ``MoveAbsJ_batch``, ``MoveJ_batch``, and ``MoveL_batch``. Faster for large programs
+        :param command_storage: The storage for the commands of the program. Defaults to ``CommandListStorage``
+        :return: The motion program
         """
-        Write binary motion program to binary file. The robot controller program will interpret the binary
-        file to execute the motion program.
+        f = io.BytesIO(b)
+        ver = int(util.read_num(f))
+        if ver != MOTION_PROGRAM_FILE_VERSION:
+            raise Exception(f"Invalid motion program file version {ver}, expected {MOTION_PROGRAM_FILE_VERSION}")
+        tool = program_reader.read_tooldata(f)
+        wobj = program_reader.read_wobjdata(f)
+        gripload = program_reader.read_loaddata(f)
+        timestamp = program_reader.read_program_str(f)
+        seqno = int(util.read_num(f))
+        egm_config = egm_commands.read_egm_config(f)
+        offset = f.tell()
+
+        if isinstance(command_storage, CompactCommandStorage):
+            # Batches are copied into the compact storage without creating command objects
+            use_batch = True
+        first_cmd_num, cmds, cmd_offsets = program_reader.read_commands(b, offset, use_batch)
+        mp = cls(first_cmd_num=first_cmd_num, tool=tool, wobj=wobj, timestamp=timestamp, egm_config=egm_config,
+            seqno=seqno, gripload=gripload, command_storage=command_storage)
+        # The commands are stored exactly as read, so the program does not need to be encoded again
+        mp._commands.load_encoded(cmds, memoryview(b)[offset:], cmd_offsets, first_cmd_num)
+        return mp
+
+    @classmethod
+    def read_program(cls, f: io.IOBase, use_batch: bool = False, command_storage = None) -> "MotionProgram":
+        """
+        Read a binary motion program from a file created by ``write_program()``
 
-        :param f: The target file to write program
-        :param seqno: The seqno of the program. Used by drivers, can be ignored for normal use
+        :param f: The binary file to read
+        :param use_batch: Read runs of ``MoveAbsJ``, ``MoveJ``, and ``MoveL`` commands as batch commands
+        :param command_storage: The storage for the commands of the program. Defaults to ``CommandListStorage``
+        :return: The motion program
         """
+        return cls.from_bytes(f.read(), use_batch, command_storage)
+
+    def get_seqno(self) -> int:
+        """Get the seqno of the motion program"""
+        return self._seqno
+
+    def _append_command(self, cmd, track_modified=True):
+        self._commands.append(cmd, track_modified)
+
+    def _iter_commands(self):
+        cmd_num = self._first_cmd_num
+        for cmd in self._commands:
+            if isinstance(cmd, batch_commands.BatchCommandBase):
+                for i in range(len(cmd)):
+                    yield cmd_num, cmd.get_command(i)
+                    cmd_num += 1
+            else:
+                yield cmd_num, cmd
+                cmd_num += 1
+
+    @property
+    def first_cmd_num(self) -> int:
+        """The command number of the first command in the program"""
+        return self._first_cmd_num
+
+    @first_cmd_num.setter
+    def first_cmd_num(self, first_cmd_num: int):
+        self._first_cmd_num = first_cmd_num
+
+    def invalidate_program_cache(self):
+        """
+        Discard the cached encoded program. Must be called if a command that has already been appended is
+        modified in place, for instance by writing to one of its NumPy arrays.
+        """
+        self._commands.invalidate()
+        self._header_cache = None
+
+    def _get_header_parts(self):
+        # The header before and after seqno is cached, and encoded again if the tool, wobj, gripload,
+        # or egm_config objects are replaced
+        key = (self.tool, self.wobj, self.gripload, self._timestamp, self._egm_config)
+        c = self._header_cache
+        if c is not None and all(a is b for a,b in zip(c[0], key)):
+            return c[1], c[2]
+        f = io.BytesIO()
         # Version number
         f.write(util.num_to_bin(MOTION_PROGRAM_FILE_VERSION))
         
@@ -151,20 +585,46 @@ class MotionProgram:
         f.write(util.wobjdata_to_bin(self.wobj))
         f.write(util.loaddata_to_bin(self.gripload))
         f.write(util.str_to_bin(self._timestamp))
-        if seqno is not None:
-            f.write(util.num_to_bin(seqno))
-        else:
-            f.write(util.num_to_bin(self._seqno))
+        header_pre = f.getvalue()
 
+        f = io.BytesIO()
         egm_commands.write_egm_config(f,self._egm_config)
+        header_post = f.getvalue()
+        self._header_cache = (key, header_pre, header_post)
+        return header_pre, header_post
+
+    def _get_header_bytes(self, seqno = None):
+        header_pre, header_post = self._get_header_parts()
+        if seqno is None:
+            seqno = self._seqno
+        return header_pre + util.num_to_bin(seqno) + header_post
+
+    def get_program_buffer(self, seqno = None) -> memoryview:
+        """
+        Return binary motion program as a memoryview. The encoded commands are cached, and only commands
+        appended or modified since the previous call are encoded. The returned buffer is a copy, and is not
+        modified by later changes to the program.
 
-        for i in range(len(self._commands)):
-            cmd = self._commands[i]
-            cmd_num = i + self._first_cmd_num
-            f.write(util.num_to_bin(cmd_num))
-            f.write(util.num_to_bin(cmd.command_opcode))
+        :param seqno: The seqno of the program. Used by drivers, can be ignored for normal use
+        """
+        header_b = self._get_header_bytes(seqno)
+        commands_b = self._commands.get_commands_bytes(self._first_cmd_num)
+        
+        buf = bytearray(len(header_b) + len(commands_b))
+        offset = len(header_b)
+        buf[0:offset] = header_b
+        buf[offset:] = commands_b
+        return memoryview(buf)
+
+    def write_program(self, f: io.IOBase, seqno = None):
+        """
+        Write binary motion program to binary file. The robot controller program will interpret the binary
+        file to execute the motion program.
 
-            cmd.write_params(f)    
+        :param f: The target file to write program
+        :param seqno: The seqno of the program. Used by drivers, can be ignored for normal use
+        """
+        f.write(self.get_program_buffer(seqno))
 
     def get_program_bytes(self, seqno = None) -> bytes:
         """
@@ -172,9 +632,7 @@ class MotionProgram:
 
         :param seqno: The seqno of the program. Used by drivers, can be ignored for normal use
         """
-        f = io.BytesIO()
-        self.write_program(f, seqno)
-        return f.getvalue()
+        return bytes(self.get_program_buffer(seqno))
 
     def write_program_rapid(self, f: io.TextIOBase, module_name="motion_program_exec_gen", sync_move=False):
         """
@@ -203,9 +661,7 @@ class MotionProgram:
 
         print(f"    PROC main()", file=f)
 
-        for i in range(len(self._commands)):
-            cmd = self._commands[i]
-            cmd_num = i + self._first_cmd_num
+        for cmd_num, cmd in self._iter_commands():
 
             print(f"        ! cmd_num = {cmd_num}",file=f)
 
@@ -240,13 +696,34 @@ class MotionProgramExecClient:
                      of the robot controller. The WAN port ethernet must be used, not the maintenance port.
     :param username: The HTTP username for the robot. Defaults to 'Default User'
     :param password: The HTTP password for the robot. Defaults to 'robotics'    
+    :param upload_cache: Optional cache of motion program files on the controller. Skips uploading programs that
+                         are already on the controller RAMDISK
+    :param use_subscription_wait: If True, ``wait_motion_program_complete()`` waits for execution state events
+                                  using an RWS subscription instead of polling every 50 ms
+    :param timing_callback: Optional function called with a :class:`MotionProgramCallTiming` record after each
+                            execute, preempt, wait, or result log call
+    :param max_upload_threads: Maximum number of files uploaded at the same time by MultiMove execute and preempt
     """
-    def __init__(self, base_url='http://127.0.0.1:80', username='Default User', password='robotics', abb_client = None):
+    def __init__(self, base_url='http://127.0.0.1:80', username='Default User', password='robotics', abb_client = None,
+        upload_cache: MotionProgramUploadCache = None, use_subscription_wait: bool = False,
+        timing_callback: Callable[[MotionProgramCallTiming],None] = None, max_upload_threads: int = 4):
         if abb_client is None:
             self.abb_client: RWS = RWS(base_url, username, password)
         else:
             self.abb_client: RWS = abb_client
-
+        _install_rws_hook(self.abb_client)
+        self.timing_callback = timing_callback
+        self.last_timing: MotionProgramCallTiming = None
+        """Timing record of the last execute, preempt, wait, or result log call"""
+        self.upload_cache = upload_cache
+        self.use_subscription_wait = use_subscription_wait
+        self.max_upload_threads = max_upload_threads
+        self._exec_state_sub = None
+        self._exec_state_sub_unavailable = False
+        self._signal_search_retry_time = None
+        self._event_log_cursor = EventLogCursor(self.abb_client)
+
+    @_timed_call
     def execute_motion_program(self, motion_program: MotionProgram, task: str="T_ROB1", 
         wait : bool = True, seqno: int = None) -> Union[MotionProgramResultLog,int]:
         """
@@ -269,16 +746,22 @@ class MotionProgramExecClient:
         :param wait: If True, wait for the program to complete. Else, return once the program has been started.
         :param seqno: Optional motion program seqno override
         """
-        filename, b = _get_motion_program_file(self.abb_client.get_ramdisk_path(), motion_program, task, seqno = seqno)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
+        with _timing_phase("serialize"):
+            filename, b = _get_motion_program_file(ramdisk, motion_program, task, seqno = seqno)
         def _upload():            
-            self.abb_client.upload_file(filename, b)
+            with _timing_phase("upload"):
+                self._upload_motion_program_files([filename], [b])
 
         prev_seqnum = self._download_and_start_motion_program([task], _upload)
         if not wait:
             return prev_seqnum
-        self.wait_motion_program_complete()
+        with _timing_phase("wait"):
+            self.wait_motion_program_complete()
         return self.read_motion_program_result_log(prev_seqnum)
 
+    @_timed_call
     def preempt_motion_program(self, motion_program: MotionProgram, task: str="T_ROB1", preempt_number: int = 1, 
         preempt_cmdnum : int = -1, seqno: int = None):
         """
@@ -298,10 +781,87 @@ class MotionProgramExecClient:
         :param seqno: Optional override of the motion program seqno
         """
 
-        filename, b = _get_motion_program_file(self.abb_client.get_ramdisk_path(), motion_program, task, preempt_number, seqno = seqno)
-        self.abb_client.upload_file(filename, b)
-        self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
-        self.abb_client.set_analog_io("motion_program_preempt", preempt_number)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
+        with _timing_phase("serialize"):
+            filename, b = _get_motion_program_file(ramdisk, motion_program, task, preempt_number, seqno = seqno)
+        with _timing_phase("upload"):
+            self.abb_client.upload_file(filename, b)
+        with _timing_phase("set_preempt"):
+            self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            self.abb_client.set_analog_io("motion_program_preempt", preempt_number)
+
+    @_timed_call
+    def prefetch_preempt_motion_programs(self, motion_programs: List[MotionProgram], task: str="T_ROB1",
+        preempt_number: int = 1, seqno: int = None) -> PreemptCandidates:
+        """
+        Upload several candidate preempt programs before it is known which one will be used. The candidates are
+        uploaded concurrently and numbered ``preempt_number``, ``preempt_number + 1``, and so on. Committing a
+        candidate with :meth:`commit_preempt_motion_program()` only sets the preempt signals, so the upload is
+        not on the critical path of the decision.
+
+        The candidates must all use the same ``first_cmd_num``, one greater than the ``preempt_cmdnum`` that will
+        be used to commit. Later preemptions must use a preempt number greater than all of the candidates.
+
+        :param motion_programs: The candidate motion programs
+        :param task: The task to preempt
+        :param preempt_number: The preempt number of the first candidate
+        :param seqno: Optional override of the motion program seqno
+        :return: The uploaded candidates
+        """
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
+        preempt_numbers = list(range(preempt_number, preempt_number + len(motion_programs)))
+        filenames = []
+        b = []
+        with _timing_phase("serialize"):
+            for mp, n in zip(motion_programs, preempt_numbers):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, n, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
+        with _timing_phase("upload"):
+            _run_parallel([lambda f=f, b1=b1: self.abb_client.upload_file(f, b1) for f, b1 in zip(filenames, b)],
+                self.max_upload_threads)
+        return PreemptCandidates(task, preempt_numbers, filenames)
+
+    @_timed_call
+    def commit_preempt_motion_program(self, candidates: PreemptCandidates, index: int, preempt_cmdnum: int,
+        delete_unused: bool = True):
+        """
+        Preempt the running motion program with a candidate uploaded by 
+        :meth:`prefetch_preempt_motion_programs()`. Only the two preempt signals are written before the
+        controller can switch to the candidate. The unused candidates are deleted afterwards.
+
+        :param candidates: The uploaded candidates
+        :param index: The index of the candidate to use
+        :param preempt_cmdnum: The command number to switch to the candidate. Must be greater than the currently
+                               queued command number.
+        :param delete_unused: Delete the files of the other candidates from the controller
+        """
+        with _timing_phase("set_preempt"):
+            self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            self.abb_client.set_analog_io("motion_program_preempt", candidates.preempt_numbers[index])
+        if delete_unused:
+            with _timing_phase("delete"):
+                self._delete_files([f for i, f in enumerate(candidates.filenames) if i != index])
+
+    @_timed_call
+    def discard_preempt_motion_programs(self, candidates: PreemptCandidates):
+        """
+        Delete the files of candidates uploaded by :meth:`prefetch_preempt_motion_programs()` that will not be
+        committed.
+
+        :param candidates: The uploaded candidates
+        """
+        with _timing_phase("delete"):
+            self._delete_files(candidates.filenames)
+
+    def _delete_files(self, filenames: List[str]):
+        for filename in filenames:
+            try:
+                self.abb_client.delete_file(filename)
+            except Exception:
+                pass
 
     def get_current_cmdnum(self) -> int:
         """Get the currently executing ``cmdnum``"""
@@ -317,8 +877,52 @@ class MotionProgramExecClient:
     def get_current_preempt_number(self) -> int:
         """Get the current preempt_number"""
         return self.abb_client.get_analog_io("motion_program_preempt_current") 
+
+    def get_motion_program_status(self) -> MotionProgramStatus:
+        """
+        Read all of the motion program signals in a single request. Use this method instead of calling
+        ``get_current_cmdnum()``, ``get_queued_cmdnum()``, ``get_current_preempt_number()``, and
+        ``get_motion_logging_enabled()`` separately to monitor progress.
+
+        If the controller rejects the signal search, only the ``executing``, ``current_cmd_num``,
+        ``queued_cmd_num``, and ``current_preempt_number`` signals are read one at a time, and the other fields are
+        None. The search is tried again after one minute.
+
+        :return: The values of the signals
+        """
+        if self._signal_search_retry_time is None or time.monotonic() >= self._signal_search_retry_time:
+            values = self._search_motion_program_signals()
+            if values is not None:
+                self._signal_search_retry_time = None
+                return _motion_program_status_from_values(values)
+            self._signal_search_retry_time = time.monotonic() + _SIGNAL_SEARCH_RETRY_PERIOD
+        values = dict()
+        for field in _MOTION_PROGRAM_PROGRESS_FIELDS:
+            signal = _MOTION_PROGRAM_STATUS_SIGNALS[field]
+            try:
+                values[signal] = self.abb_client.get_analog_io(signal)
+            except Exception:
+                pass
+        return _motion_program_status_from_values(values)
+
+    def _search_motion_program_signals(self) -> Dict[str,float]:
+        # Returns None if the controller rejects the search, or if the RWS client does not provide the session used
+        # for the request. Other errors, such as a lost connection, are raised.
+        session = _get_rws_session(self.abb_client)
+        if session is None:
+            return None
+        url = "/".join([self.abb_client.base_url, _MOTION_PROGRAM_STATUS_SEARCH_URL])
+        res = session.post(url, data=_MOTION_PROGRAM_STATUS_SEARCH_PAYLOAD, auth=self.abb_client.auth)
+        try:
+            if 400 <= res.status_code < 500:
+                return None
+            res_json = self.abb_client._process_response(res)
+        finally:
+            res.close()
+        return _parse_signal_search(res_json)
         
 
+    @_timed_call
     def execute_multimove_motion_program(self, motion_programs: List[MotionProgram], tasks: List[str]=None, 
         wait : bool = True, seqno: int = None):
         """
@@ -344,27 +948,31 @@ class MotionProgramExecClient:
 
         b = []
         filenames = []
-        ramdisk = self.abb_client.get_ramdisk_path()
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
 
-        for mp, task in zip(motion_programs, tasks):
-            filename1, b1 = _get_motion_program_file(ramdisk, mp, task, seqno = seqno)
-            filenames.append(filename1)
-            b.append(b1)
+        with _timing_phase("serialize"):
+            for mp, task in zip(motion_programs, tasks):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
 
         if not len(b) > 0:
             raise Exception("Motion program must not be empty")
         if not len(filenames) == len(b):
             raise Exception("Filename list and binary list must have same length")
         def _upload():
-            for i in range(len(filenames)):
-                self.abb_client.upload_file(filenames[i], b[i])
+            with _timing_phase("upload"):
+                self._upload_motion_program_files(filenames, b)
 
         prev_seqnum = self._download_and_start_motion_program(tasks, _upload)
         if not wait:
             return prev_seqnum
-        self.wait_motion_program_complete()
+        with _timing_phase("wait"):
+            self.wait_motion_program_complete()
         return self.read_motion_program_result_log(prev_seqnum)
 
+    @_timed_call
     def preempt_multimove_motion_program(self, motion_programs: List[MotionProgram], tasks: List[str]=None, 
         preempt_number: int = 1, preempt_cmdnum : int = -1, seqno: int = None):
         """
@@ -390,52 +998,211 @@ class MotionProgramExecClient:
 
         b = []
         filenames = []
-        ramdisk = self.abb_client.get_ramdisk_path()
-
-        for mp, task in zip(motion_programs, tasks):
-            filename1, b1 = _get_motion_program_file(ramdisk, mp, task, preempt_number, seqno = seqno)
-            filenames.append(filename1)
-            b.append(b1)
-
-        for filename, b in zip(filenames, b):        
-            self.abb_client.upload_file(filename, b)
-        self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
-        self.abb_client.set_analog_io("motion_program_preempt", preempt_number)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
+
+        with _timing_phase("serialize"):
+            for mp, task in zip(motion_programs, tasks):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, preempt_number, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
+
+        # The preempt signals must only be set once all of the files are on the controller
+        with _timing_phase("upload"):
+            _run_parallel([lambda f=f, b1=b1: self.abb_client.upload_file(f, b1) for f, b1 in zip(filenames, b)],
+                self.max_upload_threads)
+        with _timing_phase("set_preempt"):
+            self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            self.abb_client.set_analog_io("motion_program_preempt", preempt_number)
     
-    def _download_and_start_motion_program(self, tasks, upload_fn: Callable[[],None]):
+    def _upload_motion_program_files(self, filenames: List[str], b: List[bytes]):
+        cache = self.upload_cache
+        if cache is None:
+            _run_parallel([lambda f=f, b1=b1: self.abb_client.upload_file(f, b1) for f, b1 in zip(filenames, b)],
+                self.max_upload_threads)
+            return
+
+        ramdisk = filenames[0].rsplit("/",1)[0]
+        ramdisk_files = _upload_cache.parse_file_listing(self.abb_client._do_get(f"fileservice/{ramdisk}"))
+        cache_lock = threading.Lock()
+        def _upload_group(digest, files):
+            for filename, b1 in files:
+                self._upload_motion_program_file_cached(cache, cache_lock, filename, b1, digest, ramdisk, 
+                    ramdisk_files)
+        _run_parallel([lambda d=d, g=g: _upload_group(d, g) for d, g in _group_by_digest(filenames, b).items()],
+            self.max_upload_threads)
+
+    def _upload_motion_program_file_cached(self, cache: MotionProgramUploadCache, cache_lock: threading.Lock, 
+        filename: str, b1: bytes, digest: str, ramdisk: str, ramdisk_files):
+        with cache_lock:
+            if cache.is_target_current(filename, digest, len(b1), ramdisk_files):
+                cache.hits += 1
+                return
+            cache.forget_target(filename)
+            copy_filename = cache.get_program_copy(digest, ramdisk_files)
+        if copy_filename is not None:
+            try:
+                self.abb_client._do_post(*_upload_cache.copy_file_url_and_payload(copy_filename, filename))
+                with cache_lock:
+                    cache.set_target(filename, digest, len(b1))
+                    cache.copies += 1
+                return
+            except Exception:
+                with cache_lock:
+                    cache.discard_program_copy(digest)
+        self.abb_client.upload_file(filename, b1)
+        with cache_lock:
+            cache.set_target(filename, digest, len(b1))
+            cache.misses += 1
+            copy_filename, evicted = cache.add_program_copy(digest, len(b1), ramdisk)
+        if copy_filename is not None:
+            try:
+                self.abb_client._do_post(*_upload_cache.copy_file_url_and_payload(filename, copy_filename))
+            except Exception:
+                # Controller does not support copying files, only skip uploads of unchanged programs
+                with cache_lock:
+                    cache.discard_program_copy(digest)
+                    cache.server_copy = False
+        for evicted_filename in evicted:
+            try:
+                self.abb_client.delete_file(evicted_filename)
+            except Exception:
+                pass
+
+    def _download_and_start_motion_program(self, tasks, upload_fn: Callable[[],None], prev_seqnum: int = None):
+        # prev_seqnum is the event log position after the previous program, used by MotionProgramJobQueue to
+        # skip reading the event log before each job
         
-        exec_state = self.abb_client.get_execution_state()
-        if not exec_state.ctrlexecstate == "stopped":
-            raise Exception("Controller must be stopped to execute motion program")
-        #assert exec_state.cycle == "once"
-        ctrl_state = self.abb_client.get_controller_state()
-        if not ctrl_state == "motoron":
-            raise Exception("Controller must be motoron to execute motion program")
-
-        log_before = self.abb_client.read_event_log()
-        prev_seqnum = log_before[0].seqnum
-
-        self.abb_client.resetpp()
+        with _timing_phase("check_state"):
+            exec_state = self.abb_client.get_execution_state()
+            if not exec_state.ctrlexecstate == "stopped":
+                raise Exception("Controller must be stopped to execute motion program")
+            #assert exec_state.cycle == "once"
+            ctrl_state = self.abb_client.get_controller_state()
+            if not ctrl_state == "motoron":
+                raise Exception("Controller must be motoron to execute motion program")
+
+        if prev_seqnum is None:
+            with _timing_phase("event_log_reset"):
+                prev_seqnum = self._event_log_cursor.reset()
+
+        with _timing_phase("resetpp"):
+            self.abb_client.resetpp()
         upload_fn()
 
-        self.abb_client.start(cycle='once',tasks=tasks)
+        with _timing_phase("start"):
+            self.abb_client.start(cycle='once',tasks=tasks)
 
         return prev_seqnum
 
+    def execute_motion_program_progress(self, motion_program: MotionProgram, task: str="T_ROB1", seqno: int = None,
+        poll_period: float = 0.1) -> Iterator[MotionProgramProgressEvent]:
+        """
+        Execute a motion program and iterate the progress events until it completes. Same as calling
+        ``execute_motion_program()`` with ``wait`` False followed by :meth:`motion_program_progress()`.
+
+        :param motion_program: The motion program to execute
+        :param task: The RAPID Task to use to execute the program. Defaults to ``T_ROB1``
+        :param seqno: Optional motion program seqno override
+        :param poll_period: Time between polls in seconds
+        :return: Iterator of the progress events
+        """
+        prev_seqnum = self.execute_motion_program(motion_program, task, wait=False, seqno=seqno)
+        yield from self.motion_program_progress(prev_seqnum, poll_period)
+
+    def motion_program_progress(self, prev_seqnum: int, poll_period: float = 0.1) \
+        -> Iterator[MotionProgramProgressEvent]:
+        """
+        Iterate the progress events of a motion program started with ``wait`` set to False, until it completes.
+        Each poll reads all of the motion program signals with one request, and the new event log entries with
+        one request. The last event is ``completed`` with the result log, or ``failed`` with the error. The
+        error is not raised.
+
+        :param prev_seqnum: The previous seqnum, returned by ``execute_motion_program()`` if ``wait`` is False.
+        :param poll_period: Time between polls in seconds
+        :return: Iterator of the progress events
+        """
+        cursor = EventLogCursor(self.abb_client)
+        cursor.seqnum = prev_seqnum
+        status = self.get_motion_program_status()
+        yield MotionProgramProgressEvent("started", status)
+        while True:
+            time.sleep(poll_period)
+            prev_status = status
+            status = self.get_motion_program_status()
+            running = status.executing or self.is_motion_program_running()
+            cursor.read_new()
+            yield from _get_progress_events(status, prev_status, cursor.entries_by_code)
+            if not running:
+                break
+        try:
+            result_log = self.read_motion_program_result_log(prev_seqnum)
+        except Exception as e:
+            yield MotionProgramProgressEvent("failed", status, error=e)
+            return
+        yield MotionProgramProgressEvent("completed", status, result_log=result_log)
+
     def is_motion_program_running(self) -> bool:
         """Returns True if motion program is running"""
         exec_state = self.abb_client.get_execution_state()
         return exec_state.ctrlexecstate == "running"
 
-    def wait_motion_program_complete(self):
-        """Wait for motion program to complete"""
-        
-        while True:
+    @_timed_call
+    def wait_motion_program_complete(self, use_subscription: bool = None):
+        """
+        Wait for motion program to complete
+
+        If ``use_subscription`` is True, the execution state is subscribed using an RWS subscription, and completion
+        is detected as soon as the controller publishes the state change. The subscription is kept open for later
+        calls. If subscriptions are not available, the execution state is polled with an adaptive period instead,
+        starting at 5 ms and increasing to 50 ms.
+
+        :param use_subscription: Use an RWS subscription to wait for completion. Defaults to the
+                                 ``use_subscription_wait`` parameter of the client
+        """
+        if use_subscription is None:
+            use_subscription = self.use_subscription_wait
+
+        if not use_subscription:
+            while True:
+                exec_state = self.abb_client.get_execution_state()
+                if exec_state.ctrlexecstate != "running":
+                    break
+                time.sleep(0.05)
+            return
+
+        sub = self._get_execution_state_subscription()
+        if sub is not None:
+            while not sub.failed:
+                sub.changed.clear()
+                exec_state = self.abb_client.get_execution_state()
+                if exec_state.ctrlexecstate != "running":
+                    return
+                sub.changed.wait(_SUBSCRIPTION_CHECK_PERIOD)
+            self._close_execution_state_subscription(unavailable=True)
+
+        for delay in _adaptive_poll_delays():
             exec_state = self.abb_client.get_execution_state()
             if exec_state.ctrlexecstate != "running":
                 break
-            time.sleep(0.05)
-
+            time.sleep(delay)
+
+    def _get_execution_state_subscription(self):
+        if self._exec_state_sub is None and not self._exec_state_sub_unavailable:
+            try:
+                self._exec_state_sub = _ExecutionStateSubscription(self.abb_client)
+            except Exception:
+                self._exec_state_sub_unavailable = True
+        return self._exec_state_sub
+
+    def _close_execution_state_subscription(self, unavailable = False):
+        if self._exec_state_sub is not None:
+            self._exec_state_sub.close()
+            self._exec_state_sub = None
+        if unavailable:
+            self._exec_state_sub_unavailable = True
+
+    @_timed_call
     def read_motion_program_result_log(self, prev_seqnum: int) -> MotionProgramResultLog:
         """
         Read a motion program result log after motion program completes. This function is called by
@@ -446,59 +1213,21 @@ class MotionProgramExecClient:
         :return: The result log
         """
 
-        log_after_raw = self.abb_client.read_event_log()
-        log_after = []
-        for l in log_after_raw:
-            if l.seqnum > prev_seqnum:
-                log_after.append(l)
-            elif prev_seqnum > 61440 and l.seqnum < 4096:
-                # Handle uint16 wraparound
-                log_after.append(l)
-            else:
-                break
-        
-        failed = False
-        for l in log_after:
-            if l.msgtype >= 2:
-                if len(l.args) > 0 and l.args[0].lower() == "motion program failed":
-                    raise Exception(l.args[1] + " " + l.args[2] + " " + l.args[3] + " " + l.args[4])
-            if l.msgtype >= 3:
-                failed = True
-
-        if failed:
-            raise Exception("Motion Program Failed, see robot error log for details")
-
-        found_log_open = False
-        found_log_close = False
-        log_filename = ""
-
-        for l in reversed(log_after):
-            if l.code == 80003:
-                if l.args[0].lower() == "motion program log file closed":
-                    if found_log_open:
-                        if found_log_close:
-                            raise Exception("Found more than one log closed message")
-                        found_log_close = True
-                
-                if l.args[0].lower() == "motion program log file opened":
-                    if found_log_open:
-                        raise Exception("Found more than one log opened message")
-                    found_log_open = True
-                    log_filename_m = re.search(r"(log\-[\d\-]+\.bin)",l.args[1])
-                    if not log_filename_m:
-                        raise Exception("Invalid log opened message")
-                    log_filename = log_filename_m.group(1)
-
-        if not (found_log_open and found_log_close and len(log_filename) > 0):
-            raise Exception("Could not find log file messages in robot event log")
-
-        ramdisk = self.abb_client.get_ramdisk_path()
-        log_contents = self.abb_client.read_file(f"{ramdisk}/{log_filename}")
-        try:
-            self.abb_client.delete_file(f"{ramdisk}/{log_filename}")
-        except:
-            pass
-        return _unpack_motion_program_result_log(log_contents)
+        with _timing_phase("event_log_read"):
+            log_after = self._event_log_cursor.read_after(prev_seqnum)
+            log_filename = _get_result_log_filename(log_after, self._event_log_cursor.entries_by_code)
+
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = self.abb_client.get_ramdisk_path()
+        with _timing_phase("log_download"):
+            log_contents = self.abb_client.read_file(f"{ramdisk}/{log_filename}")
+        with _timing_phase("log_delete"):
+            try:
+                self.abb_client.delete_file(f"{ramdisk}/{log_filename}")
+            except:
+                pass
+        with _timing_phase("log_unpack"):
+            return _unpack_motion_program_result_log(log_contents)
 
     def stop_motion_program(self):
         """Stop a motion program. Motion programs will normally stop when complete, so this is not normally necessary"""
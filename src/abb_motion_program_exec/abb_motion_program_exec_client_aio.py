@@ -13,11 +13,43 @@
 # limitations under the License.
 
 from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, _get_motion_program_file, \
-    _unpack_motion_program_result_log
-from typing import Callable, NamedTuple, Any, List, Union, TYPE_CHECKING
+    _unpack_motion_program_result_log, _adaptive_poll_delays, _SUBSCRIPTION_CHECK_PERIOD, _get_result_log_filename, \
+    _group_by_digest, PreemptCandidates, MotionProgramStatus, _motion_program_status_from_values, \
+    _parse_signal_search, _MOTION_PROGRAM_STATUS_SIGNALS, _MOTION_PROGRAM_STATUS_SEARCH_URL, \
+    _MOTION_PROGRAM_STATUS_SEARCH_PAYLOAD, _MOTION_PROGRAM_PROGRESS_FIELDS, _SIGNAL_SEARCH_RETRY_PERIOD, \
+    MotionProgramProgressEvent, _get_progress_events
+from .upload_cache import MotionProgramUploadCache
+from . import upload_cache as _upload_cache
+from .event_log import EventLogCursorAIO, index_entries_by_code
+from .call_timing import MotionProgramCallTiming, _timed_call, _timing_phase, _install_rws_aio_hook
+from .rws_session import _get_rws_aio_session
+from typing import AsyncIterator, Callable, Dict, NamedTuple, Any, List, Union, TYPE_CHECKING
 from abb_robot_client.rws_aio import RWS_AIO
+from abb_robot_client.rws import RAPIDExecutionState, SubscriptionResourceRequest, SubscriptionResourceType, \
+    SubscriptionResourcePriority
 import asyncio
-import re
+import time
+
+class _ExecutionStateSubscriptionAIO:
+    def __init__(self, abb_client_aio: RWS_AIO):
+        self.changed = asyncio.Event()
+        self.failed = False
+        self._task = asyncio.ensure_future(self._run(abb_client_aio))
+
+    async def _run(self, abb_client_aio):
+        try:
+            async for evt in abb_client_aio.subscribe([SubscriptionResourceRequest(
+                SubscriptionResourceType.ExecutionState, SubscriptionResourcePriority.Medium)]):
+                if isinstance(evt, RAPIDExecutionState):
+                    self.changed.set()
+        except Exception:
+            pass
+        finally:
+            self.failed = True
+            self.changed.set()
+
+    def close(self):
+        self._task.cancel()
 
 class MotionProgramExecClientAIO:
     """
@@ -33,15 +65,35 @@ class MotionProgramExecClientAIO:
                      of the robot controller. The WAN port ethernet must be used, not the maintenance port.
     :param username: The HTTP username for the robot. Defaults to 'Default User'
     :param password: The HTTP password for the robot. Defaults to 'robotics' 
+    :param upload_cache: Optional cache of motion program files on the controller. Skips uploading programs that
+                         are already on the controller RAMDISK
+    :param use_subscription_wait: If True, ``wait_motion_program_complete()`` waits for execution state events
+                                  using an RWS subscription instead of polling every 50 ms
+    :param timing_callback: Optional function called with a :class:`MotionProgramCallTiming` record after each
+                            execute, preempt, wait, or result log call
     """
     def __init__(self, base_url='http://127.0.0.1:80', username='Default User', password='robotics', 
-        abb_client_aio = None):
+        abb_client_aio = None, upload_cache: MotionProgramUploadCache = None, use_subscription_wait: bool = False,
+        timing_callback: Callable[[MotionProgramCallTiming],None] = None):
 
         if abb_client_aio is None:
             self.abb_client_aio = RWS_AIO(base_url, username, password)
         else:
             self.abb_client_aio = abb_client_aio
-
+        _install_rws_aio_hook(self.abb_client_aio)
+        self.timing_callback = timing_callback
+        self.last_timing: MotionProgramCallTiming = None
+        """Timing record of the last execute, preempt, wait, or result log call"""
+        self.upload_cache = upload_cache
+        self.use_subscription_wait = use_subscription_wait
+        self._exec_state_sub = None
+        self._exec_state_sub_unavailable = False
+        self._signal_search_retry_time = None
+        self._event_log_cursor = EventLogCursorAIO(self.abb_client_aio)
+        self._ramdisk_path = None
+        self._tasks = None
+
+    @_timed_call
     async def execute_motion_program(self, motion_program: MotionProgram, task: str="T_ROB1", wait : bool = True, 
         seqno: int = None) -> Union[MotionProgramResultLog,int]:
         """
@@ -64,17 +116,22 @@ class MotionProgramExecClientAIO:
         :param wait: If True, wait for the program to complete. Else, return once the program has been started.
         :param seqno: Optional motion program seqno override
         """
-        filename, b = _get_motion_program_file(await self.abb_client_aio.get_ramdisk_path(), 
-            motion_program, task, seqno = seqno)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
+        with _timing_phase("serialize"):
+            filename, b = _get_motion_program_file(ramdisk, motion_program, task, seqno = seqno)
         async def _upload():            
-            await self.abb_client_aio.upload_file(filename, b)
+            with _timing_phase("upload"):
+                await self._upload_motion_program_files([filename], [b])
 
         prev_seqnum = await self._download_and_start_motion_program([task], _upload)
         if not wait:
             return prev_seqnum
-        await self.wait_motion_program_complete()
+        with _timing_phase("wait"):
+            await self.wait_motion_program_complete()
         return await self.read_motion_program_result_log(prev_seqnum)
 
+    @_timed_call
     async def preempt_motion_program(self, motion_program: MotionProgram, task: str="T_ROB1", preempt_number: int = 1, 
         preempt_cmdnum : int = -1, seqno: int = None):
         """
@@ -93,10 +150,82 @@ class MotionProgramExecClientAIO:
                          queued command number.
         :param seqno: Optional override of the motion program seqno
         """
-        filename, b = _get_motion_program_file(await self.abb_client_aio.get_ramdisk_path(), motion_program, task, preempt_number, seqno = seqno)
-        await self.abb_client_aio.upload_file(filename, b)
-        await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
-        await self.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
+        with _timing_phase("serialize"):
+            filename, b = _get_motion_program_file(ramdisk, motion_program, task, preempt_number, seqno = seqno)
+        with _timing_phase("upload"):
+            await self.abb_client_aio.upload_file(filename, b)
+        with _timing_phase("set_preempt"):
+            await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            await self.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
+
+    @_timed_call
+    async def prefetch_preempt_motion_programs(self, motion_programs: List[MotionProgram], task: str="T_ROB1",
+        preempt_number: int = 1, seqno: int = None) -> PreemptCandidates:
+        """
+        Upload several candidate preempt programs before it is known which one will be used. See
+        :meth:`abb_motion_program_exec.MotionProgramExecClient.prefetch_preempt_motion_programs()`.
+
+        :param motion_programs: The candidate motion programs
+        :param task: The task to preempt
+        :param preempt_number: The preempt number of the first candidate
+        :param seqno: Optional override of the motion program seqno
+        :return: The uploaded candidates
+        """
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
+        preempt_numbers = list(range(preempt_number, preempt_number + len(motion_programs)))
+        filenames = []
+        b = []
+        with _timing_phase("serialize"):
+            for mp, n in zip(motion_programs, preempt_numbers):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, n, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
+        with _timing_phase("upload"):
+            await asyncio.gather(*(self.abb_client_aio.upload_file(f, b1) for f, b1 in zip(filenames, b)))
+        return PreemptCandidates(task, preempt_numbers, filenames)
+
+    @_timed_call
+    async def commit_preempt_motion_program(self, candidates: PreemptCandidates, index: int, preempt_cmdnum: int,
+        delete_unused: bool = True):
+        """
+        Preempt the running motion program with a candidate uploaded by 
+        :meth:`prefetch_preempt_motion_programs()`. Only the two preempt signals are written before the
+        controller can switch to the candidate. The unused candidates are deleted afterwards.
+
+        :param candidates: The uploaded candidates
+        :param index: The index of the candidate to use
+        :param preempt_cmdnum: The command number to switch to the candidate. Must be greater than the currently
+                               queued command number.
+        :param delete_unused: Delete the files of the other candidates from the controller
+        """
+        with _timing_phase("set_preempt"):
+            await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            await self.abb_client_aio.set_analog_io("motion_program_preempt", candidates.preempt_numbers[index])
+        if delete_unused:
+            with _timing_phase("delete"):
+                await self._delete_files([f for i, f in enumerate(candidates.filenames) if i != index])
+
+    @_timed_call
+    async def discard_preempt_motion_programs(self, candidates: PreemptCandidates):
+        """
+        Delete the files of candidates uploaded by :meth:`prefetch_preempt_motion_programs()` that will not be
+        committed.
+
+        :param candidates: The uploaded candidates
+        """
+        with _timing_phase("delete"):
+            await self._delete_files(candidates.filenames)
+
+    async def _delete_files(self, filenames: List[str]):
+        async def _delete(filename):
+            try:
+                await self.abb_client_aio.delete_file(filename)
+            except Exception:
+                pass
+        await asyncio.gather(*(_delete(f) for f in filenames))
 
     async def get_current_cmdnum(self) -> int:
         """Get the currently executing ``cmdnum``"""
@@ -112,8 +241,44 @@ class MotionProgramExecClientAIO:
     async def get_current_preempt_number(self) -> int:
         """Get the current preempt_number"""
         return await self.abb_client_aio.get_analog_io("motion_program_preempt_current") 
+
+    async def get_motion_program_status(self) -> MotionProgramStatus:
+        """
+        Read all of the motion program signals in a single request. See
+        :meth:`abb_motion_program_exec.MotionProgramExecClient.get_motion_program_status()`.
+
+        :return: The values of the signals
+        """
+        if self._signal_search_retry_time is None or time.monotonic() >= self._signal_search_retry_time:
+            values = await self._search_motion_program_signals()
+            if values is not None:
+                self._signal_search_retry_time = None
+                return _motion_program_status_from_values(values)
+            self._signal_search_retry_time = time.monotonic() + _SIGNAL_SEARCH_RETRY_PERIOD
+        signals = [_MOTION_PROGRAM_STATUS_SIGNALS[field] for field in _MOTION_PROGRAM_PROGRESS_FIELDS]
+        res = await asyncio.gather(*(self.abb_client_aio.get_analog_io(signal) for signal in signals),
+            return_exceptions=True)
+        return _motion_program_status_from_values({signal: v for signal, v in zip(signals, res)
+            if not isinstance(v, BaseException)})
+
+    async def _search_motion_program_signals(self) -> Dict[str,float]:
+        # Returns None if the controller rejects the search, or if the RWS client does not provide the session used
+        # for the request. Other errors, such as a lost connection, are raised.
+        session = _get_rws_aio_session(self.abb_client_aio)
+        if session is None:
+            return None
+        url = "/".join([self.abb_client_aio.base_url, _MOTION_PROGRAM_STATUS_SEARCH_URL])
+        res = await session.post(url, data=_MOTION_PROGRAM_STATUS_SEARCH_PAYLOAD)
+        try:
+            if 400 <= res.status_code < 500:
+                return None
+            res_json = self.abb_client_aio._process_response(res)
+        finally:
+            await res.aclose()
+        return _parse_signal_search(res_json)
         
 
+    @_timed_call
     async def execute_multimove_motion_program(self, motion_programs: List[MotionProgram], tasks: List[str]=None, 
         wait : bool = True, seqno: int = None):
 
@@ -140,27 +305,31 @@ class MotionProgramExecClientAIO:
 
         b = []
         filenames = []
-        ramdisk = await self.abb_client_aio.get_ramdisk_path()
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
 
-        for mp, task in zip(motion_programs, tasks):
-            filename1, b1 = _get_motion_program_file(ramdisk, mp, task, seqno = seqno)
-            filenames.append(filename1)
-            b.append(b1)
+        with _timing_phase("serialize"):
+            for mp, task in zip(motion_programs, tasks):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
 
         if not len(b) > 0:
             raise Exception("Motion program must not be empty")
         if not len(filenames) == len(b):
             raise Exception("Filename and motion program length mismatch")
         async def _upload():
-            for i in range(len(filenames)):
-                await self.abb_client_aio.upload_file(filenames[i], b[i])
+            with _timing_phase("upload"):
+                await self._upload_motion_program_files(filenames, b)
 
         prev_seqnum = await self._download_and_start_motion_program(tasks, _upload)
         if not wait:
             return prev_seqnum
-        await self.wait_motion_program_complete()
+        with _timing_phase("wait"):
+            await self.wait_motion_program_complete()
         return await self.read_motion_program_result_log(prev_seqnum)
 
+    @_timed_call
     async def preempt_multimove_motion_program(self, motion_programs: List[MotionProgram], tasks: List[str]=None, 
         preempt_number: int = 1, preempt_cmdnum : int = -1, seqno: int = None):
         """
@@ -187,52 +356,241 @@ class MotionProgramExecClientAIO:
 
         b = []
         filenames = []
-        ramdisk = await self.abb_client_aio.get_ramdisk_path()
-
-        for mp, task in zip(motion_programs, tasks):
-            filename1, b1 = _get_motion_program_file(ramdisk, mp, task, preempt_number, seqno = seqno)
-            filenames.append(filename1)
-            b.append(b1)
-
-        for filename, b in zip(filenames, b):        
-            await self.abb_client_aio.upload_file(filename, b)
-        await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
-        await self.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
+
+        with _timing_phase("serialize"):
+            for mp, task in zip(motion_programs, tasks):
+                filename1, b1 = _get_motion_program_file(ramdisk, mp, task, preempt_number, seqno = seqno)
+                filenames.append(filename1)
+                b.append(b1)
+
+        # The preempt signals must only be set once all of the files are on the controller
+        with _timing_phase("upload"):
+            await asyncio.gather(*(self.abb_client_aio.upload_file(f, b1) for f, b1 in zip(filenames, b)))
+        with _timing_phase("set_preempt"):
+            await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+            await self.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
     
-    async def _download_and_start_motion_program(self, tasks, upload_fn: Callable[[],None]):
+    async def _upload_motion_program_files(self, filenames: List[str], b: List[bytes]):
+        cache = self.upload_cache
+        if cache is None:
+            await asyncio.gather(*(self.abb_client_aio.upload_file(f, b1) for f, b1 in zip(filenames, b)))
+            return
+
+        ramdisk = filenames[0].rsplit("/",1)[0]
+        ramdisk_files = _upload_cache.parse_file_listing(await self.abb_client_aio._do_get(f"fileservice/{ramdisk}"))
+        async def _upload_group(digest, files):
+            for filename, b1 in files:
+                await self._upload_motion_program_file_cached(cache, filename, b1, digest, ramdisk, ramdisk_files)
+        await asyncio.gather(*(_upload_group(d, g) for d, g in _group_by_digest(filenames, b).items()))
+
+    async def _upload_motion_program_file_cached(self, cache: MotionProgramUploadCache, filename: str, b1: bytes,
+        digest: str, ramdisk: str, ramdisk_files):
+        if cache.is_target_current(filename, digest, len(b1), ramdisk_files):
+            cache.hits += 1
+            return
+        cache.forget_target(filename)
+        copy_filename = cache.get_program_copy(digest, ramdisk_files)
+        if copy_filename is not None:
+            try:
+                await self.abb_client_aio._do_post(
+                    *_upload_cache.copy_file_url_and_payload(copy_filename, filename))
+                cache.set_target(filename, digest, len(b1))
+                cache.copies += 1
+                return
+            except Exception:
+                cache.discard_program_copy(digest)
+        await self.abb_client_aio.upload_file(filename, b1)
+        cache.set_target(filename, digest, len(b1))
+        cache.misses += 1
+        copy_filename, evicted = cache.add_program_copy(digest, len(b1), ramdisk)
+        if copy_filename is not None:
+            try:
+                await self.abb_client_aio._do_post(
+                    *_upload_cache.copy_file_url_and_payload(filename, copy_filename))
+            except Exception:
+                # Controller does not support copying files, only skip uploads of unchanged programs
+                cache.discard_program_copy(digest)
+                cache.server_copy = False
+        for evicted_filename in evicted:
+            try:
+                await self.abb_client_aio.delete_file(evicted_filename)
+            except Exception:
+                pass
+
+    async def _download_and_start_motion_program(self, tasks, upload_fn: Callable[[],None], prev_seqnum: int = None):
+        # prev_seqnum is the event log position after the previous program, used by MotionProgramJobQueueAIO to
+        # skip reading the event log before each job
         
-        exec_state = await self.abb_client_aio.get_execution_state()
-        if not exec_state.ctrlexecstate == "stopped":
-            raise Exception("Controller must be stopped before executing motion program")
-        #assert exec_state.cycle == "once"
-        ctrl_state = await self.abb_client_aio.get_controller_state()
-        if not ctrl_state == "motoron":
-            raise Exception("Controller must be motor on before executing motion program")
+        # The state checks and the event log position are independent, so request them together
+        with _timing_phase("check_state"):
+            requests = [self.abb_client_aio.get_execution_state(), self.abb_client_aio.get_controller_state()]
+            if prev_seqnum is None:
+                requests.append(self._event_log_cursor.reset())
+            res = await asyncio.gather(*requests)
+            exec_state, ctrl_state = res[:2]
+            if prev_seqnum is None:
+                prev_seqnum = res[2]
+            if not exec_state.ctrlexecstate == "stopped":
+                raise Exception("Controller must be stopped before executing motion program")
+            #assert exec_state.cycle == "once"
+            if not ctrl_state == "motoron":
+                raise Exception("Controller must be motor on before executing motion program")
+
+        async def _resetpp():
+            with _timing_phase("resetpp"):
+                await self.abb_client_aio.resetpp()
+        await asyncio.gather(_resetpp(), upload_fn())
+
+        with _timing_phase("start"):
+            await self._start_tasks(tasks, 'once')
 
-        log_before = await self.abb_client_aio.read_event_log()
-        prev_seqnum = log_before[0].seqnum
+        return prev_seqnum
 
-        await self.abb_client_aio.resetpp()
-        await upload_fn()
+    async def _get_ramdisk_path(self) -> str:
+        if self._ramdisk_path is None:
+            self._ramdisk_path = await self.abb_client_aio.get_ramdisk_path()
+        return self._ramdisk_path
+
+    async def _start_tasks(self, tasks: List[str], cycle: str):
+        # Same as RWS_AIO.start(), but uses the cached task names. The task activation is runtime state and may be
+        # changed by another client, so the wanted activation of each motion task is always requested.
+        if self._tasks is None or any(t not in self._tasks for t in tasks):
+            self._tasks = {t.name: t.motiontask for t in (await self.abb_client_aio.get_tasks()).values()}
+        for t in tasks:
+            if t not in self._tasks:
+                raise Exception(f"Cannot start unknown task {t}")
+        try:
+            activations = []
+            for name, motiontask in self._tasks.items():
+                if not motiontask:
+                    continue
+                action = "activate" if name in tasks else "deactivate"
+                activations.append(self.abb_client_aio._do_post(f"rw/rapid/tasks/{name}?action={action}", {}))
+            await asyncio.gather(*activations)
+
+            payload={"regain": "continue", "execmode": "continue" , "cycle": cycle, "condition": "none",
+                "stopatbp": "disabled", "alltaskbytsp": "true"}
+            await self.abb_client_aio._do_post("rw/rapid/execution?action=start", payload)
+        except Exception:
+            # The cached task names may be out of date if the controller was reconfigured
+            self._tasks = None
+            raise
+
+    def invalidate_controller_cache(self):
+        """
+        Clear the cached controller information. The client caches the RAMDISK path and the RAPID task names,
+        since they do not change while the controller is running. Call this method if the controller is
+        restarted or reconfigured.
+        """
+        self._ramdisk_path = None
+        self._tasks = None
 
-        await self.abb_client_aio.start(cycle='once',tasks=tasks)
+    async def execute_motion_program_progress(self, motion_program: MotionProgram, task: str="T_ROB1",
+        seqno: int = None, poll_period: float = 0.1) -> AsyncIterator[MotionProgramProgressEvent]:
+        """
+        Execute a motion program and iterate the progress events until it completes. Same as calling
+        ``execute_motion_program()`` with ``wait`` False followed by :meth:`motion_program_progress()`.
 
-        return prev_seqnum
+        :param motion_program: The motion program to execute
+        :param task: The RAPID Task to use to execute the program. Defaults to ``T_ROB1``
+        :param seqno: Optional motion program seqno override
+        :param poll_period: Time between polls in seconds
+        :return: Async iterator of the progress events
+        """
+        prev_seqnum = await self.execute_motion_program(motion_program, task, wait=False, seqno=seqno)
+        async for evt in self.motion_program_progress(prev_seqnum, poll_period):
+            yield evt
+
+    async def motion_program_progress(self, prev_seqnum: int, poll_period: float = 0.1) \
+        -> AsyncIterator[MotionProgramProgressEvent]:
+        """
+        Iterate the progress events of a motion program started with ``wait`` set to False, until it completes.
+        The motion program signals and the new event log entries are requested together on each poll. See
+        :meth:`abb_motion_program_exec.MotionProgramExecClient.motion_program_progress()`.
+
+        :param prev_seqnum: The previous seqnum, returned by ``execute_motion_program()`` if ``wait`` is False.
+        :param poll_period: Time between polls in seconds
+        :return: Async iterator of the progress events
+        """
+        cursor = EventLogCursorAIO(self.abb_client_aio)
+        cursor.seqnum = prev_seqnum
+        status = await self.get_motion_program_status()
+        yield MotionProgramProgressEvent("started", status)
+        while True:
+            await asyncio.sleep(poll_period)
+            prev_status = status
+            status, entries = await asyncio.gather(self.get_motion_program_status(), cursor.read_new())
+            running = status.executing or await self.is_motion_program_running()
+            if not running:
+                # The log closed message may have been written after the event log was read
+                entries = await cursor.read_new() + entries
+            for evt in _get_progress_events(status, prev_status, index_entries_by_code(entries)):
+                yield evt
+            if not running:
+                break
+        try:
+            result_log = await self.read_motion_program_result_log(prev_seqnum)
+        except Exception as e:
+            yield MotionProgramProgressEvent("failed", status, error=e)
+            return
+        yield MotionProgramProgressEvent("completed", status, result_log=result_log)
 
     async def is_motion_program_running(self) -> bool:
         """Returns True if motion program is running"""
         exec_state = await self.abb_client_aio.get_execution_state()
         return exec_state.ctrlexecstate == "running"
 
-    async def wait_motion_program_complete(self):
-        """Wait for motion program to complete"""
-        
-        while True:
+    @_timed_call
+    async def wait_motion_program_complete(self, use_subscription: bool = None):
+        """
+        Wait for motion program to complete
+
+        If ``use_subscription`` is True, the execution state is subscribed using an RWS subscription, and completion
+        is detected as soon as the controller publishes the state change. The subscription is kept open for later
+        calls. ``RWS_AIO`` only supports one subscription, so the subscription wait is not available if
+        ``abb_client_aio`` is used for other subscriptions. If subscriptions are not available, the execution state
+        is polled with an adaptive period instead, starting at 5 ms and increasing to 50 ms.
+
+        :param use_subscription: Use an RWS subscription to wait for completion. Defaults to the
+                                 ``use_subscription_wait`` parameter of the client
+        """
+        if use_subscription is None:
+            use_subscription = self.use_subscription_wait
+
+        if not use_subscription:
+            while True:
+                exec_state = await self.abb_client_aio.get_execution_state()
+                if exec_state.ctrlexecstate != "running":
+                    break
+                await asyncio.sleep(0.05)
+            return
+
+        if self._exec_state_sub is None and not self._exec_state_sub_unavailable:
+            self._exec_state_sub = _ExecutionStateSubscriptionAIO(self.abb_client_aio)
+        sub = self._exec_state_sub
+        if sub is not None:
+            while not sub.failed:
+                sub.changed.clear()
+                exec_state = await self.abb_client_aio.get_execution_state()
+                if exec_state.ctrlexecstate != "running":
+                    return
+                try:
+                    await asyncio.wait_for(sub.changed.wait(), _SUBSCRIPTION_CHECK_PERIOD)
+                except asyncio.TimeoutError:
+                    pass
+            sub.close()
+            self._exec_state_sub = None
+            self._exec_state_sub_unavailable = True
+
+        for delay in _adaptive_poll_delays():
             exec_state = await self.abb_client_aio.get_execution_state()
             if exec_state.ctrlexecstate != "running":
                 break
-            await asyncio.sleep(0.05)
+            await asyncio.sleep(delay)
 
+    @_timed_call
     async def read_motion_program_result_log(self, prev_seqnum: int) -> MotionProgramResultLog:
         """
         Read a motion program result log after motion program completes. This function is called by
@@ -243,59 +601,21 @@ class MotionProgramExecClientAIO:
         :return: The result log
         """
 
-        log_after_raw = await  self.abb_client_aio.read_event_log()
-        log_after = []
-        for l in log_after_raw:
-            if l.seqnum > prev_seqnum:
-                log_after.append(l)
-            elif prev_seqnum > 61440 and l.seqnum < 4096:
-                # Handle uint16 wraparound
-                log_after.append(l)
-            else:
-                break
-        
-        failed = False
-        for l in log_after:
-            if l.msgtype >= 2:
-                if len(l.args) > 0 and l.args[0].lower() == "motion program failed":
-                    raise Exception( l.args[1] + " " + l.args[2] + " " + l.args[3] + " " + l.args[4])
-            if l.msgtype >= 3:
-                failed = True
-
-        if failed:
-            raise Exception("Motion Program Failed, see robot error log for details")
-
-        found_log_open = False
-        found_log_close = False
-        log_filename = ""
-
-        for l in reversed(log_after):
-            if l.code == 80003:
-                if l.args[0].lower() == "motion program log file closed":
-                    if found_log_open:
-                        if found_log_close:
-                            raise Exception("Found more than one log closed message")
-                        found_log_close = True
-                
-                if l.args[0].lower() == "motion program log file opened":
-                    if found_log_open:
-                        raise Exception("Found more than one log opened message")
-                    found_log_open = True
-                    log_filename_m = re.search(r"(log\-[\d\-]+\.bin)",l.args[1])
-                    if not log_filename_m:
-                        raise Exception("Invalid log opened message")
-                    log_filename = log_filename_m.group(1)
-
-        if not (found_log_open and found_log_close and len(log_filename) > 0):
-            raise Exception("Could not find log file messages in robot event log")
-
-        ramdisk = await self.abb_client_aio.get_ramdisk_path()
-        log_contents = await self.abb_client_aio.read_file(f"{ramdisk}/{log_filename}")
-        try:
-            await self.abb_client_aio.delete_file(f"{ramdisk}/{log_filename}")
-        except:
-            pass
-        return _unpack_motion_program_result_log(log_contents)
+        with _timing_phase("event_log_read"):
+            log_after = await self._event_log_cursor.read_after(prev_seqnum)
+            log_filename = _get_result_log_filename(log_after, self._event_log_cursor.entries_by_code)
+
+        with _timing_phase("get_ramdisk_path"):
+            ramdisk = await self._get_ramdisk_path()
+        with _timing_phase("log_download"):
+            log_contents = await self.abb_client_aio.read_file(f"{ramdisk}/{log_filename}")
+        with _timing_phase("log_delete"):
+            try:
+                await self.abb_client_aio.delete_file(f"{ramdisk}/{log_filename}")
+            except:
+                pass
+        with _timing_phase("log_unpack"):
+            return _unpack_motion_program_result_log(log_contents)
 
     async def stop_motion_program(self):
         """Stop a motion program. Motion programs will normally stop when complete, so this is not normally necessary"""
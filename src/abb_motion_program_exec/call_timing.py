@@ -0,0 +1,181 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import time
+from typing import Any, Dict
+
+# The timing record of the client call running in the current thread or asyncio task. Python 3.6 uses the
+# contextvars backport, which does not give each asyncio task its own context, so concurrent AsyncIO calls are
+# recorded as nested calls of the first call.
+_current_timing = contextvars.ContextVar("abb_motion_program_exec_current_timing", default=None)
+
+class MotionProgramCallTiming:
+    """
+    Timing record of one call to a motion program client method, such as ``execute_motion_program()`` or
+    ``preempt_motion_program()``. The record is stored in the ``last_timing`` attribute of the client, and passed
+    to the ``timing_callback`` of the client when the call returns or raises an exception.
+
+    The phases recorded by ``execute_motion_program()`` are ``get_ramdisk_path``, ``serialize``, ``check_state``,
+    ``event_log_reset``, ``resetpp``, ``upload``, ``start``, ``wait``, ``event_log_read``, ``log_download``,
+    ``log_delete`` and ``log_unpack``. Preempt calls record ``get_ramdisk_path``, ``serialize``, ``upload`` and
+    ``set_preempt``. Committing a prefetched preempt program records ``set_preempt`` and ``delete``. The time not
+    covered by a phase is the overhead of the client itself.
+
+    ``MotionProgramExecClientAIO`` requests the event log position together with the state checks, so
+    ``check_state`` includes the event log reset, and ``resetpp`` and ``upload`` overlap.
+    MultiMove calls upload the files of all tasks concurrently, and ``upload`` is the time until the last file is
+    uploaded.
+
+    ``MotionProgramJobQueue`` and ``MotionProgramJobQueueAIO`` record a ``job_queue_execute`` call for each job,
+    with the ``check_state``, ``resetpp``, ``upload``, ``start``, ``wait`` and ``event_log_read`` phases. The log
+    is downloaded in the background and is not part of the record.
+
+    :param call: The name of the client method
+    """
+    def __init__(self, call: str):
+        self.call = call
+        """The name of the client method"""
+        self.start_time = time.time()
+        """Wall clock time the call started, in seconds since the epoch"""
+        self.phases: Dict[str,float] = dict()
+        """Duration of each phase in seconds, in the order the phases started"""
+        self.total = 0.0
+        """Duration of the call in seconds"""
+        self.bytes_uploaded = 0
+        """Number of bytes sent in RWS request bodies"""
+        self.bytes_downloaded = 0
+        """Number of bytes received in RWS response bodies"""
+        self.rws_requests = 0
+        """Number of RWS HTTP requests"""
+        self.error: str = None
+        """The exception message if the call failed, or None"""
+
+    def to_dict(self) -> Dict[str,Any]:
+        """Returns the record as a dict of plain values, for example to serialize as JSON"""
+        return {
+            "call": self.call,
+            "start_time": self.start_time,
+            "total": self.total,
+            "phases": dict(self.phases),
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_downloaded": self.bytes_downloaded,
+            "rws_requests": self.rws_requests,
+            "error": self.error
+        }
+
+    def __repr__(self):
+        phases = ", ".join(f"{k}={v*1000:.1f}ms" for k, v in self.phases.items())
+        return f"MotionProgramCallTiming({self.call} total={self.total*1000:.1f}ms {phases} " \
+            f"rws_requests={self.rws_requests} bytes_uploaded={self.bytes_uploaded} " \
+            f"bytes_downloaded={self.bytes_downloaded})"
+
+@contextlib.contextmanager
+def _timing_phase(name: str):
+    # Add the duration of the block to the phase of the current call. Does nothing outside of a timed call.
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.phases[name] = timing.phases.get(name, 0.0) + time.perf_counter() - t0
+
+class _TimedCall:
+    # Records the timing of a client method. Calls made by another timed method, for example
+    # wait_motion_program_complete() called by execute_motion_program(), are part of the outer call.
+    def __init__(self, client, call: str):
+        self._client = client
+        self._call = call
+        self._timing = None
+        self._token = None
+        self._t0 = 0.0
+
+    def __enter__(self):
+        if _current_timing.get() is None:
+            self._timing = MotionProgramCallTiming(self._call)
+            self._token = _current_timing.set(self._timing)
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        timing = self._timing
+        if timing is None:
+            return False
+        timing.total = time.perf_counter() - self._t0
+        if exc is not None:
+            timing.error = str(exc)
+        _current_timing.reset(self._token)
+        self._client.last_timing = timing
+        if self._client.timing_callback is not None:
+            self._client.timing_callback(timing)
+        return False
+
+def _timed_call(f):
+    # Decorator for client methods that records a MotionProgramCallTiming
+    if inspect.iscoroutinefunction(f):
+        @functools.wraps(f)
+        async def _timed_call_aio_wrapper(self, *args, **kwargs):
+            with _TimedCall(self, f.__name__):
+                return await f(self, *args, **kwargs)
+        return _timed_call_aio_wrapper
+
+    @functools.wraps(f)
+    def _timed_call_wrapper(self, *args, **kwargs):
+        with _TimedCall(self, f.__name__):
+            return f(self, *args, **kwargs)
+    return _timed_call_wrapper
+
+def _record_rws_request(bytes_uploaded: int, bytes_downloaded: int, requests: int = 1):
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.rws_requests += requests
+        timing.bytes_uploaded += bytes_uploaded
+        timing.bytes_downloaded += bytes_downloaded
+
+def _body_len(body) -> int:
+    if body is None:
+        return 0
+    return len(body)
+
+def _requests_response_hook(res, *args, **kwargs):
+    # Digest authentication retries the request, the challenge responses are in res.history
+    if _current_timing.get() is not None:
+        _record_rws_request(_body_len(res.request.body), len(res.content), 1 + len(res.history))
+
+async def _httpx_response_hook(res):
+    if _current_timing.get() is not None:
+        await res.aread()
+        _record_rws_request(_body_len(res.request.content), len(res.content))
+
+def _install_rws_hook(abb_client):
+    # Count the requests of the abb_robot_client RWS client. The hook is shared by all clients using the same
+    # RWS instance, and only counts requests made during a timed call.
+    session = getattr(abb_client, "_session", None)
+    hooks = getattr(session, "hooks", None)
+    if hooks is not None and _requests_response_hook not in hooks["response"]:
+        hooks["response"].append(_requests_response_hook)
+
+def _install_rws_aio_hook(abb_client_aio):
+    session = getattr(abb_client_aio, "_session", None)
+    event_hooks = getattr(session, "event_hooks", None)
+    if event_hooks is not None and _httpx_response_hook not in event_hooks["response"]:
+        event_hooks["response"] = list(event_hooks["response"]) + [_httpx_response_hook]
+        session.event_hooks = event_hooks
@@ -0,0 +1,180 @@
+# Copyright 2022 Wason Technology LLC, Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .command_base import CommandBase
+from .rapid_types import *
+from . import commands
+import numpy as np
+import io
+
+def _batch_array(arr, n, l, name):
+    arr = np.array(arr, dtype=np.float64)
+    if n is None:
+        n = arr.shape[0] if arr.ndim == 2 else -1
+    if not arr.shape == (n,l):
+        raise Exception(f"Invalid {name} array, expected shape (N,{l})")
+    return arr
+
+def _batch_param_array(arr, n, l, name):
+    # speeddata and zonedata may be shared by all commands in the batch, or specified per command
+    arr = np.array(arr, dtype=np.float64)
+    if arr.shape == (l,):
+        return arr
+    if not arr.shape == (n,l):
+        raise Exception(f"Invalid {name}, expected single value or array with shape (N,{l})")
+    return arr
+
+def _zonedata_from_nums(z):
+    return zonedata(bool(z[0] != 0), *z[1:])
+
+class BatchCommandBase(CommandBase):
+    """
+    Base class for a block of motion commands with the same opcode. The command parameters are stored column-wise
+    in NumPy arrays, and serialized with a single vectorized pack. Each row of the block is one motion
+    command in the motion program, and is assigned its own command number.
+
+    The number of commands is the number of rows of the target array, ``robax`` or ``trans``. Assign new arrays
+    with the same number of rows to all per-command attributes to resize the block.
+    """
+
+    command_opcode = None
+    command_params_count = 0
+    _count_attr = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def _count(self):
+        return getattr(self, self._count_attr).shape[0]
+
+    @property
+    def command_count(self):
+        return self._count
+
+    def _fill_params(self, params: np.ndarray):
+        raise NotImplementedError()
+
+    def _fill_commands(self, out: np.ndarray, first_cmd_num: int):
+        out[:,0] = np.arange(first_cmd_num, first_cmd_num + self._count, dtype=np.float64)
+        out[:,1] = self.command_opcode
+        self._fill_params(out[:,2:])
+
+    def get_commands_array(self, first_cmd_num: int) -> np.ndarray:
+        """
+        Return the block encoded as a ``(N, 2 + command_params_count)`` float32 array. The columns are the command
+        number, the opcode, and then the command parameters in the order read by the controller.
+
+        :param first_cmd_num: The command number of the first command in the block
+        """
+        out = np.empty((self._count, 2 + self.command_params_count), dtype="<f4")
+        self._fill_commands(out, first_cmd_num)
+        return out
+
+    def write_commands(self, f: io.IOBase, first_cmd_num: int):
+        f.write(self.get_commands_array(first_cmd_num).tobytes())
+
+    def get_command_nbytes(self):
+        return self._count * (2 + self.command_params_count) * 4
+
+    def pack_command_into(self, buf: bytearray, offset: int, cmd_num: int) -> int:
+        out = np.ndarray((self._count, 2 + self.command_params_count), dtype="<f4", buffer=buf, offset=offset)
+        self._fill_commands(out, cmd_num)
+        return offset + out.nbytes
+
+    def get_command(self, i: int) -> CommandBase:
+        """Return command ``i`` of the block as a standalone command"""
+        raise NotImplementedError()
+
+    def to_commands(self) -> List[CommandBase]:
+        """Return the block as a list of standalone commands"""
+        return [self.get_command(i) for i in range(self._count)]
+
+    def _get_speed(self, i):
+        s = self.speed if self.speed.ndim == 1 else self.speed[i]
+        return speeddata(*s.tolist())
+
+    def _get_zone(self, i):
+        z = self.zone if self.zone.ndim == 1 else self.zone[i]
+        return _zonedata_from_nums(z.tolist())
+
+class _RobTargetBatchCommandBase(BatchCommandBase):
+    command_params_count = 28
+    _command_cls = None
+    _count_attr = "trans"
+
+    def __init__(self, trans: np.ndarray, rot: np.ndarray, robconf: np.ndarray, extax: np.ndarray, speed: speeddata,
+        zone: zonedata):
+        self.trans = _batch_array(trans, None, 3, "trans")
+        n = self.trans.shape[0]
+        self.rot = _batch_array(rot, n, 4, "rot")
+        self.robconf = _batch_array(robconf, n, 4, "robconf")
+        self.extax = _batch_array(extax, n, 6, "extax") if extax is not None else None
+        self.speed = _batch_param_array(speed, n, 4, "speed")
+        self.zone = _batch_param_array(zone, n, 7, "zone")
+
+    def _fill_params(self, params):
+        params[:,0:3] = self.trans
+        params[:,3:7] = self.rot
+        params[:,7:11] = self.robconf
+        if self.extax is not None:
+            params[:,11:17] = self.extax
+        else:
+            params[:,11:17] = 0
+        params[:,17:21] = self.speed
+        params[:,21:28] = self.zone
+
+    def get_command(self, i):
+        extax = self.extax[i] if self.extax is not None else np.zeros((6,))
+        to_point = robtarget(self.trans[i], self.rot[i], confdata(*self.robconf[i].tolist()), extax)
+        return self._command_cls(to_point, self._get_speed(i), self._get_zone(i))
+
+class MoveAbsJBatchCommand(BatchCommandBase):
+    command_opcode = 1
+    command_params_count = 23
+    _count_attr = "robax"
+
+    def __init__(self, robax: np.ndarray, extax: np.ndarray, speed: speeddata, zone: zonedata):
+        self.robax = _batch_array(robax, None, 6, "robax")
+        n = self.robax.shape[0]
+        self.extax = _batch_array(extax, n, 6, "extax") if extax is not None else None
+        self.speed = _batch_param_array(speed, n, 4, "speed")
+        self.zone = _batch_param_array(zone, n, 7, "zone")
+
+    def _fill_params(self, params):
+        params[:,0:6] = self.robax
+        if self.extax is not None:
+            params[:,6:12] = self.extax
+        else:
+            params[:,6:12] = 0
+        params[:,12:16] = self.speed
+        params[:,16:23] = self.zone
+
+    def get_command(self, i):
+        extax = self.extax[i] if self.extax is not None else np.zeros((6,))
+        return commands.MoveAbsJCommand(jointtarget(self.robax[i], extax), self._get_speed(i), self._get_zone(i))
+
+    _append_method_doc = ""
+
+class MoveJBatchCommand(_RobTargetBatchCommandBase):
+    command_opcode = 2
+    _command_cls = commands.MoveJCommand
+
+    _append_method_doc = ""
+
+class MoveLBatchCommand(_RobTargetBatchCommandBase):
+    command_opcode = 3
+    _command_cls = commands.MoveLCommand
+
+    _append_method_doc = ""
@@ -13,11 +13,17 @@
 # limitations under the License.
 
 import inspect
+import struct
+import io
+from typing import List
+
+_cmd_header_struct = struct.Struct("<2f")
 
 class command_append_method:
     def __init__(self, command_cls):
         self._command_cls = command_cls
         self.__doc__ = command_cls._append_method_doc
+        self._signature = None
 
     def __get__(self, obj, cls=None):
         if obj is None:
@@ -30,10 +36,83 @@ class command_append_method:
 
         ret = command_append_func
         ret.__doc__ = self._command_cls._append_method_doc
-        sig = inspect.signature(self._command_cls.__init__)
-        sig = sig.replace(parameters=tuple(sig.parameters.values())[1:])
-        ret.__signature__ = sig
+        if self._signature is None:
+            # inspect.signature() is slow, so only compute it once per command type
+            sig = inspect.signature(self._command_cls.__init__)
+            self._signature = sig.replace(parameters=tuple(sig.parameters.values())[1:])
+        ret.__signature__ = self._signature
         return ret
 
 class CommandBase:
-    pass
\ No newline at end of file
+    """
+    Base class for motion program commands. Commands with fixed size parameters set ``command_params_count`` to
+    the number of float parameters and implement ``get_params_nums()``. The command is then packed directly
+    into the motion program buffer with a single ``struct.pack_into`` call.
+    """
+
+    command_opcode = None
+    command_params_count = None
+    command_count = 1
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        n = cls.__dict__.get("command_params_count", None)
+        if n is not None:
+            cls._params_struct = struct.Struct(f"<{n}f")
+            cls._command_struct = struct.Struct(f"<{n+2}f")
+
+    def __setattr__(self, name, value):
+        owners = self.__dict__.get("_command_owners", None)
+        if owners is not None and any(modified is None for modified, _ in owners):
+            raise Exception(f"{type(self).__name__} has been copied into a CompactCommandStorage and cannot be "
+                "modified")
+        object.__setattr__(self, name, value)
+        # Notify the command storage of every motion program holding the command that the cached encoding is stale
+        if owners is not None:
+            for modified, index in owners:
+                modified.add(index)
+
+    def _add_command_owner(self, modified: set, index: int):
+        # A command may be appended to more than one motion program, so every owner is tracked. Storages that copy
+        # the command pass None for modified, and assigning an attribute then raises an exception.
+        owners = self.__dict__.get("_command_owners", None)
+        if owners is None:
+            object.__setattr__(self, "_command_owners", [(modified, index)])
+        else:
+            owners.append((modified, index))
+
+    def get_params_nums(self) -> List[float]:
+        raise NotImplementedError()
+
+    def write_params(self, f: io.IOBase):
+        f.write(self._params_struct.pack(*self.get_params_nums()))
+
+    def _get_params_bytes(self):
+        f = io.BytesIO()
+        self.write_params(f)
+        return f.getvalue()
+
+    def get_command_nbytes(self) -> int:
+        """Return the number of bytes used by the command in the motion program, including cmd_num and opcode"""
+        if self.command_params_count is not None:
+            return self._command_struct.size
+        return 8 + len(self._get_params_bytes())
+
+    def pack_command_into(self, buf: bytearray, offset: int, cmd_num: int) -> int:
+        """
+        Pack the command into a preallocated buffer.
+
+        :param buf: The target buffer
+        :param offset: The byte offset of the command in ``buf``
+        :param cmd_num: The command number of the command
+        :return: The offset following the command
+        """
+        if self.command_params_count is not None:
+            self._command_struct.pack_into(buf, offset, cmd_num, self.command_opcode, *self.get_params_nums())
+            return offset + self._command_struct.size
+        # Fallback for commands that only implement write_params()
+        params_b = self._get_params_bytes()
+        _cmd_header_struct.pack_into(buf, offset, cmd_num, self.command_opcode)
+        offset += 8
+        buf[offset:offset+len(params_b)] = params_b
+        return offset + len(params_b)
\ No newline at end of file
@@ -0,0 +1,337 @@
+# Copyright 2022 Wason Technology LLC, Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .command_base import CommandBase
+from .batch_commands import BatchCommandBase
+from . import program_reader
+import numpy as np
+import array
+from typing import List
+
+class CommandListStorage:
+    """
+    Storage for the commands of a motion program. Commands are stored as a list of command objects. The encoded
+    commands are cached in a single growing buffer, so repeated serialization of a growing program only encodes
+    the commands appended since the previous call.
+
+    Commands notify the storage when one of their attributes is assigned, and are re-encoded on the next call
+    to ``get_commands_bytes()``. A command appended to more than one motion program notifies the storage of each
+    program. In place modification of arrays held by a command, for example
+    ``cmd.to_point.trans[0] = 1``, cannot be detected. Call ``invalidate()`` after modifying commands in place.
+    """
+    def __init__(self):
+        self._commands = []
+        self._command_count = 0
+        self._modified = set()
+        self.invalidate()
+
+    def invalidate(self):
+        """Discard all cached encoded commands"""
+        self._stream = bytearray()
+        self._entry_offsets = []
+        self._entry_cmd_index = []
+        self._n_encoded = 0
+        self._encoded_first_cmd_num = None
+        self._modified.clear()
+
+    def append(self, cmd: CommandBase, track_modified: bool = True):
+        """
+        Append a command
+
+        :param cmd: The command
+        :param track_modified: Re-encode the command when one of its attributes is assigned. Disable for
+                               temporary programs holding commands of another program, so the command does not
+                               keep a reference to the temporary program
+        """
+        if track_modified:
+            cmd._add_command_owner(self._modified, len(self._commands))
+        self._commands.append(cmd)
+        self._command_count += cmd.command_count
+
+    def load_encoded(self, cmds: List[CommandBase], commands_b: bytes, cmd_offsets: List[int], first_cmd_num: int):
+        """
+        Load commands together with their existing encoding, for instance when reading a motion program file.
+        The storage must be empty.
+
+        :param cmds: The commands
+        :param commands_b: The encoded commands
+        :param cmd_offsets: The byte offset of each command in ``commands_b``
+        :param first_cmd_num: The command number of the first command
+        """
+        assert len(self._commands) == 0
+        cmd_index = []
+        for cmd in cmds:
+            cmd_index.append(self._command_count)
+            self.append(cmd)
+        self._stream = bytearray(commands_b)
+        self._entry_offsets = list(cmd_offsets)
+        self._entry_cmd_index = cmd_index
+        self._n_encoded = len(cmds)
+        self._encoded_first_cmd_num = first_cmd_num
+
+    def __len__(self):
+        return self._command_count
+
+    def __iter__(self):
+        return iter(self._commands)
+
+    def _truncate(self, entry_ind):
+        del self._stream[self._entry_offsets[entry_ind]:]
+        del self._entry_offsets[entry_ind:]
+        del self._entry_cmd_index[entry_ind:]
+        self._n_encoded = entry_ind
+
+    def _update_modified(self, first_cmd_num):
+        modified = sorted(i for i in self._modified if i < self._n_encoded)
+        self._modified.clear()
+        for i in modified:
+            if i >= self._n_encoded:
+                break
+            cmd = self._commands[i]
+            offset = self._entry_offsets[i]
+            end = self._entry_offsets[i+1] if i+1 < self._n_encoded else len(self._stream)
+            if cmd.get_command_nbytes() != end - offset \
+                or (i+1 < self._n_encoded and cmd.command_count != self._entry_cmd_index[i+1] - self._entry_cmd_index[i]):
+                # Size of command changed, encode again from this command
+                self._truncate(i)
+                break
+            cmd.pack_command_into(self._stream, offset, first_cmd_num + self._entry_cmd_index[i])
+
+    def _update_cmd_nums(self, first_cmd_num):
+        if self._n_encoded == 0:
+            return
+        offsets = np.array(self._entry_offsets, dtype=np.int64)
+        cmd_index = np.array(self._entry_cmd_index, dtype=np.int64)
+        counts = np.diff(np.append(cmd_index, self._command_count_encoded()))
+        stream_f = np.frombuffer(self._stream, dtype="<f4")
+        try:
+            single = counts == 1
+            stream_f[offsets[single] // 4] = first_cmd_num + cmd_index[single]
+            for i in np.flatnonzero(counts != 1):
+                # Blocks of commands have one cmd_num field per row
+                count = int(counts[i])
+                if count == 0:
+                    continue
+                start = int(offsets[i])
+                end = int(offsets[i+1]) if i+1 < len(offsets) else len(self._stream)
+                row_len = (end - start) // (4 * count)
+                stream_f[start//4:end//4:row_len] = first_cmd_num + cmd_index[i] + np.arange(count)
+        finally:
+            del stream_f
+
+    def _command_count_encoded(self):
+        if self._n_encoded == len(self._commands):
+            return self._command_count
+        return self._entry_cmd_index[-1] + self._commands[self._n_encoded-1].command_count
+
+    def get_commands_bytes(self, first_cmd_num: int) -> bytearray:
+        """
+        Return the encoded commands. The returned buffer is owned by the storage, and must be copied before
+        more commands are appended.
+
+        :param first_cmd_num: The command number of the first command
+        """
+        if self._encoded_first_cmd_num is not None and self._encoded_first_cmd_num != first_cmd_num:
+            self._update_cmd_nums(first_cmd_num)
+        self._encoded_first_cmd_num = first_cmd_num
+
+        if len(self._modified) > 0:
+            self._update_modified(first_cmd_num)
+
+        n = len(self._commands)
+        if self._n_encoded == n:
+            return self._stream
+
+        new_cmds = self._commands[self._n_encoded:]
+        offset = len(self._stream)
+        cmd_index = self._command_count_encoded() if self._n_encoded > 0 else 0
+        nbytes = 0
+        for cmd in new_cmds:
+            nbytes += cmd.get_command_nbytes()
+        self._stream.extend(bytes(nbytes))
+        for cmd in new_cmds:
+            self._entry_offsets.append(offset)
+            self._entry_cmd_index.append(cmd_index)
+            offset = cmd.pack_command_into(self._stream, offset, first_cmd_num + cmd_index)
+            cmd_index += cmd.command_count
+        assert offset == len(self._stream)
+        self._n_encoded = n
+        return self._stream
+
+class _CommandParamsBlock:
+    # Growable (N, command_params_count) array holding the parameters of all commands with the same opcode.
+    # Single commands are collected in a short list and copied into the array together.
+    _pending_max = 1024
+
+    def __init__(self, params_count, dtype):
+        self.params_count = params_count
+        self._data = np.empty((16, params_count), dtype=dtype)
+        self._count = 0
+        self._pending = []
+
+    def __len__(self):
+        return self._count + len(self._pending)
+
+    def _reserve(self, n):
+        if self._count + n > self._data.shape[0]:
+            cap = max(self._count + n, (self._data.shape[0] * 3) // 2)
+            data = np.empty((cap, self.params_count), dtype=self._data.dtype)
+            data[:self._count] = self._data[:self._count]
+            self._data = data
+        row = self._count
+        self._count += n
+        return row
+
+    def flush(self):
+        if len(self._pending) > 0:
+            n = len(self._pending)
+            row = self._reserve(n)
+            self._data[row:row+n] = self._pending
+            self._pending.clear()
+
+    def append_nums(self, nums):
+        row = len(self)
+        self._pending.append(nums)
+        if len(self._pending) >= self._pending_max:
+            self.flush()
+        return row
+
+    def append_rows(self, n):
+        self.flush()
+        row = self._reserve(n)
+        return row, self._data[row:row+n]
+
+    @property
+    def data(self):
+        self.flush()
+        return self._data[:self._count]
+
+    def nbytes(self):
+        return self._data.nbytes
+
+class CompactCommandStorage:
+    """
+    Compact storage for the commands of large motion programs. The parameters of the commands are stored in one
+    typed ``(N, command_params_count)`` array per opcode, with an index table holding the opcode and array row
+    of each command. Blocks appended with ``MoveAbsJ_batch``, ``MoveJ_batch``, and ``MoveL_batch`` are copied
+    into the arrays without creating command objects. The program is encoded with vectorized NumPy operations,
+    and is byte-identical to the program encoded from ``CommandListStorage``.
+
+    Commands are copied into the storage when they are appended. Assigning an attribute of a command object after
+    it has been appended raises an exception, since the change would not affect the motion program. In place
+    modification of the arrays of an appended command is not detected, and has no effect. Iterating the storage
+    creates new command objects.
+
+    :param dtype: The dtype of the parameter arrays. ``np.float64`` stores the parameters exactly as passed.
+                  ``np.float32`` halves the memory, and stores the parameters with the precision of the binary
+                  motion program
+    """
+
+    _encode_chunk = 16384
+
+    def __init__(self, dtype = np.float64):
+        self._dtype = np.dtype(dtype)
+        self._blocks = dict()
+        self._opcodes = array.array("i")
+        self._rows = array.array("i")
+
+    def invalidate(self):
+        # The program is encoded from the parameter arrays on each call, so there is no cache to discard
+        pass
+
+    def _get_block(self, cmd):
+        opcode = cmd.command_opcode
+        block = self._blocks.get(opcode, None)
+        if block is None:
+            if not isinstance(cmd, BatchCommandBase) and program_reader.get_command_class(opcode) is not type(cmd):
+                raise Exception(f"Command type {type(cmd).__name__} not supported by CompactCommandStorage")
+            block = _CommandParamsBlock(cmd.command_params_count, self._dtype)
+            self._blocks[opcode] = block
+        return block
+
+    def append(self, cmd: CommandBase, track_modified: bool = True):
+        block = self._get_block(cmd)
+        if track_modified:
+            cmd._add_command_owner(None, -1)
+        if isinstance(cmd, BatchCommandBase):
+            n = cmd.command_count
+            row, params = block.append_rows(n)
+            cmd._fill_params(params)
+            self._opcodes.extend(array.array("i", [cmd.command_opcode]) * n)
+            self._rows.frombytes(np.arange(row, row+n, dtype=np.int32).tobytes())
+        else:
+            row = block.append_nums(cmd.get_params_nums())
+            self._opcodes.append(cmd.command_opcode)
+            self._rows.append(row)
+
+    def load_encoded(self, cmds: List[CommandBase], commands_b: bytes, cmd_offsets: List[int], first_cmd_num: int):
+        for cmd in cmds:
+            self.append(cmd)
+
+    def __len__(self):
+        return len(self._opcodes)
+
+    def __iter__(self):
+        n = len(self._opcodes)
+        if n == 0:
+            return
+        opcodes = np.frombuffer(self._opcodes, dtype=np.int32)
+        rows = np.frombuffer(self._rows, dtype=np.int32)
+        # Commands with the same opcode are created together for each run of consecutive commands
+        run_starts = np.flatnonzero(np.diff(opcodes)) + 1
+        run_starts = np.concatenate(([0], run_starts, [n])).tolist()
+        for i in range(len(run_starts) - 1):
+            opcode = int(opcodes[run_starts[i]])
+            block = self._blocks[opcode]
+            for j in range(run_starts[i], run_starts[i+1], self._encode_chunk):
+                r0 = int(rows[j])
+                m = min(self._encode_chunk, run_starts[i+1] - j)
+                yield from program_reader.commands_from_params(opcode, block.data[r0:r0+m].astype(np.float64))
+
+    def get_commands_bytes(self, first_cmd_num: int) -> bytearray:
+        """
+        Return the encoded commands
+
+        :param first_cmd_num: The command number of the first command
+        """
+        n = len(self._opcodes)
+        opcodes = np.frombuffer(self._opcodes, dtype=np.int32)
+        rows = np.frombuffer(self._rows, dtype=np.int32)
+        row_lens = np.zeros((n,), dtype=np.int64)
+        selects = dict()
+        for opcode, block in self._blocks.items():
+            sel = np.flatnonzero(opcodes == opcode)
+            row_lens[sel] = 2 + block.params_count
+            selects[opcode] = sel
+        offsets = np.zeros((n,), dtype=np.int64)
+        np.cumsum(row_lens[:-1], out=offsets[1:])
+
+        buf = bytearray(int(row_lens.sum()) * 4)
+        out = np.frombuffer(buf, dtype="<f4")
+        out[offsets] = np.arange(first_cmd_num, first_cmd_num + n, dtype=np.float64)
+        out[offsets + 1] = opcodes
+        for opcode, block in self._blocks.items():
+            sel = selects[opcode]
+            data = block.data
+            cols = 2 + np.arange(block.params_count)
+            for i in range(0, len(sel), self._encode_chunk):
+                s = sel[i:i+self._encode_chunk]
+                out[offsets[s,None] + cols] = data[rows[s]]
+        del out
+        return buf
+
+    def nbytes(self) -> int:
+        """Return the approximate number of bytes used by the storage"""
+        return sum(b.nbytes() for b in self._blocks.values()) + self._opcodes.itemsize * len(self._opcodes) \
+            + self._rows.itemsize * len(self._rows)
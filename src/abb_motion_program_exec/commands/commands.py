@@ -21,18 +21,15 @@ from . import util
 @dataclass
 class MoveAbsJCommand(CommandBase):
     command_opcode = 1
+    command_params_count = 23
 
     to_joint_pos: jointtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        to_joint_pos_b = util.jointtarget_to_bin(self.to_joint_pos)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-        f.write(to_joint_pos_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.jointtarget_to_nums(self.to_joint_pos), *util.speeddata_to_nums(self.speed),
+            *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, sync_move = False, cmd_num = 0, **kwargs):
         to_joint_pos_str = self.to_joint_pos.to_rapid()
@@ -46,18 +43,15 @@ class MoveAbsJCommand(CommandBase):
 @dataclass
 class MoveJCommand(CommandBase):
     command_opcode = 2
+    command_params_count = 28
 
     to_point: robtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        to_point_b = util.robtarget_to_bin(self.to_point)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-        f.write(to_point_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.robtarget_to_nums(self.to_point), *util.speeddata_to_nums(self.speed),
+            *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, sync_move = False, cmd_num = 0, **kwargs):
         to_point_str = self.to_point.to_rapid()
@@ -72,19 +66,15 @@ class MoveJCommand(CommandBase):
 @dataclass
 class MoveLCommand(CommandBase):
     command_opcode = 3
+    command_params_count = 28
 
     to_point: robtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        to_point_b = util.robtarget_to_bin(self.to_point)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-
-        f.write(to_point_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.robtarget_to_nums(self.to_point), *util.speeddata_to_nums(self.speed),
+            *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, sync_move = False, cmd_num = 0, **kwargs):
         to_point_str = self.to_point.to_rapid()
@@ -99,22 +89,16 @@ class MoveLCommand(CommandBase):
 @dataclass
 class MoveCCommand(CommandBase):
     command_opcode = 4
+    command_params_count = 45
 
     cir_point: robtarget
     to_point: robtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        cir_point_b = util.robtarget_to_bin(self.cir_point)
-        to_point_b = util.robtarget_to_bin(self.to_point)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-
-        f.write(cir_point_b)
-        f.write(to_point_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.robtarget_to_nums(self.cir_point), *util.robtarget_to_nums(self.to_point),
+            *util.speeddata_to_nums(self.speed), *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, sync_move = False, cmd_num = 0, **kwargs):
         cir_point_str = self.cir_point.to_rapid()
@@ -129,11 +113,12 @@ class MoveCCommand(CommandBase):
 @dataclass
 class WaitTimeCommand(CommandBase):
     command_opcode=5
+    command_params_count = 1
 
     t: float
 
-    def write_params(self, f: io.IOBase):
-        f.write(util.num_to_bin(self.t))
+    def get_params_nums(self):
+        return [self.t]
 
     def to_rapid(self, **kwargs):
         return f"WaitTime {self.t};"
@@ -143,14 +128,15 @@ class WaitTimeCommand(CommandBase):
 @dataclass
 class CirPathModeCommand(CommandBase):
     command_opcode = 6
+    command_params_count = 1
 
     switch: CirPathModeSwitch
 
-    def write_params(self, f: io.IOBase):
+    def get_params_nums(self):
         val = self.switch.value
         if not (val >=1 and val <= 6):
             raise Exception("Invalid CirPathMode switch")
-        f.write(util.num_to_bin(val))
+        return [val]
 
     def to_rapid(self, **kwargs):
         if  self.switch == 1:
@@ -172,9 +158,10 @@ class CirPathModeCommand(CommandBase):
 @dataclass
 class SyncMoveOnCommand(CommandBase):
     command_opcode = 7
+    command_params_count = 0
 
-    def write_params(self, f: io.IOBase):
-        pass
+    def get_params_nums(self):
+        return []
 
     def to_rapid(self, **kwargs):
         return "SyncMoveOn motion_program_sync1,task_list;"
@@ -183,9 +170,10 @@ class SyncMoveOnCommand(CommandBase):
 
 class SyncMoveOffCommand(CommandBase):
     command_opcode = 8
+    command_params_count = 0
 
-    def write_params(self, f: io.IOBase):
-        pass
+    def get_params_nums(self):
+        return []
 
     def to_rapid(self, **kwargs):
         return "SyncMoveOff motion_program_sync2;"
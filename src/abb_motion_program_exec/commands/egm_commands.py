@@ -22,15 +22,14 @@ from typing import Union
 @dataclass
 class EGMRunJointCommand(CommandBase):
     command_opcode = 50001
+    command_params_count = 3
 
     cond_time: float
     ramp_in_time: float
     ramp_out_time: float
 
-    def write_params(self, f: io.IOBase):
-        f.write(util.num_to_bin(self.cond_time))
-        f.write(util.num_to_bin(self.ramp_in_time))
-        f.write(util.num_to_bin(self.ramp_out_time))
+    def get_params_nums(self):
+        return [self.cond_time, self.ramp_in_time, self.ramp_out_time]
 
     def to_rapid(self, **kwargs):
         raise NotImplementedError("EGM not supported for RAPID generation")
@@ -40,17 +39,15 @@ class EGMRunJointCommand(CommandBase):
 @dataclass
 class EGMRunPoseCommand(CommandBase):
     command_opcode = 50002
+    command_params_count = 10
 
     cond_time: float
     ramp_in_time: float
     ramp_out_time: float
     offset: pose
 
-    def write_params(self, f: io.IOBase):
-        f.write(util.num_to_bin(self.cond_time))
-        f.write(util.num_to_bin(self.ramp_in_time))
-        f.write(util.num_to_bin(self.ramp_out_time))
-        f.write(util.pose_to_bin(self.offset))
+    def get_params_nums(self):
+        return [self.cond_time, self.ramp_in_time, self.ramp_out_time, *util.pose_to_nums(self.offset)]
 
     def to_rapid(self, **kwargs):
         raise NotImplementedError("EGM not supported for RAPID generation")
@@ -60,19 +57,15 @@ class EGMRunPoseCommand(CommandBase):
 @dataclass
 class EGMMoveLCommand(CommandBase):
     command_opcode = 50003
+    command_params_count = 28
 
     to_point: robtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        to_point_b = util.robtarget_to_bin(self.to_point)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-
-        f.write(to_point_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.robtarget_to_nums(self.to_point), *util.speeddata_to_nums(self.speed),
+            *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, **kwargs):
         raise NotImplementedError("EGM not supported for RAPID generation")
@@ -82,22 +75,16 @@ class EGMMoveLCommand(CommandBase):
 @dataclass
 class EGMMoveCCommand(CommandBase):
     command_opcode = 50004
+    command_params_count = 45
 
     cir_point: robtarget
     to_point: robtarget
     speed: speeddata
     zone: zonedata
 
-    def write_params(self, f: io.IOBase):
-        cir_point_b = util.robtarget_to_bin(self.cir_point)
-        to_point_b = util.robtarget_to_bin(self.to_point)
-        speed_b = util.speeddata_to_bin(self.speed)
-        zone_b = util.zonedata_to_bin(self.zone)
-
-        f.write(cir_point_b)
-        f.write(to_point_b)
-        f.write(speed_b)
-        f.write(zone_b)
+    def get_params_nums(self):
+        return [*util.robtarget_to_nums(self.cir_point), *util.robtarget_to_nums(self.to_point),
+            *util.speeddata_to_nums(self.speed), *util.zonedata_to_nums(self.zone)]
 
     def to_rapid(self, **kwargs):
         raise NotImplementedError("EGM not supported for RAPID generation")
@@ -234,4 +221,34 @@ def write_egm_config(f: io.IOBase,
         f.write(util.num_to_bin(3))
         f.write(_egm_path_correction_config_to_bin(egm_config))
     else:
-        raise Exception("Invalid EGM configuration")
\ No newline at end of file
+        raise Exception("Invalid EGM configuration")
+
+
+def _read_egm_minmax(f: io.IOBase):
+    return egm_minmax(*util.read_nums(f,2))
+
+def _read_pose(f: io.IOBase):
+    nums = util.read_nums(f,7)
+    return pose(np.array(nums[0:3]), np.array(nums[3:7]))
+
+def read_egm_config(f: io.IOBase) \
+    -> Union[None,EGMJointTargetConfig,EGMPoseTargetConfig,EGMPathCorrectionConfig]:
+    # EGMStreamConfig and None are stored identically, and are both read as None
+    egm_config_type = util.read_num(f)
+    if egm_config_type == 0:
+        return None
+    elif egm_config_type == 1:
+        minmax = [_read_egm_minmax(f) for _ in range(6)]
+        return EGMJointTargetConfig(*minmax, *util.read_nums(f,2))
+    elif egm_config_type == 2:
+        corr_frame = _read_pose(f)
+        corr_fr_type = egmframetype(int(util.read_num(f)))
+        sensor_frame = _read_pose(f)
+        sensor_fr_type = egmframetype(int(util.read_num(f)))
+        minmax = [_read_egm_minmax(f) for _ in range(6)]
+        return EGMPoseTargetConfig(corr_frame, corr_fr_type, sensor_frame, sensor_fr_type, *minmax,
+            *util.read_nums(f,2))
+    elif egm_config_type == 3:
+        return EGMPathCorrectionConfig(_read_pose(f))
+    else:
+        raise Exception("Invalid EGM configuration")
@@ -0,0 +1,237 @@
+# Copyright 2022 Wason Technology LLC, Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reader for the binary motion program format written by ``MotionProgram.write_program()``. Consecutive commands
+with the same opcode are read as a single ``(N, 2 + command_params_count)`` NumPy view of the program buffer.
+"""
+
+from .rapid_types import *
+from .command_base import CommandBase
+from . import commands
+from . import egm_commands
+from .egm_commands import _read_pose
+from . import batch_commands
+from . import util
+import numpy as np
+import io
+from typing import Tuple
+
+def read_program_str(f: io.IOBase) -> str:
+    # Strings in motion programs are always padded to 32 characters
+    l = int(util.read_num(f))
+    s_ascii = f.read(32)
+    return s_ascii[:l].decode('ascii')
+
+def read_loaddata(f: io.IOBase) -> loaddata:
+    nums = util.read_nums(f,11)
+    return loaddata(nums[0], np.array(nums[1:4]), np.array(nums[4:8]), nums[8], nums[9], nums[10])
+
+def read_tooldata(f: io.IOBase) -> tooldata:
+    robhold = util.read_num(f) != 0
+    tframe = _read_pose(f)
+    tload = read_loaddata(f)
+    return tooldata(robhold, tframe, tload)
+
+def read_wobjdata(f: io.IOBase) -> wobjdata:
+    robhold = util.read_num(f) != 0
+    ufprog = util.read_num(f) != 0
+    ufmec = read_program_str(f)
+    uframe = _read_pose(f)
+    oframe = _read_pose(f)
+    return wobjdata(robhold, ufprog, ufmec, uframe, oframe)
+
+def _tuples_from_params(p, tuple_fn):
+    # speeddata, zonedata, and confdata are usually repeated, so reuse the tuple for identical values
+    cache = {}
+    ret = []
+    for v in map(tuple, p.tolist()):
+        t = cache.get(v, None)
+        if t is None:
+            t = tuple_fn(v)
+            cache[v] = t
+        ret.append(t)
+    return ret
+
+def _speeddata_from_params(p):
+    return _tuples_from_params(p, lambda v: speeddata(*v))
+
+def _zonedata_from_params(p):
+    return _tuples_from_params(p, batch_commands._zonedata_from_nums)
+
+def _robtarget_from_params(p):
+    trans = p[:,0:3]
+    rot = p[:,3:7]
+    robconf = _tuples_from_params(p[:,7:11], lambda v: confdata(*v))
+    extax = p[:,11:17]
+    return [robtarget(trans[i], rot[i], robconf[i], extax[i]) for i in range(p.shape[0])]
+
+def _pose_from_params(p):
+    return [pose(p[i,0:3], p[i,3:7]) for i in range(p.shape[0])]
+
+def _read_moveabsj(cls, p):
+    speed = _speeddata_from_params(p[:,12:16])
+    zone = _zonedata_from_params(p[:,16:23])
+    return [cls(jointtarget(p[i,0:6], p[i,6:12]), speed[i], zone[i]) for i in range(p.shape[0])]
+
+def _read_move_robtarget(cls, p):
+    to_point = _robtarget_from_params(p[:,0:17])
+    speed = _speeddata_from_params(p[:,17:21])
+    zone = _zonedata_from_params(p[:,21:28])
+    return [cls(to_point[i], speed[i], zone[i]) for i in range(p.shape[0])]
+
+def _read_movec(cls, p):
+    cir_point = _robtarget_from_params(p[:,0:17])
+    to_point = _robtarget_from_params(p[:,17:34])
+    speed = _speeddata_from_params(p[:,34:38])
+    zone = _zonedata_from_params(p[:,38:45])
+    return [cls(cir_point[i], to_point[i], speed[i], zone[i]) for i in range(p.shape[0])]
+
+def _read_waittime(cls, p):
+    return [cls(t) for t in p[:,0].tolist()]
+
+def _read_cirpathmode(cls, p):
+    return [cls(CirPathModeSwitch(int(v))) for v in p[:,0].tolist()]
+
+def _read_no_params(cls, p):
+    return [cls() for _ in range(p.shape[0])]
+
+def _read_egmrunjoint(cls, p):
+    return [cls(*v) for v in p.tolist()]
+
+def _read_egmrunpose(cls, p):
+    offset = _pose_from_params(p[:,3:10])
+    return [cls(*p[i,0:3].tolist(), offset[i]) for i in range(p.shape[0])]
+
+def _read_batch_param(p):
+    # Store speeddata and zonedata once if it is shared by all commands in the batch
+    if np.all(p == p[0]):
+        return p[0]
+    return p
+
+def _read_moveabsj_batch(cls, p):
+    return cls(p[:,0:6], p[:,6:12], _read_batch_param(p[:,12:16]), _read_batch_param(p[:,16:23]))
+
+def _read_move_robtarget_batch(cls, p):
+    return cls(p[:,0:3], p[:,3:7], p[:,7:11], p[:,11:17], _read_batch_param(p[:,17:21]),
+        _read_batch_param(p[:,21:28]))
+
+_command_readers = {
+    c.command_opcode: (c, r) for c, r in [
+        (commands.MoveAbsJCommand, _read_moveabsj),
+        (commands.MoveJCommand, _read_move_robtarget),
+        (commands.MoveLCommand, _read_move_robtarget),
+        (commands.MoveCCommand, _read_movec),
+        (commands.WaitTimeCommand, _read_waittime),
+        (commands.CirPathModeCommand, _read_cirpathmode),
+        (commands.SyncMoveOnCommand, _read_no_params),
+        (commands.SyncMoveOffCommand, _read_no_params),
+        (egm_commands.EGMRunJointCommand, _read_egmrunjoint),
+        (egm_commands.EGMRunPoseCommand, _read_egmrunpose),
+        (egm_commands.EGMMoveLCommand, _read_move_robtarget),
+        (egm_commands.EGMMoveCCommand, _read_movec)
+    ]
+}
+
+_batch_command_readers = {
+    c.command_opcode: (c, r) for c, r in [
+        (batch_commands.MoveAbsJBatchCommand, _read_moveabsj_batch),
+        (batch_commands.MoveJBatchCommand, _read_move_robtarget_batch),
+        (batch_commands.MoveLBatchCommand, _read_move_robtarget_batch)
+    ]
+}
+
+def _count_opcode_run(data: np.ndarray, pos: int, row_len: int, opcode: int) -> int:
+    # Galloping search for the number of consecutive commands with the same opcode starting at pos
+    count = 0
+    block = 8
+    max_count = (len(data) - pos) // row_len
+    while count < max_count:
+        n = min(block, max_count - count)
+        start = pos + count*row_len
+        match = data[start:start + n*row_len].reshape(n, row_len)[:,1] == opcode
+        if not match.all():
+            return count + int(np.argmin(match))
+        count += n
+        block *= 2
+    return count
+
+def read_commands(b: bytes, offset: int = 0, use_batch: bool = False) -> Tuple[int,List[CommandBase],List[int]]:
+    """
+    Read the commands of a binary motion program.
+
+    :param b: The binary motion program
+    :param offset: The byte offset of the first command in ``b``
+    :param use_batch: Read runs of ``MoveAbsJ``, ``MoveJ``, and ``MoveL`` as batch commands
+    :return: The first command number, the commands, and the byte offset of each command relative to ``offset``
+    """
+    if (len(b) - offset) % 4 != 0:
+        raise Exception("Invalid motion program length")
+    data = np.frombuffer(b, dtype="<f4", offset=offset)
+    first_cmd_num = None
+    cmd_num = None
+    cmds = []
+    cmd_offsets = []
+    pos = 0
+    while pos < len(data):
+        if len(data) - pos < 2:
+            raise Exception("Invalid motion program, truncated command")
+        opcode = data[pos+1]
+        reader = _command_readers.get(float(opcode), None)
+        if reader is None:
+            raise Exception(f"Invalid motion program, unknown command opcode {opcode}")
+        cmd_cls = reader[0]
+        row_len = 2 + cmd_cls.command_params_count
+        count = _count_opcode_run(data, pos, row_len, opcode)
+        if count == 0:
+            raise Exception("Invalid motion program, truncated command")
+        run = data[pos:pos+count*row_len].reshape(count, row_len)
+        if first_cmd_num is None:
+            first_cmd_num = int(run[0,0])
+            cmd_num = first_cmd_num
+        if not np.array_equal(run[:,0], np.arange(cmd_num, cmd_num + count)):
+            raise Exception("Invalid motion program, command numbers are not sequential")
+        params = run[:,2:].astype(np.float64)
+        batch_reader = _batch_command_readers.get(float(opcode), None) if use_batch else None
+        if batch_reader is not None:
+            cmds.append(batch_reader[1](batch_reader[0], params))
+            cmd_offsets.append(pos*4)
+        else:
+            cmds.extend(reader[1](cmd_cls, params))
+            cmd_offsets.extend(range(pos*4, (pos + count*row_len)*4, row_len*4))
+        cmd_num += count
+        pos += count*row_len
+
+    if first_cmd_num is None:
+        first_cmd_num = 1
+    return first_cmd_num, cmds, cmd_offsets
+
+def get_command_class(opcode: int) -> type:
+    """Return the command class for ``opcode``, or None if the opcode is unknown"""
+    reader = _command_readers.get(opcode, None)
+    if reader is None:
+        return None
+    return reader[0]
+
+def commands_from_params(opcode: int, params: np.ndarray) -> List[CommandBase]:
+    """
+    Create commands from an array of command parameters
+
+    :param opcode: The opcode of the commands
+    :param params: ``(N, command_params_count)`` float64 array of command parameters, in the same order as
+                   the binary motion program
+    :return: The commands
+    """
+    cmd_cls, reader = _command_readers[opcode]
+    return reader(cmd_cls, params)
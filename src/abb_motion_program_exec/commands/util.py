@@ -21,17 +21,21 @@ if TYPE_CHECKING:
     from .rapid_types import *
 
 _speeddata_struct_fmt = struct.Struct("<4f")
+def speeddata_to_nums(z: "speeddata"):
+    return [z.v_tcp, z.v_ori, z.v_leax, z.v_reax]
+
 def speeddata_to_bin(z: "speeddata"):
-    return _speeddata_struct_fmt.pack(
-        z.v_tcp, z.v_ori, z.v_leax, z.v_reax
-    )
+    return _speeddata_struct_fmt.pack(*speeddata_to_nums(z))
 
 _zonedata_struct_fmt = struct.Struct("<7f")
-def zonedata_to_bin(z: "zonedata"):
-    return _zonedata_struct_fmt.pack(
+def zonedata_to_nums(z: "zonedata"):
+    return [
         0.0 if not z.finep else 1.0,
         z.pzone_tcp, z.pzone_ori, z.pzone_eax, z.zone_ori, z.zone_leax, z.zone_reax
-    )
+    ]
+
+def zonedata_to_bin(z: "zonedata"):
+    return _zonedata_struct_fmt.pack(*zonedata_to_nums(z))
 
 def fix_array(arr, l):
     if isinstance(arr,list):
@@ -43,33 +47,43 @@ def fix_array(arr, l):
     if arr.shape == (l,1) or arr.shape == (1,l):
         return arr.flatten()
     raise Exception(f"Invalid array, expected array length {l}")
-        
+
+def fix_array_nums(arr, l) -> List[float]:
+    # Same checks as fix_array, but returns a list of numbers ready to pack without creating a temporary array
+    if isinstance(arr,(list,tuple)):
+        if not len(arr) == l:
+            raise Exception(f"Invalid array, expected array length {l}")
+        return arr
+    if arr.shape == (l,) or arr.shape == (l,1) or arr.shape == (1,l):
+        return arr.ravel().tolist()
+    raise Exception(f"Invalid array, expected array length {l}")
 
 _jointtarget_struct_fmt = struct.Struct("<12f")
+def jointtarget_to_nums(j: "jointtarget"):
+    return [*fix_array_nums(j.robax,6), *fix_array_nums(j.extax,6)]
+
 def jointtarget_to_bin(j: "jointtarget"):
-    r = fix_array(j.robax,6).tolist()
-    e = fix_array(j.extax,6).tolist()
-    return _jointtarget_struct_fmt.pack(*r, *e)
+    return _jointtarget_struct_fmt.pack(*jointtarget_to_nums(j))
 
 _pose_struct_fmt = struct.Struct("<7f")
+def pose_to_nums(p: "pose"):
+    return [*fix_array_nums(p.trans,3), *fix_array_nums(p.rot,4)]
+
 def pose_to_bin(p: "pose"):
-    p1 = fix_array(p.trans,3).tolist()
-    q = fix_array(p.rot,4).tolist()
-    return _pose_struct_fmt.pack(*p1,*q)
+    return _pose_struct_fmt.pack(*pose_to_nums(p))
 
 _confdata_struct_fmt = struct.Struct("<4f")
 def confdata_to_bin(c: "confdata"):
     return _confdata_struct_fmt.pack(c.cf1, c.cf4, c.cf6, c.cfx)
 
-_robtarget_extax_struct_fmt = struct.Struct("<6f")
+_robtarget_struct_fmt = struct.Struct("<17f")
+def robtarget_to_nums(r: "robtarget"):
+    c = r.robconf
+    return [*fix_array_nums(r.trans,3), *fix_array_nums(r.rot,4), c.cf1, c.cf4, c.cf6, c.cfx,
+        *fix_array_nums(r.extax,6)]
+
 def robtarget_to_bin(r: "robtarget"):
-    p1 = fix_array(r.trans,3).tolist()
-    q = fix_array(r.rot,4).tolist()
-    pose_bin = _pose_struct_fmt.pack(*p1,*q)
-    robconf_bin = confdata_to_bin(r.robconf)
-    extax = fix_array(r.extax,6).tolist()
-    extax_bin = _robtarget_extax_struct_fmt.pack(*extax)
-    return pose_bin + robconf_bin + extax_bin
+    return _robtarget_struct_fmt.pack(*robtarget_to_nums(r))
 
 _num_struct_fmt = struct.Struct("<f")
 def num_to_bin(f):
@@ -0,0 +1,351 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Union
+from abb_robot_client.rws import RWS
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, _get_motion_program_file, \
+    _unpack_motion_program_result_log, _adaptive_poll_delays
+from .job_queue import _normalize_job_programs
+
+# Time between execution state checks while waiting for the driver seqno signals
+_DRIVER_STATE_CHECK_PERIOD = 0.5
+
+def _get_driver_motion_program_file(path: str, motion_program: MotionProgram, task: str, seqno: int,
+    preempt_number: int = None):
+    # Driver mode filenames have the seqno appended, for example motion_program---seqno-5.bin or
+    # motion_program2_p1---seqno-5.bin. The seqno is also written to the program header, since the controller
+    # uses the header seqno for the preempt and log filenames.
+    filename, b = _get_motion_program_file(path, motion_program, task, preempt_number, seqno = seqno)
+    return f"{filename[:-4]}---seqno-{seqno}.bin", b
+
+def _get_driver_log_filename(path: str, seqno: int):
+    return f"{path}/log-motion_program---seqno-{seqno}.bin"
+
+def _get_driver_err_filename(path: str, seqno: int):
+    return f"{path}/motion_program_err---seqno-{seqno}.json"
+
+def _format_driver_error(seqno: int, err_bytes: bytes):
+    try:
+        err = json.loads(err_bytes.decode("ascii"))
+        return f"Motion Program seqno {seqno} failed with error code " \
+            f"{err['error_domain']*10000 + err['error_number']} error title '{err['error_title']}' " \
+            f"error string '{err['error_string']}'"
+    except Exception:
+        return f"Motion Program seqno {seqno} failed, see robot error log for details"
+
+class DriverProgramTiming(NamedTuple):
+    """
+    Latency of a motion program executed by :class:`MotionProgramDriverClient`. All times are in seconds.
+    """
+    seqno: int
+    """The seqno of the program"""
+    upload: float
+    """Time to serialize and upload the motion program files"""
+    queue: float
+    """Time waiting for the previous program to start and sending the seqno command"""
+    start_latency: float
+    """Time from sending the seqno command until the controller reported the program started"""
+    execution: float
+    """Time from the program starting until the controller reported the program complete"""
+    result_log: float
+    """Time to download and parse the result log"""
+    total: float
+    """Time from submitting the program until the result log was read"""
+
+class _DriverProgram:
+    def __init__(self, seqno: int):
+        self.seqno = seqno
+        self.filenames = []
+        self.t_submit = time.perf_counter()
+        self.t_uploaded = None
+        self.t_command = None
+        self.t_started = None
+        self.t_complete = None
+
+    def get_timing(self, t_end: float) -> DriverProgramTiming:
+        t_started = self.t_started if self.t_started is not None else self.t_command
+        t_complete = self.t_complete if self.t_complete is not None else t_end
+        return DriverProgramTiming(self.seqno, self.t_uploaded - self.t_submit, self.t_command - self.t_uploaded,
+            t_started - self.t_command, t_complete - t_started, t_end - t_complete, t_end - self.t_submit)
+
+class _DriverClientBase:
+    def __init__(self, timing_history: int):
+        self.timings: Deque[DriverProgramTiming] = deque(maxlen=timing_history)
+        """Latency of the most recently completed programs, oldest first"""
+        self._seqno = None
+        self._programs: Dict[int,_DriverProgram] = dict()
+        self._ramdisk = None
+
+    def _new_program(self) -> _DriverProgram:
+        if self._seqno is None:
+            raise Exception("Motion program driver has not been started")
+        self._seqno += 1
+        program = _DriverProgram(self._seqno)
+        self._programs[program.seqno] = program
+        return program
+
+    def _get_program(self, seqno: int) -> _DriverProgram:
+        if seqno is None:
+            if len(self._programs) == 0:
+                raise Exception("No motion program has been submitted")
+            seqno = min(self._programs)
+        program = self._programs.get(seqno, None)
+        if program is None:
+            raise Exception(f"Unknown motion program seqno {seqno}")
+        return program
+
+    def _update_started(self, started: float, t: float):
+        for program in self._programs.values():
+            if program.t_started is None and program.t_command is not None and program.seqno <= started:
+                program.t_started = t
+
+    def _update_complete(self, complete: float, t: float):
+        self._update_started(complete, t)
+        for program in self._programs.values():
+            if program.t_complete is None and program.seqno <= complete:
+                program.t_complete = t
+
+    def _finish_program(self, program: _DriverProgram):
+        self._programs.pop(program.seqno, None)
+        self.timings.append(program.get_timing(time.perf_counter()))
+
+class MotionProgramDriverClient(_DriverClientBase):
+    """
+    Client to execute motion programs using the driver mode of the RAPID modules. In driver mode, the RAPID task
+    is started once and keeps running between programs. Each program is uploaded with its seqno in the filename,
+    and started by setting the ``motion_program_seqno_command`` signal. The controller reports progress using the
+    ``motion_program_seqno_started`` and ``motion_program_seqno_complete`` signals, so programs can be submitted
+    back to back without stopping and restarting RAPID, and without reading the event log.
+
+    The controller only runs the most recent seqno command, so a program is only commanded after the previous
+    program has started. ``submit_motion_program()`` uploads the program immediately, and waits for the previous
+    program to start if necessary. Submitting the next program while the current program is running executes it
+    without a gap.
+
+    Driver mode must be enabled on the controller by setting ``MOTION_PROGRAM_DRIVER_MODE`` to 1 in
+    ``motion_program_exec.mod``.
+
+    :ivar abb_client: Instance of ``abb_robot_client.rws.RWS`` used execute commands
+
+    :param base_url: Base URL of the robot. See :class:`MotionProgramExecClient`
+    :param username: The HTTP username for the robot. Defaults to 'Default User'
+    :param password: The HTTP password for the robot. Defaults to 'robotics'
+    :param timing_history: The number of program timings to keep in ``timings``
+    """
+    def __init__(self, base_url='http://127.0.0.1:80', username='Default User', password='robotics', abb_client = None,
+        timing_history: int = 100):
+        super().__init__(timing_history)
+        if abb_client is None:
+            self.abb_client: RWS = RWS(base_url, username, password)
+        else:
+            self.abb_client: RWS = abb_client
+
+    def _get_ramdisk(self):
+        if self._ramdisk is None:
+            self._ramdisk = self.abb_client.get_ramdisk_path()
+        return self._ramdisk
+
+    def start_driver(self, tasks: List[str] = None):
+        """
+        Start the RAPID tasks in driver mode if they are not already running. The tasks are started with
+        ``cycle='forever'``, so RAPID restarts the driver loop after each program.
+
+        :param tasks: The RAPID tasks to start. Defaults to ``T_ROB1``
+        """
+        if tasks is None:
+            tasks = ["T_ROB1"]
+        exec_state = self.abb_client.get_execution_state()
+        if exec_state.ctrlexecstate != "running":
+            ctrl_state = self.abb_client.get_controller_state()
+            if not ctrl_state == "motoron":
+                raise Exception("Controller must be motoron to start motion program driver")
+            self.abb_client.resetpp()
+            self.abb_client.set_digital_io("motion_program_driver_abort", 0)
+            self.abb_client.start(cycle='forever', tasks=tasks)
+        self._seqno = int(max(self.abb_client.get_analog_io("motion_program_seqno_command"),
+            self.abb_client.get_analog_io("motion_program_seqno_started"),
+            self.abb_client.get_analog_io("motion_program_seqno_complete")))
+        self._programs.clear()
+
+    def stop_driver(self):
+        """Stop the RAPID tasks. Programs that have not completed are stopped"""
+        self.abb_client.stop()
+        self._programs.clear()
+
+    def is_driver_running(self) -> bool:
+        """Returns True if the RAPID tasks are running"""
+        return self.abb_client.get_execution_state().ctrlexecstate == "running"
+
+    def submit_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None) -> int:
+        """
+        Upload a motion program and command the driver to execute it. Returns once the seqno command has been
+        sent. Use :meth:`read_motion_program_result_log()` to wait for the program to complete.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system. Defaults to ``T_ROB1``, or
+                     ``T_ROBn`` for a list of motion programs
+        :return: The seqno of the program
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        program = self._new_program()
+        ramdisk = self._get_ramdisk()
+        for mp, task1 in zip(motion_programs, tasks):
+            filename, b = _get_driver_motion_program_file(ramdisk, mp, task1, program.seqno)
+            self.abb_client.upload_file(filename, b)
+            program.filenames.append(filename)
+        program.t_uploaded = time.perf_counter()
+        if program.seqno - 1 in self._programs:
+            self._wait_seqno("motion_program_seqno_started", program.seqno - 1)
+        self.abb_client.set_analog_io("motion_program_seqno_command", program.seqno)
+        program.t_command = time.perf_counter()
+        return program.seqno
+
+    def execute_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None) -> MotionProgramResultLog:
+        """
+        Execute a motion program and wait for the result log. Same as :meth:`submit_motion_program()` followed by
+        :meth:`read_motion_program_result_log()`.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system
+        :return: The result log
+        """
+        seqno = self.submit_motion_program(motion_program, task)
+        return self.read_motion_program_result_log(seqno)
+
+    def preempt_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None, preempt_number: int = 1, preempt_cmdnum: int = -1, seqno: int = None):
+        """
+        Preempt a running motion program. See :meth:`MotionProgramExecClient.preempt_motion_program()`.
+
+        :param motion_program: The new motion program, or a list of motion programs for a MultiMove system
+        :param task: The task to preempt, or list of tasks for a MultiMove system
+        :param preempt_number: The number of the preemption. The first preemption should set this to 1
+        :param preempt_cmdnum: The command number to switch to the new motion program
+        :param seqno: The seqno of the running program. Defaults to the seqno reported started by the controller
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        if seqno is None:
+            seqno = int(self.abb_client.get_analog_io("motion_program_seqno_started"))
+        ramdisk = self._get_ramdisk()
+        program = self._programs.get(seqno, None)
+        for mp, task1 in zip(motion_programs, tasks):
+            filename, b = _get_driver_motion_program_file(ramdisk, mp, task1, seqno, preempt_number)
+            self.abb_client.upload_file(filename, b)
+            if program is not None:
+                program.filenames.append(filename)
+        self.abb_client.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+        self.abb_client.set_analog_io("motion_program_preempt", preempt_number)
+
+    def _wait_seqno(self, signal: str, seqno: int):
+        t_check = time.perf_counter() + _DRIVER_STATE_CHECK_PERIOD
+        for delay in _adaptive_poll_delays():
+            val = self.abb_client.get_analog_io(signal)
+            t = time.perf_counter()
+            if signal == "motion_program_seqno_started":
+                self._update_started(val, t)
+            else:
+                self._update_complete(val, t)
+            if val >= seqno:
+                return
+            if t > t_check:
+                if not self.is_driver_running():
+                    raise Exception(f"Motion program driver stopped while waiting for seqno {seqno}")
+                t_check = t + _DRIVER_STATE_CHECK_PERIOD
+            time.sleep(delay)
+
+    def wait_motion_program_complete(self, seqno: int = None):
+        """
+        Wait for a motion program to complete. Raises an exception if the program failed.
+
+        :param seqno: The seqno of the program. Defaults to the oldest program that has not been read
+        """
+        program = self._get_program(seqno)
+        if program.t_complete is None:
+            self._wait_seqno("motion_program_seqno_started", program.seqno)
+            self._wait_seqno("motion_program_seqno_complete", program.seqno)
+        # A failed program sets seqno_complete and then stops the task
+        if not self.is_driver_running():
+            self._raise_program_error(program)
+
+    def _raise_program_error(self, program: _DriverProgram):
+        ramdisk = self._get_ramdisk()
+        try:
+            err_bytes = self.abb_client.read_file(_get_driver_err_filename(ramdisk, program.seqno))
+        except Exception:
+            err_bytes = b""
+        self._finish_program(program)
+        self._delete_files(program.filenames + [_get_driver_err_filename(ramdisk, program.seqno),
+            _get_driver_log_filename(ramdisk, program.seqno)])
+        raise Exception(_format_driver_error(program.seqno, err_bytes))
+
+    def _delete_files(self, filenames: List[str]):
+        for filename in filenames:
+            try:
+                self.abb_client.delete_file(filename)
+            except Exception:
+                pass
+
+    def read_motion_program_result_log(self, seqno: int = None) -> MotionProgramResultLog:
+        """
+        Wait for a motion program to complete and read the result log. The uploaded program files and the
+        log file are deleted from the controller.
+
+        :param seqno: The seqno of the program. Defaults to the oldest program that has not been read
+        :return: The result log
+        """
+        program = self._get_program(seqno)
+        self.wait_motion_program_complete(program.seqno)
+        ramdisk = self._get_ramdisk()
+        log_filename = _get_driver_log_filename(ramdisk, program.seqno)
+        try:
+            log_contents = self.abb_client.read_file(log_filename)
+        except Exception:
+            # The task may not have stopped yet when the program failed
+            if not self.is_driver_running():
+                self._raise_program_error(program)
+            self._finish_program(program)
+            raise
+        self._finish_program(program)
+        self._delete_files([log_filename] + program.filenames)
+        return _unpack_motion_program_result_log(log_contents)
+
+    def abort_motion_program(self):
+        """
+        Abort the running motion program using the ``motion_program_driver_abort`` signal. The driver keeps
+        running and waits for the next program.
+        """
+        # Withdraw the command of a program that has not started, so the driver does not run it after the abort
+        started = self.abb_client.get_analog_io("motion_program_seqno_started")
+        self.abb_client.set_analog_io("motion_program_seqno_command", started)
+        started = self.abb_client.get_analog_io("motion_program_seqno_started")
+        self.abb_client.set_digital_io("motion_program_driver_abort", 1)
+        try:
+            if started > self.abb_client.get_analog_io("motion_program_seqno_complete"):
+                self._wait_seqno("motion_program_seqno_complete", started)
+        finally:
+            self.abb_client.set_digital_io("motion_program_driver_abort", 0)
+        for program in list(self._programs.values()):
+            if program.seqno > started:
+                self._programs.pop(program.seqno)
+                self._delete_files(program.filenames)
+
+    def stop_egm(self):
+        """Stop a long running EGM command. This will cause the program to complete normally"""
+        self.abb_client.set_digital_io("motion_program_stop_egm", 1)
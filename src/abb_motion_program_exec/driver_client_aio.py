@@ -0,0 +1,241 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from typing import List, Union
+from abb_robot_client.rws_aio import RWS_AIO
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, \
+    _unpack_motion_program_result_log, _adaptive_poll_delays
+from .driver_client import _DriverClientBase, _DriverProgram, _get_driver_motion_program_file, \
+    _get_driver_log_filename, _get_driver_err_filename, _format_driver_error, _DRIVER_STATE_CHECK_PERIOD
+from .job_queue import _normalize_job_programs
+
+class MotionProgramDriverClientAIO(_DriverClientBase):
+    """
+    Client to execute motion programs using the driver mode of the RAPID modules using AsyncIO
+
+    This class is functionally identical to :class:`abb_motion_program_exec.driver_client.MotionProgramDriverClient`
+    except it uses AsyncIO instead of synchronous blocking operations.
+
+    :ivar abb_client_aio: Instance of ``abb_robot_client.rws_aio.RWS_AIO`` used execute commands
+
+    :param base_url: Base URL of the robot. See :class:`MotionProgramExecClient`
+    :param username: The HTTP username for the robot. Defaults to 'Default User'
+    :param password: The HTTP password for the robot. Defaults to 'robotics'
+    :param timing_history: The number of program timings to keep in ``timings``
+    """
+    def __init__(self, base_url='http://127.0.0.1:80', username='Default User', password='robotics',
+        abb_client_aio = None, timing_history: int = 100):
+        super().__init__(timing_history)
+        if abb_client_aio is None:
+            self.abb_client_aio = RWS_AIO(base_url, username, password)
+        else:
+            self.abb_client_aio = abb_client_aio
+
+    async def _get_ramdisk(self):
+        if self._ramdisk is None:
+            self._ramdisk = await self.abb_client_aio.get_ramdisk_path()
+        return self._ramdisk
+
+    async def start_driver(self, tasks: List[str] = None):
+        """
+        Start the RAPID tasks in driver mode if they are not already running. The tasks are started with
+        ``cycle='forever'``, so RAPID restarts the driver loop after each program.
+
+        :param tasks: The RAPID tasks to start. Defaults to ``T_ROB1``
+        """
+        if tasks is None:
+            tasks = ["T_ROB1"]
+        exec_state = await self.abb_client_aio.get_execution_state()
+        if exec_state.ctrlexecstate != "running":
+            ctrl_state = await self.abb_client_aio.get_controller_state()
+            if not ctrl_state == "motoron":
+                raise Exception("Controller must be motoron to start motion program driver")
+            await self.abb_client_aio.resetpp()
+            await self.abb_client_aio.set_digital_io("motion_program_driver_abort", 0)
+            await self.abb_client_aio.start(cycle='forever', tasks=tasks)
+        self._seqno = int(max(await self.abb_client_aio.get_analog_io("motion_program_seqno_command"),
+            await self.abb_client_aio.get_analog_io("motion_program_seqno_started"),
+            await self.abb_client_aio.get_analog_io("motion_program_seqno_complete")))
+        self._programs.clear()
+
+    async def stop_driver(self):
+        """Stop the RAPID tasks. Programs that have not completed are stopped"""
+        await self.abb_client_aio.stop()
+        self._programs.clear()
+
+    async def is_driver_running(self) -> bool:
+        """Returns True if the RAPID tasks are running"""
+        return (await self.abb_client_aio.get_execution_state()).ctrlexecstate == "running"
+
+    async def submit_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None) -> int:
+        """
+        Upload a motion program and command the driver to execute it. Returns once the seqno command has been
+        sent. Use :meth:`read_motion_program_result_log()` to wait for the program to complete.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system. Defaults to ``T_ROB1``, or
+                     ``T_ROBn`` for a list of motion programs
+        :return: The seqno of the program
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        program = self._new_program()
+        ramdisk = await self._get_ramdisk()
+        for mp, task1 in zip(motion_programs, tasks):
+            filename, b = _get_driver_motion_program_file(ramdisk, mp, task1, program.seqno)
+            await self.abb_client_aio.upload_file(filename, b)
+            program.filenames.append(filename)
+        program.t_uploaded = time.perf_counter()
+        if program.seqno - 1 in self._programs:
+            await self._wait_seqno("motion_program_seqno_started", program.seqno - 1)
+        await self.abb_client_aio.set_analog_io("motion_program_seqno_command", program.seqno)
+        program.t_command = time.perf_counter()
+        return program.seqno
+
+    async def execute_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None) -> MotionProgramResultLog:
+        """
+        Execute a motion program and wait for the result log. Same as :meth:`submit_motion_program()` followed by
+        :meth:`read_motion_program_result_log()`.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system
+        :return: The result log
+        """
+        seqno = await self.submit_motion_program(motion_program, task)
+        return await self.read_motion_program_result_log(seqno)
+
+    async def preempt_motion_program(self, motion_program: Union[MotionProgram,List[MotionProgram]],
+        task: Union[str,List[str]] = None, preempt_number: int = 1, preempt_cmdnum: int = -1, seqno: int = None):
+        """
+        Preempt a running motion program. See :meth:`MotionProgramExecClient.preempt_motion_program()`.
+
+        :param motion_program: The new motion program, or a list of motion programs for a MultiMove system
+        :param task: The task to preempt, or list of tasks for a MultiMove system
+        :param preempt_number: The number of the preemption. The first preemption should set this to 1
+        :param preempt_cmdnum: The command number to switch to the new motion program
+        :param seqno: The seqno of the running program. Defaults to the seqno reported started by the controller
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        if seqno is None:
+            seqno = int(await self.abb_client_aio.get_analog_io("motion_program_seqno_started"))
+        ramdisk = await self._get_ramdisk()
+        program = self._programs.get(seqno, None)
+        for mp, task1 in zip(motion_programs, tasks):
+            filename, b = _get_driver_motion_program_file(ramdisk, mp, task1, seqno, preempt_number)
+            await self.abb_client_aio.upload_file(filename, b)
+            if program is not None:
+                program.filenames.append(filename)
+        await self.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", preempt_cmdnum)
+        await self.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
+
+    async def _wait_seqno(self, signal: str, seqno: int):
+        t_check = time.perf_counter() + _DRIVER_STATE_CHECK_PERIOD
+        for delay in _adaptive_poll_delays():
+            val = await self.abb_client_aio.get_analog_io(signal)
+            t = time.perf_counter()
+            if signal == "motion_program_seqno_started":
+                self._update_started(val, t)
+            else:
+                self._update_complete(val, t)
+            if val >= seqno:
+                return
+            if t > t_check:
+                if not await self.is_driver_running():
+                    raise Exception(f"Motion program driver stopped while waiting for seqno {seqno}")
+                t_check = t + _DRIVER_STATE_CHECK_PERIOD
+            await asyncio.sleep(delay)
+
+    async def wait_motion_program_complete(self, seqno: int = None):
+        """
+        Wait for a motion program to complete. Raises an exception if the program failed.
+
+        :param seqno: The seqno of the program. Defaults to the oldest program that has not been read
+        """
+        program = self._get_program(seqno)
+        if program.t_complete is None:
+            await self._wait_seqno("motion_program_seqno_started", program.seqno)
+            await self._wait_seqno("motion_program_seqno_complete", program.seqno)
+        # A failed program sets seqno_complete and then stops the task
+        if not await self.is_driver_running():
+            await self._raise_program_error(program)
+
+    async def _raise_program_error(self, program: _DriverProgram):
+        ramdisk = await self._get_ramdisk()
+        try:
+            err_bytes = await self.abb_client_aio.read_file(_get_driver_err_filename(ramdisk, program.seqno))
+        except Exception:
+            err_bytes = b""
+        self._finish_program(program)
+        await self._delete_files(program.filenames + [_get_driver_err_filename(ramdisk, program.seqno),
+            _get_driver_log_filename(ramdisk, program.seqno)])
+        raise Exception(_format_driver_error(program.seqno, err_bytes))
+
+    async def _delete_files(self, filenames: List[str]):
+        for filename in filenames:
+            try:
+                await self.abb_client_aio.delete_file(filename)
+            except Exception:
+                pass
+
+    async def read_motion_program_result_log(self, seqno: int = None) -> MotionProgramResultLog:
+        """
+        Wait for a motion program to complete and read the result log. The uploaded program files and the
+        log file are deleted from the controller.
+
+        :param seqno: The seqno of the program. Defaults to the oldest program that has not been read
+        :return: The result log
+        """
+        program = self._get_program(seqno)
+        await self.wait_motion_program_complete(program.seqno)
+        ramdisk = await self._get_ramdisk()
+        log_filename = _get_driver_log_filename(ramdisk, program.seqno)
+        try:
+            log_contents = await self.abb_client_aio.read_file(log_filename)
+        except Exception:
+            # The task may not have stopped yet when the program failed
+            if not await self.is_driver_running():
+                await self._raise_program_error(program)
+            self._finish_program(program)
+            raise
+        self._finish_program(program)
+        await self._delete_files([log_filename] + program.filenames)
+        return _unpack_motion_program_result_log(log_contents)
+
+    async def abort_motion_program(self):
+        """
+        Abort the running motion program using the ``motion_program_driver_abort`` signal. The driver keeps
+        running and waits for the next program.
+        """
+        # Withdraw the command of a program that has not started, so the driver does not run it after the abort
+        started = await self.abb_client_aio.get_analog_io("motion_program_seqno_started")
+        await self.abb_client_aio.set_analog_io("motion_program_seqno_command", started)
+        started = await self.abb_client_aio.get_analog_io("motion_program_seqno_started")
+        await self.abb_client_aio.set_digital_io("motion_program_driver_abort", 1)
+        try:
+            if started > await self.abb_client_aio.get_analog_io("motion_program_seqno_complete"):
+                await self._wait_seqno("motion_program_seqno_complete", started)
+        finally:
+            await self.abb_client_aio.set_digital_io("motion_program_driver_abort", 0)
+        for program in list(self._programs.values()):
+            if program.seqno > started:
+                self._programs.pop(program.seqno)
+                await self._delete_files(program.filenames)
+
+    async def stop_egm(self):
+        """Stop a long running EGM command. This will cause the program to complete normally"""
+        await self.abb_client_aio.set_digital_io("motion_program_stop_egm", 1)
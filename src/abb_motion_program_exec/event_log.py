@@ -0,0 +1,246 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from typing import Dict, List
+from abb_robot_client.rws import EventLogEntry
+
+MOTION_PROGRAM_EVENT_CODE = 80003
+"""Event log code used by the motion program RAPID modules for log file messages"""
+
+def seqnum_after(seqnum: int, prev_seqnum: int) -> bool:
+    """
+    Returns True if event log ``seqnum`` is newer than ``prev_seqnum``. Event log sequence numbers are 16 bit
+    unsigned integers that wrap around.
+    """
+    d = (seqnum - prev_seqnum) & 0xFFFF
+    return 0 < d < 0x8000
+
+def _parse_event_log_entries(res_json) -> List[EventLogEntry]:
+    # Same format as RWS.read_event_log()
+    o = []
+    for s in res_json["_embedded"]["_state"]:
+        seqnum = int(s["_title"].split("/")[-1])
+        tstamp = datetime.datetime.strptime(s["tstamp"], '%Y-%m-%d T  %H:%M:%S')
+        args = []
+        if "argv" in s:
+            for arg in s["argv"]:
+                args.append(arg["value"])
+        o.append(EventLogEntry(seqnum, int(s["msgtype"]), int(s["code"]), tstamp, args, s["title"], s["desc"],
+            s["conseqs"], s["causes"], s["actions"]))
+    return o
+
+def index_entries_by_code(entries: List[EventLogEntry]) -> Dict[int,List[EventLogEntry]]:
+    """Group event log entries by code, keeping the order of ``entries``"""
+    ret = dict()
+    for e in entries:
+        ret.setdefault(e.code, []).append(e)
+    return ret
+
+class _EventLogRead:
+    # Paging state of one read_after() call. The sync and AsyncIO cursors request the pages, and this class merges
+    # them. Pages start with the newest entry, and the page size doubles until an entry at or before prev_seqnum
+    # is found.
+    def __init__(self, prev_seqnum: int, page_size: int):
+        self.prev_seqnum = prev_seqnum
+        self.entries: List[EventLogEntry] = []
+        self.start = 0
+        self.limit = page_size
+        self._seen = set()
+
+    def add_page(self, page: List[EventLogEntry]) -> bool:
+        # Add the entries newer than prev_seqnum. Returns True if older pages must be read.
+        for e in page:
+            if not seqnum_after(e.seqnum, self.prev_seqnum):
+                return False
+            # Entries may shift between pages if new entries are added while reading
+            if e.seqnum not in self._seen:
+                self._seen.add(e.seqnum)
+                self.entries.append(e)
+        # A short page is the end of the log. A long page means the controller ignored the page parameters and
+        # returned the whole log.
+        if len(page) != self.limit:
+            return False
+        self.start += len(page)
+        self.limit *= 2
+        return True
+
+class _EventLogCursorBase:
+    def __init__(self, elog: int, page_size: int):
+        self.elog = elog
+        self.page_size = page_size
+        self.seqnum = None
+        """The sequence number of the newest entry read by the cursor, or None if the cursor has not been reset"""
+        self.entries_by_code: Dict[int,List[EventLogEntry]] = dict()
+        """The entries returned by the last read, indexed by code. Use ``MOTION_PROGRAM_EVENT_CODE`` to get the
+        messages of the motion program RAPID modules"""
+        self._paging_supported = True
+
+    def _page_url(self, start: int, limit: int):
+        return f"rw/elog/{self.elog}/?lang=en&start={start}&limit={limit}"
+
+    def _disable_paging(self, read: _EventLogRead) -> bool:
+        # Only a failure of the first page request means the controller does not support paging
+        if read.start > 0:
+            return False
+        self._paging_supported = False
+        return True
+
+    def _finish_reset(self, page: List[EventLogEntry]) -> int:
+        self.seqnum = page[0].seqnum
+        self.entries_by_code = dict()
+        return self.seqnum
+
+    def _finish_read(self, entries: List[EventLogEntry], prev_seqnum: int) -> List[EventLogEntry]:
+        self.seqnum = entries[0].seqnum if len(entries) > 0 else prev_seqnum
+        self.entries_by_code = index_entries_by_code(entries)
+        return entries
+
+    def _finish_full_log_read(self, log: List[EventLogEntry], prev_seqnum: int) -> List[EventLogEntry]:
+        # Used when the controller does not support paging and the whole log was read
+        entries = []
+        for e in log:
+            if not seqnum_after(e.seqnum, prev_seqnum):
+                break
+            entries.append(e)
+        return self._finish_read(entries, prev_seqnum)
+
+class EventLogCursor(_EventLogCursorBase):
+    """
+    Incremental reader for the controller event log. The cursor remembers the sequence number of the newest
+    entry it has read, and only requests entries that are newer. Entries are requested from the controller in
+    pages starting with the newest entry, so reading the entries generated by a motion program normally takes a
+    single small request instead of downloading the whole event log. If the controller does not support
+    paging, the whole event log is read instead.
+
+    Entries are returned newest first, the same order as ``RWS.read_event_log()``.
+
+    :param abb_client: The RWS client
+    :param elog: The event log domain to read
+    :param page_size: The number of entries to request at a time
+    """
+    def __init__(self, abb_client, elog: int = 0, page_size: int = 16):
+        super().__init__(elog, page_size)
+        self.abb_client = abb_client
+
+    def _read_page(self, start: int, limit: int) -> List[EventLogEntry]:
+        return _parse_event_log_entries(self.abb_client._do_get(self._page_url(start, limit)))
+
+    def reset(self) -> int:
+        """
+        Move the cursor to the newest entry in the event log.
+
+        :return: The sequence number of the newest entry
+        """
+        if self._paging_supported:
+            try:
+                page = self._read_page(0, 1)
+            except Exception:
+                self._paging_supported = False
+        if not self._paging_supported:
+            page = self.abb_client.read_event_log(self.elog)
+        return self._finish_reset(page)
+
+    def read_after(self, prev_seqnum: int) -> List[EventLogEntry]:
+        """
+        Read the entries newer than ``prev_seqnum``, and move the cursor to the newest entry.
+
+        :param prev_seqnum: The sequence number of the last entry that should not be returned
+        :return: The entries, newest first
+        """
+        if not self._paging_supported:
+            return self._finish_full_log_read(self.abb_client.read_event_log(self.elog), prev_seqnum)
+        read = _EventLogRead(prev_seqnum, self.page_size)
+        while True:
+            try:
+                page = self._read_page(read.start, read.limit)
+            except Exception:
+                if not self._disable_paging(read):
+                    raise
+                return self.read_after(prev_seqnum)
+            if not read.add_page(page):
+                return self._finish_read(read.entries, prev_seqnum)
+
+    def read_new(self) -> List[EventLogEntry]:
+        """
+        Read the entries added since the last read. The cursor is reset if it has not been used before.
+
+        :return: The entries, newest first
+        """
+        if self.seqnum is None:
+            self.reset()
+            return []
+        return self.read_after(self.seqnum)
+
+class EventLogCursorAIO(_EventLogCursorBase):
+    """
+    Incremental reader for the controller event log using AsyncIO. See :class:`EventLogCursor`.
+
+    :param abb_client_aio: The RWS_AIO client
+    :param elog: The event log domain to read
+    :param page_size: The number of entries to request at a time
+    """
+    def __init__(self, abb_client_aio, elog: int = 0, page_size: int = 16):
+        super().__init__(elog, page_size)
+        self.abb_client_aio = abb_client_aio
+
+    async def _read_page(self, start: int, limit: int) -> List[EventLogEntry]:
+        return _parse_event_log_entries(await self.abb_client_aio._do_get(self._page_url(start, limit)))
+
+    async def reset(self) -> int:
+        """
+        Move the cursor to the newest entry in the event log.
+
+        :return: The sequence number of the newest entry
+        """
+        if self._paging_supported:
+            try:
+                page = await self._read_page(0, 1)
+            except Exception:
+                self._paging_supported = False
+        if not self._paging_supported:
+            page = await self.abb_client_aio.read_event_log(self.elog)
+        return self._finish_reset(page)
+
+    async def read_after(self, prev_seqnum: int) -> List[EventLogEntry]:
+        """
+        Read the entries newer than ``prev_seqnum``, and move the cursor to the newest entry.
+
+        :param prev_seqnum: The sequence number of the last entry that should not be returned
+        :return: The entries, newest first
+        """
+        if not self._paging_supported:
+            return self._finish_full_log_read(await self.abb_client_aio.read_event_log(self.elog), prev_seqnum)
+        read = _EventLogRead(prev_seqnum, self.page_size)
+        while True:
+            try:
+                page = await self._read_page(read.start, read.limit)
+            except Exception:
+                if not self._disable_paging(read):
+                    raise
+                return await self.read_after(prev_seqnum)
+            if not read.add_page(page):
+                return self._finish_read(read.entries, prev_seqnum)
+
+    async def read_new(self) -> List[EventLogEntry]:
+        """
+        Read the entries added since the last read. The cursor is reset if it has not been used before.
+
+        :return: The entries, newest first
+        """
+        if self.seqnum is None:
+            await self.reset()
+            return []
+        return await self.read_after(self.seqnum)
@@ -0,0 +1,181 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, NamedTuple, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog
+from .abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from .call_timing import MotionProgramCallTiming
+
+class FleetResult(NamedTuple):
+    """Result of one motion program executed by :class:`FleetExecutor`"""
+    controller: str
+    """The name of the controller"""
+    index: int
+    """The index of the program in the program list of the controller"""
+    result_log: MotionProgramResultLog
+    """The result log, or None if the program failed"""
+    error: Exception
+    """The exception if the program failed or was skipped, or None"""
+    duration: float
+    """Time from starting to upload the program until the result log was read, in seconds"""
+    timings: List[MotionProgramCallTiming]
+    """Timing records of the client calls made for the program"""
+
+class FleetControllerMetrics:
+    """Totals for one controller of a :class:`FleetExecutor`, updated as programs complete"""
+    def __init__(self):
+        self.completed = 0
+        """Number of programs completed"""
+        self.failed = 0
+        """Number of programs that failed or were skipped"""
+        self.busy_time = 0.0
+        """Total time spent executing programs, in seconds"""
+        self.rws_requests = 0
+        """Number of RWS requests"""
+        self.bytes_uploaded = 0
+        """Number of bytes sent to the controller"""
+        self.bytes_downloaded = 0
+        """Number of bytes received from the controller"""
+
+    def _add(self, res: FleetResult):
+        if res.error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.busy_time += res.duration
+        for t in res.timings:
+            self.rws_requests += t.rws_requests
+            self.bytes_uploaded += t.bytes_uploaded
+            self.bytes_downloaded += t.bytes_downloaded
+
+class FleetExecutor:
+    """
+    Execute motion programs on many controllers concurrently from one asyncio event loop using
+    :class:`MotionProgramExecClientAIO`.
+
+    Programs are executed in order on each controller, and the controllers run independently. The upload and
+    start step and the result log download step of each program are limited to ``max_concurrency`` controllers
+    at a time, so a large fleet does not flood the network or the host. Waiting for programs to complete is not
+    limited, since it only polls the execution state.
+
+    ``run()`` yields a :class:`FleetResult` for each program as it finishes. Totals for each controller are kept in
+    ``metrics``.
+
+    :param controllers: Mapping of controller name to a base URL or a ``MotionProgramExecClientAIO``
+    :param max_concurrency: Maximum number of controllers uploading, starting, or downloading at a time
+    :param stop_on_error: Skip the remaining programs of a controller if a program fails. Other controllers
+                          continue
+    :param username: The HTTP username used for controllers specified by URL
+    :param password: The HTTP password used for controllers specified by URL
+    """
+    def __init__(self, controllers: Dict[str,Union[str,MotionProgramExecClientAIO]], max_concurrency: int = 8,
+        stop_on_error: bool = True, username: str = 'Default User', password: str = 'robotics'):
+        self.clients: Dict[str,MotionProgramExecClientAIO] = dict()
+        """The client of each controller"""
+        for name, c in controllers.items():
+            if isinstance(c, str):
+                c = MotionProgramExecClientAIO(base_url=c, username=username, password=password)
+            self.clients[name] = c
+        self.max_concurrency = max_concurrency
+        self.stop_on_error = stop_on_error
+        self.metrics: Dict[str,FleetControllerMetrics] = {name: FleetControllerMetrics() for name in self.clients}
+        """Totals of each controller"""
+
+    async def run(self, programs: Dict[str,List[Union[MotionProgram,List[MotionProgram]]]],
+        tasks: Dict[str,Union[str,List[str]]] = None) -> AsyncIterator[FleetResult]:
+        """
+        Execute programs on the controllers, yielding results as programs finish.
+
+        :param programs: Mapping of controller name to the list of programs to execute in order. A list of motion
+                         programs executes a MultiMove program
+        :param tasks: Optional mapping of controller name to the RAPID task, or list of tasks for MultiMove
+        :return: Async iterator of the results
+        """
+        for name in programs:
+            if name not in self.clients:
+                raise Exception(f"Unknown controller {name}")
+        if tasks is None:
+            tasks = dict()
+        results = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        runners = [asyncio.ensure_future(self._run_controller(name, list(p), tasks.get(name, None), semaphore,
+            results)) for name, p in programs.items()]
+        remaining = sum(len(p) for p in programs.values())
+        try:
+            while remaining > 0:
+                res = await results.get()
+                remaining -= 1
+                yield res
+            await asyncio.gather(*runners)
+        finally:
+            for r in runners:
+                r.cancel()
+
+    async def run_all(self, programs: Dict[str,List[Union[MotionProgram,List[MotionProgram]]]],
+        tasks: Dict[str,Union[str,List[str]]] = None) -> Dict[str,List[FleetResult]]:
+        """
+        Execute programs on the controllers and wait for all of them to finish. See :meth:`run()`.
+
+        :return: Mapping of controller name to the results, in program order
+        """
+        ret = {name: [None]*len(p) for name, p in programs.items()}
+        async for res in self.run(programs, tasks):
+            ret[res.controller][res.index] = res
+        return ret
+
+    async def _run_controller(self, name: str, programs: list, task, semaphore: asyncio.Semaphore,
+        results: asyncio.Queue):
+        client = self.clients[name]
+        error = None
+        for i, mp in enumerate(programs):
+            if error is not None:
+                res = FleetResult(name, i, None, error, 0.0, [])
+            else:
+                res = await self._execute(client, name, i, mp, task, semaphore)
+                if res.error is not None and self.stop_on_error:
+                    error = Exception(f"Skipped after program {i} failed on controller {name}: {res.error}")
+            self.metrics[name]._add(res)
+            results.put_nowait(res)
+
+    async def _execute(self, client: MotionProgramExecClientAIO, name: str, index: int, mp, task,
+        semaphore: asyncio.Semaphore) -> FleetResult:
+        timings = []
+        last_timing = client.last_timing
+        def _add_timing():
+            nonlocal last_timing
+            if client.last_timing is not last_timing:
+                last_timing = client.last_timing
+                timings.append(last_timing)
+        t0 = time.perf_counter()
+        try:
+            async with semaphore:
+                if isinstance(mp, MotionProgram):
+                    prev_seqnum = await client.execute_motion_program(mp, task or "T_ROB1", wait=False)
+                else:
+                    prev_seqnum = await client.execute_multimove_motion_program(mp, task, wait=False)
+            _add_timing()
+            await client.wait_motion_program_complete()
+            _add_timing()
+            async with semaphore:
+                result_log = await client.read_motion_program_result_log(prev_seqnum)
+            _add_timing()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _add_timing()
+            return FleetResult(name, index, None, e, time.perf_counter() - t0, timings)
+        return FleetResult(name, index, result_log, None, time.perf_counter() - t0, timings)
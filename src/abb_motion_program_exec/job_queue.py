@@ -0,0 +1,252 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import queue
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Union
+from abb_robot_client.rws import RWS
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramExecClient, MotionProgramResultLog, \
+    _get_motion_program_file, _get_result_log_filename, _unpack_motion_program_result_log
+from . import upload_cache as _upload_cache
+from .call_timing import _TimedCall, _timing_phase
+from .event_log import EventLogCursor
+
+def _normalize_job_programs(motion_programs, tasks):
+    if isinstance(motion_programs, MotionProgram):
+        motion_programs = [motion_programs]
+        if tasks is None:
+            tasks = ["T_ROB1"]
+        elif isinstance(tasks, str):
+            tasks = [tasks]
+    if tasks is None:
+        tasks = [f"T_ROB{i+1}" for i in range(len(motion_programs))]
+    if not len(motion_programs) == len(tasks):
+        raise Exception("Motion program list and task list must have some length")
+    return list(motion_programs), list(tasks)
+
+def _new_rws(rws: RWS) -> RWS:
+    # requests.Session should not be shared between threads, so each thread of the queue uses its own RWS client
+    return RWS(rws.base_url, rws.auth.username, rws.auth.password)
+
+def _get_staged_filename(filename: str, job_id: int):
+    # Programs are uploaded under a separate name, since the controller reads the fixed filename while the
+    # previous program is running
+    assert filename.endswith(".bin")
+    return f"{filename[:-4]}-job{job_id}.bin"
+
+class _Job:
+    def __init__(self, job_id, motion_programs, tasks, seqno):
+        self.job_id = job_id
+        self.motion_programs = motion_programs
+        self.tasks = tasks
+        self.seqno = seqno
+        self.future = Future()
+        self.filenames = None
+        self.program_bytes = None
+        self.staged = None
+        self.staged_filenames = None
+        self.prev_seqnum = None
+
+class MotionProgramJobQueue:
+    """
+    Queue of motion programs executed back to back with ``MotionProgramExecClient``. The queue pipelines the
+    steps of ``execute_motion_program()`` to reduce the time between programs:
+
+    * Programs are serialized and uploaded to the controller as soon as they are submitted, while the previous
+      program is running. The uploaded file is copied to the motion program filename on the controller
+      before the program is started.
+    * The event log entries read after a program completes are also used as the starting point for the next
+      program, so the event log is only read once between programs.
+    * The result log of a program is downloaded and parsed in the background after the next program is started.
+
+    ``submit()`` returns a ``concurrent.futures.Future`` that completes with the ``MotionProgramResultLog`` of the
+    job. If a job fails, the remaining queued jobs are cancelled with the same exception unless ``stop_on_error``
+    is False.
+
+    If the controller does not support copying files, the programs are uploaded after the previous program
+    completes, and only the event log and result log steps are overlapped.
+
+    :param client: The client used to execute the programs
+    :param stop_on_error: Cancel queued jobs if a job fails
+    """
+    def __init__(self, client: MotionProgramExecClient, stop_on_error: bool = True):
+        self._client = client
+        self._rws = client.abb_client
+        self._upload_rws = _new_rws(self._rws)
+        self._download_rws = _new_rws(self._rws)
+        self.stop_on_error = stop_on_error
+        self._queue = queue.Queue()
+        self._job_ids = itertools.count(1)
+        self._server_copy = True
+        self._ramdisk = None
+        self._ramdisk_lock = threading.Lock()
+        self._event_log_cursor = EventLogCursor(self._rws)
+        # Upload programs in order with one thread, and download result logs with another thread
+        self._upload_executor = ThreadPoolExecutor(1)
+        self._download_executor = ThreadPoolExecutor(1)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, motion_program: Union[MotionProgram,List[MotionProgram]], task: Union[str,List[str]] = None,
+        seqno: int = None) -> "Future[MotionProgramResultLog]":
+        """
+        Submit a motion program to the queue.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system. Defaults to ``T_ROB1``, or
+                     ``T_ROBn`` for a list of motion programs
+        :param seqno: Optional motion program seqno override
+        :return: Future completed with the result log of the job
+        """
+        if self._closed:
+            raise Exception("Job queue is closed")
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        job = _Job(next(self._job_ids), motion_programs, tasks, seqno)
+        job.staged = self._upload_executor.submit(self._prepare_job, job)
+        self._queue.put(job)
+        return job.future
+
+    def close(self, wait: bool = True):
+        """
+        Close the queue. Jobs already submitted are executed.
+
+        :param wait: Wait for the submitted jobs to complete
+        """
+        self._closed = True
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+            self._upload_executor.shutdown()
+            self._download_executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_ramdisk(self, rws: RWS):
+        with self._ramdisk_lock:
+            if self._ramdisk is None:
+                self._ramdisk = rws.get_ramdisk_path()
+            return self._ramdisk
+
+    def _prepare_job(self, job: _Job):
+        ramdisk = self._get_ramdisk(self._upload_rws)
+        job.filenames = []
+        job.program_bytes = []
+        for mp, task in zip(job.motion_programs, job.tasks):
+            filename, b = _get_motion_program_file(ramdisk, mp, task, seqno = job.seqno)
+            job.filenames.append(filename)
+            job.program_bytes.append(b)
+        if self._server_copy:
+            staged_filenames = [_get_staged_filename(f, job.job_id) for f in job.filenames]
+            for staged_filename, b in zip(staged_filenames, job.program_bytes):
+                self._upload_rws.upload_file(staged_filename, b)
+            job.staged_filenames = staged_filenames
+
+    def _start_job(self, job: _Job, prev_seqnum: int):
+        job.staged.result()
+        def _upload():
+            with _timing_phase("upload"):
+                if not self._copy_staged_files(job):
+                    self._client._upload_motion_program_files(job.filenames, job.program_bytes)
+        # The event log position read after the previous job is used instead of resetting the cursor
+        job.prev_seqnum = self._client._download_and_start_motion_program(job.tasks, _upload, prev_seqnum)
+        if job.staged_filenames is not None:
+            self._download_executor.submit(self._delete_files, job.staged_filenames)
+        job.program_bytes = None
+
+    def _copy_staged_files(self, job: _Job) -> bool:
+        if job.staged_filenames is None or not self._server_copy:
+            return False
+        try:
+            for staged_filename, filename in zip(job.staged_filenames, job.filenames):
+                self._rws._do_post(*_upload_cache.copy_file_url_and_payload(staged_filename, filename))
+        except Exception:
+            self._server_copy = False
+            return False
+        return True
+
+    def _delete_files(self, filenames):
+        # Called from the download thread
+        for filename in filenames:
+            try:
+                self._download_rws.delete_file(filename)
+            except Exception:
+                pass
+
+    def _download_result_log(self, job: _Job, log_filename: str):
+        try:
+            ramdisk = self._get_ramdisk(self._download_rws)
+            log_contents = self._download_rws.read_file(f"{ramdisk}/{log_filename}")
+            self._delete_files([f"{ramdisk}/{log_filename}"])
+            job.future.set_result(_unpack_motion_program_result_log(log_contents))
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _fail_queued_jobs(self, exp):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is None:
+                self._queue.put(None)
+                return
+            self._discard_job(job)
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(exp)
+
+    def _discard_job(self, job: _Job):
+        # Delete the staged files of a job that will not be executed
+        def _discard():
+            try:
+                job.staged.result()
+            except Exception:
+                return
+            if job.staged_filenames is not None:
+                self._delete_files(job.staged_filenames)
+        self._download_executor.submit(_discard)
+
+    def _run(self):
+        prev_seqnum = None
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                self._discard_job(job)
+                continue
+            try:
+                with _TimedCall(self._client, "job_queue_execute"):
+                    self._start_job(job, prev_seqnum)
+                    with _timing_phase("wait"):
+                        self._client.wait_motion_program_complete()
+                    with _timing_phase("event_log_read"):
+                        log_after = self._event_log_cursor.read_after(job.prev_seqnum)
+                        prev_seqnum = self._event_log_cursor.seqnum
+                        log_filename = _get_result_log_filename(log_after, self._event_log_cursor.entries_by_code)
+            except Exception as e:
+                job.future.set_exception(e)
+                prev_seqnum = None
+                if self.stop_on_error:
+                    self._fail_queued_jobs(e)
+                continue
+            self._download_executor.submit(self._download_result_log, job, log_filename)
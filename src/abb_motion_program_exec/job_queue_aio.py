@@ -0,0 +1,224 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import itertools
+from typing import List, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, _get_motion_program_file, \
+    _get_result_log_filename, _unpack_motion_program_result_log
+from .abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from .job_queue import _normalize_job_programs, _get_staged_filename
+from . import upload_cache as _upload_cache
+from .event_log import EventLogCursorAIO
+from .call_timing import _TimedCall, _timing_phase
+
+class _JobAIO:
+    def __init__(self, job_id, motion_programs, tasks, seqno):
+        self.job_id = job_id
+        self.motion_programs = motion_programs
+        self.tasks = tasks
+        self.seqno = seqno
+        self.future = asyncio.get_event_loop().create_future()
+        self.filenames = None
+        self.program_bytes = None
+        self.staged = None
+        self.staged_filenames = None
+        self.prev_seqnum = None
+
+class MotionProgramJobQueueAIO:
+    """
+    Queue of motion programs executed back to back with ``MotionProgramExecClientAIO``. This class is functionally
+    identical to :class:`abb_motion_program_exec.MotionProgramJobQueue` except it uses asyncio instead of threads.
+    ``submit()`` must be called from the event loop, and returns an ``asyncio.Future`` that completes with the
+    ``MotionProgramResultLog`` of the job.
+
+    :param client: The client used to execute the programs
+    :param stop_on_error: Cancel queued jobs if a job fails
+    """
+    def __init__(self, client: MotionProgramExecClientAIO, stop_on_error: bool = True):
+        self._client = client
+        self._rws = client.abb_client_aio
+        self.stop_on_error = stop_on_error
+        self._queue = None
+        self._job_ids = itertools.count(1)
+        self._server_copy = True
+        self._upload_lock = None
+        self._background_tasks = set()
+        self._event_log_cursor = EventLogCursorAIO(self._rws)
+        self._closed = False
+        self._task = None
+
+    def _start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._upload_lock = asyncio.Lock()
+            self._task = asyncio.ensure_future(self._run())
+
+    def submit(self, motion_program: Union[MotionProgram,List[MotionProgram]], task: Union[str,List[str]] = None,
+        seqno: int = None) -> "asyncio.Future[MotionProgramResultLog]":
+        """
+        Submit a motion program to the queue.
+
+        :param motion_program: The motion program to execute, or a list of motion programs for a MultiMove system
+        :param task: The RAPID task, or list of RAPID tasks for a MultiMove system. Defaults to ``T_ROB1``, or
+                     ``T_ROBn`` for a list of motion programs
+        :param seqno: Optional motion program seqno override
+        :return: Future completed with the result log of the job
+        """
+        if self._closed:
+            raise Exception("Job queue is closed")
+        self._start()
+        motion_programs, tasks = _normalize_job_programs(motion_program, task)
+        job = _JobAIO(next(self._job_ids), motion_programs, tasks, seqno)
+        job.staged = asyncio.ensure_future(self._prepare_job(job))
+        self._queue.put_nowait(job)
+        return job.future
+
+    async def close(self, wait: bool = True):
+        """
+        Close the queue. Jobs already submitted are executed.
+
+        :param wait: Wait for the submitted jobs to complete
+        """
+        self._closed = True
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        if wait:
+            await self._task
+            while len(self._background_tasks) > 0:
+                await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _run_background(self, coro):
+        # Keep a reference to background tasks so they are not garbage collected before completion
+        t = asyncio.ensure_future(coro)
+        self._background_tasks.add(t)
+        t.add_done_callback(self._background_tasks.discard)
+
+    async def _prepare_job(self, job: _JobAIO):
+        # The lock is fair, so jobs are uploaded in the order they are submitted
+        async with self._upload_lock:
+            ramdisk = await self._client._get_ramdisk_path()
+            job.filenames = []
+            job.program_bytes = []
+            for mp, task in zip(job.motion_programs, job.tasks):
+                filename, b = _get_motion_program_file(ramdisk, mp, task, seqno = job.seqno)
+                job.filenames.append(filename)
+                job.program_bytes.append(b)
+            if self._server_copy:
+                staged_filenames = [_get_staged_filename(f, job.job_id) for f in job.filenames]
+                for staged_filename, b in zip(staged_filenames, job.program_bytes):
+                    await self._rws.upload_file(staged_filename, b)
+                job.staged_filenames = staged_filenames
+
+    async def _start_job(self, job: _JobAIO, prev_seqnum: int):
+        await job.staged
+        async def _upload():
+            with _timing_phase("upload"):
+                if not await self._copy_staged_files(job):
+                    await self._client._upload_motion_program_files(job.filenames, job.program_bytes)
+        # The event log position read after the previous job is used instead of resetting the cursor
+        job.prev_seqnum = await self._client._download_and_start_motion_program(job.tasks, _upload, prev_seqnum)
+        if job.staged_filenames is not None:
+            self._run_background(self._delete_files(job.staged_filenames))
+        job.program_bytes = None
+
+    async def _copy_staged_files(self, job: _JobAIO) -> bool:
+        if job.staged_filenames is None or not self._server_copy:
+            return False
+        try:
+            for staged_filename, filename in zip(job.staged_filenames, job.filenames):
+                await self._rws._do_post(*_upload_cache.copy_file_url_and_payload(staged_filename, filename))
+        except Exception:
+            self._server_copy = False
+            return False
+        return True
+
+    async def _delete_files(self, filenames):
+        for filename in filenames:
+            try:
+                await self._rws.delete_file(filename)
+            except Exception:
+                pass
+
+    async def _download_result_log(self, job: _JobAIO, log_filename: str):
+        try:
+            ramdisk = await self._client._get_ramdisk_path()
+            log_contents = await self._rws.read_file(f"{ramdisk}/{log_filename}")
+            await self._delete_files([f"{ramdisk}/{log_filename}"])
+            result = _unpack_motion_program_result_log(log_contents)
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+
+    def _fail_queued_jobs(self, exp):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if job is None:
+                self._queue.put_nowait(None)
+                return
+            self._discard_job(job)
+            if not job.future.done():
+                job.future.set_exception(exp)
+
+    def _discard_job(self, job: _JobAIO):
+        # Delete the staged files of a job that will not be executed
+        async def _discard():
+            try:
+                await job.staged
+            except Exception:
+                return
+            if job.staged_filenames is not None:
+                await self._delete_files(job.staged_filenames)
+        self._run_background(_discard())
+
+    async def _run(self):
+        prev_seqnum = None
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                break
+            if job.future.done():
+                # Job was cancelled
+                self._discard_job(job)
+                continue
+            try:
+                with _TimedCall(self._client, "job_queue_execute"):
+                    await self._start_job(job, prev_seqnum)
+                    with _timing_phase("wait"):
+                        await self._client.wait_motion_program_complete()
+                    with _timing_phase("event_log_read"):
+                        log_after = await self._event_log_cursor.read_after(job.prev_seqnum)
+                        prev_seqnum = self._event_log_cursor.seqnum
+                        log_filename = _get_result_log_filename(log_after, self._event_log_cursor.entries_by_code)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                prev_seqnum = None
+                if self.stop_on_error:
+                    self._fail_queued_jobs(e)
+                continue
+            self._run_background(self._download_result_log(job, log_filename))
@@ -0,0 +1,179 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import List, NamedTuple
+import numpy as np
+from .abb_motion_program_exec_client import MotionProgramResultLog
+
+MOTION_PROGRAM_LOG_PERIOD = 0.004
+"""Sample period of the motion program logger in seconds"""
+
+class MotionProgramLogJitter(NamedTuple):
+    """
+    Sample timing of a result log, returned by ``get_motion_program_log_jitter()``
+    """
+    period: float
+    """The expected sample period in seconds"""
+    sample_count: int
+    """The number of samples in the log"""
+    dt_mean: float
+    """The mean time between samples in seconds"""
+    dt_std: float
+    """The standard deviation of the time between samples in seconds"""
+    histogram: np.array
+    """The number of sample intervals in each bin of ``bin_edges``"""
+    bin_edges: np.array
+    """The bin edges of ``histogram`` in seconds"""
+    missed_samples: int
+    """The number of samples missing from the log, estimated by rounding each interval to a multiple of
+    ``period``"""
+    gap_count: int
+    """The number of intervals longer than 1.5 times ``period``"""
+    longest_gap: float
+    """The longest time between samples in seconds"""
+    longest_gap_time: float
+    """The time of the sample before the longest gap"""
+
+def _increasing_samples(t: np.ndarray, data: np.ndarray):
+    # Interpolation requires increasing time. Drop samples that do not advance the time.
+    if len(t) < 2:
+        return t, data
+    keep = np.ones(len(t), dtype=np.bool_)
+    keep[1:] = t[1:] > np.maximum.accumulate(t)[:-1]
+    if keep.all():
+        return t, data
+    return t[keep], data[keep]
+
+def _interp_rows(t: np.ndarray, y: np.ndarray, tq: np.ndarray, method: str) -> np.ndarray:
+    # Interpolate all columns of y at once. t must be increasing and have at least two samples.
+    i = np.clip(np.searchsorted(t, tq, side="right") - 1, 0, len(t) - 2)
+    h = (t[i+1] - t[i])[:,None]
+    s = (tq - t[i])[:,None] / h
+    y0 = y[i]
+    y1 = y[i+1]
+    if method == "linear":
+        return y0 + s*(y1 - y0)
+    if method == "cubic":
+        # Cubic Hermite spline with tangents from central differences over the nonuniform samples
+        m = np.gradient(y, t, axis=0)
+        s2 = s*s
+        s3 = s2*s
+        return (2*s3 - 3*s2 + 1)*y0 + (s3 - 2*s2 + s)*h*m[i] + (-2*s3 + 3*s2)*y1 + (s3 - s2)*h*m[i+1]
+    raise Exception(f"Invalid interpolation method {method}")
+
+def _resample_data(data: np.ndarray, tq: np.ndarray, method: str) -> np.ndarray:
+    t, data = _increasing_samples(np.asarray(data[:,0], dtype=np.float64), data)
+    if len(t) == 0:
+        raise Exception("Result log must not be empty")
+    out = np.empty((len(tq), data.shape[1]), dtype=np.float64)
+    if len(t) == 1:
+        out[:] = data[0]
+        out[:,0] = tq
+        return out
+    out[:,0] = tq
+    # The log stores the time in float32. Round the query times to the precision of the log, so a query time
+    # equal to the time of a sample selects that sample instead of the sample before it.
+    if np.issubdtype(data.dtype, np.floating):
+        tq = tq.astype(data.dtype).astype(np.float64)
+    # The command number is held from the previous sample instead of interpolated
+    i = np.clip(np.searchsorted(t, tq, side="right") - 1, 0, len(t) - 1)
+    out[:,1] = data[i,1]
+    out[:,2:] = _interp_rows(t, np.asarray(data[:,2:], dtype=np.float64), tq, method)
+    return out
+
+def resample_motion_program_result_log(log: MotionProgramResultLog, period: float = MOTION_PROGRAM_LOG_PERIOD,
+    method: str = "linear", start_time: float = None, end_time: float = None) -> MotionProgramResultLog:
+    """
+    Resample a result log onto samples spaced exactly ``period`` apart. The joint columns are interpolated, and the
+    command number is taken from the last sample at or before each time.
+
+    :param log: The result log
+    :param period: The sample period in seconds
+    :param method: ``linear`` or ``cubic``
+    :param start_time: The time of the first sample. Defaults to the first sample of the log
+    :param end_time: The latest time of the last sample. Defaults to the last sample of the log
+    :return: The resampled log
+    """
+    t = log.time
+    if len(t) == 0:
+        raise Exception("Result log must not be empty")
+    if start_time is None:
+        start_time = float(t[0])
+    if end_time is None:
+        end_time = float(t[-1])
+    n = int(np.floor((end_time - start_time) / period + 1e-6)) + 1
+    tq = start_time + np.arange(max(n, 0))*period
+    data = _resample_data(log.data, tq, method)
+    return MotionProgramResultLog(log.timestamp, log.column_headers, data.astype(np.float32))
+
+def resample_motion_program_result_logs(logs: List[MotionProgramResultLog],
+    period: float = MOTION_PROGRAM_LOG_PERIOD, sample_count: int = None, method: str = "linear") -> np.ndarray:
+    """
+    Resample a list of result logs into one array of shape ``(len(logs), sample_count, columns)``. The time column
+    of each log starts at zero. Samples after the end of a shorter log are NaN. All logs must have the same columns.
+
+    :param logs: The result logs
+    :param period: The sample period in seconds
+    :param sample_count: The number of samples of each log. Defaults to the number of samples of the longest log
+    :param method: ``linear`` or ``cubic``
+    :return: The resampled data
+    """
+    if len(logs) == 0:
+        return np.zeros((0, 0 if sample_count is None else sample_count, 0))
+    headers = logs[0].column_headers
+    if any(log.column_headers != headers for log in logs):
+        raise Exception("All result logs must have the same columns")
+    durations = [float(log.time[-1] - log.time[0]) if len(log.data) > 0 else -1.0 for log in logs]
+    if sample_count is None:
+        if max(durations) < 0:
+            raise Exception("Result log must not be empty")
+        sample_count = int(np.floor(max(durations) / period + 1e-6)) + 1
+    out = np.full((len(logs), sample_count, len(headers)), np.nan)
+    tq = np.arange(sample_count)*period
+    for k, (log, duration) in enumerate(zip(logs, durations)):
+        n = int(np.searchsorted(tq, duration + 1e-6*period, side="right"))
+        if n == 0:
+            continue
+        t0 = float(log.time[0])
+        out[k,:n] = _resample_data(log.data, t0 + tq[:n], method)
+        out[k,:n,0] = tq[:n]
+    return out
+
+def get_motion_program_log_jitter(log: MotionProgramResultLog, period: float = MOTION_PROGRAM_LOG_PERIOD,
+    bin_edges: np.ndarray = None) -> MotionProgramLogJitter:
+    """
+    Measure the sample timing of a result log. The logger samples every ``period`` seconds, and samples are
+    delayed or dropped when the controller is overloaded.
+
+    :param log: The result log
+    :param period: The expected sample period in seconds
+    :param bin_edges: The histogram bin edges in seconds. Defaults to bins a quarter of ``period`` wide, centred on
+                      zero to four times ``period``, with a last bin for longer intervals
+    :return: The sample timing
+    """
+    t = np.asarray(log.time, dtype=np.float64)
+    if bin_edges is None:
+        # Centre the bins on multiples of the quarter period, so intervals of exactly one period are not split
+        # between two bins by rounding
+        bin_edges = np.concatenate(([0.0], np.arange(1, 17)*(period/4) - period/8, [np.inf]))
+    dt = np.diff(t)
+    histogram, _ = np.histogram(dt, bins=bin_edges)
+    if len(dt) == 0:
+        return MotionProgramLogJitter(period, len(t), 0.0, 0.0, histogram, bin_edges, 0, 0, 0.0,
+            float(t[0]) if len(t) > 0 else 0.0)
+    missed = np.maximum(np.rint(dt / period) - 1, 0)
+    i = int(np.argmax(dt))
+    return MotionProgramLogJitter(period, len(t), float(dt.mean()), float(dt.std()), histogram, bin_edges,
+        int(missed.sum()), int(np.count_nonzero(dt > 1.5*period)), float(dt[i]), float(t[i]))
@@ -0,0 +1,146 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import weakref
+from typing import Dict, Tuple, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from .abb_motion_program_exec_client import MotionProgramResultLog
+
+_SEGMENT_INDEX_DTYPE = np.dtype([
+    ("cmd_num", "<i4"),
+    ("program", "<i4"),
+    ("start", "<i8"),
+    ("stop", "<i8")
+])
+
+def _build_segment_index(cmd_num: np.ndarray) -> np.ndarray:
+    # Find the rows where cmd_num changes. Rows with cmd_num -1 are logged before the first command and after the
+    # program completes, and are not part of any segment.
+    n = len(cmd_num)
+    if n == 0:
+        return np.zeros(0, dtype=_SEGMENT_INDEX_DTYPE)
+    change = np.flatnonzero(np.diff(cmd_num)) + 1
+    start = np.concatenate(([0], change))
+    stop = np.concatenate((change, [n]))
+    cmd = cmd_num[start].astype(np.int32)
+    keep = cmd >= 0
+    start, stop, cmd = start[keep], stop[keep], cmd[keep]
+    index = np.zeros(len(cmd), dtype=_SEGMENT_INDEX_DTYPE)
+    index["cmd_num"] = cmd
+    # A command number lower than the previous command starts a new program, for example the next program of a
+    # driver numbered from 1. Preempt programs continue the numbering of the preempted program, so a preempt does
+    # not start a new program.
+    index["program"][1:] = np.cumsum(np.diff(cmd) < 0)
+    index["start"] = start
+    index["stop"] = stop
+    return index
+
+class MotionProgramLogSegments:
+    """
+    Index of the rows of a result log executed by each command. A segment is a run of consecutive samples with the
+    same command number. Samples with command number -1 are not part of a segment. Segments are numbered in the
+    order they were executed, and the arrays of this class have one entry per segment.
+
+    Use ``MotionProgramResultLog.segments`` to get the cached index of a log instead of constructing this class.
+
+    :param log: The result log
+    :param index: A previously built index from ``to_array()``. Built from the log if not specified
+    """
+    def __init__(self, log: "MotionProgramResultLog", index: np.ndarray = None):
+        if index is None:
+            index = _build_segment_index(log.cmd_num)
+        self._index = index
+        self.cmd_num = index["cmd_num"]
+        """The command number of each segment"""
+        self.program = index["program"]
+        """The program of each segment. Incremented each time the command number decreases, such as the next program
+        of a driver numbered from 1. Preempt programs continue the numbering of the preempted program and are not
+        detected, so segments executed after a preempt have the same program number as the preempted program"""
+        self.start = index["start"]
+        """The first row of each segment"""
+        self.stop = index["stop"]
+        """One past the last row of each segment"""
+
+        # Only the first and last rows of each segment are read, so memory mapped logs are not loaded
+        t = log.time
+        last = np.minimum(self.stop, len(t) - 1)
+        self.start_time = np.asarray(t[self.start], dtype=np.float64)
+        """The time of the first sample of each segment"""
+        self.duration = np.asarray(t[last], dtype=np.float64) - self.start_time
+        """The time from the first sample of each segment to the first sample after the segment. The last segment
+        of a log that ends without a sample after it is measured to its own last sample instead"""
+        joints = log.joints
+        self.entry_joints = np.asarray(joints[self.start])
+        """The joint positions at the first sample of each segment"""
+        self.exit_joints = np.asarray(joints[self.stop - 1])
+        """The joint positions at the last sample of each segment"""
+        self._lookup: Dict[Tuple[int,int],int] = None
+        self._lookup_last: Dict[int,int] = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def find(self, cmd_num: int, program: int = None) -> int:
+        """
+        Find the segment of a command
+
+        :param cmd_num: The command number
+        :param program: The program number of the segment. If not specified, the last segment executed with
+                        ``cmd_num`` is returned
+        :return: The segment number, or -1 if the command was not executed
+        """
+        if self._lookup is None:
+            segments = range(len(self._index))
+            self._lookup_last = dict(zip(self.cmd_num.tolist(), segments))
+            self._lookup = dict(zip(zip(self.program.tolist(), self.cmd_num.tolist()), segments))
+        if program is None:
+            return self._lookup_last.get(cmd_num, -1)
+        return self._lookup.get((program, cmd_num), -1)
+
+    def rows(self, segment: int) -> slice:
+        """
+        Get the rows of a segment, to be used to index ``MotionProgramResultLog.data``
+
+        :param segment: The segment number
+        :return: The slice of rows
+        """
+        return slice(int(self.start[segment]), int(self.stop[segment]))
+
+    def to_array(self) -> np.ndarray:
+        """
+        Get the index as a structured array, to be saved and passed to the constructor with the same log
+        """
+        return self._index
+
+_segments_cache: Dict[int,MotionProgramLogSegments] = dict()
+
+def _get_log_segments(log: "MotionProgramResultLog") -> MotionProgramLogSegments:
+    # The log is a tuple and cannot hold the index, so it is cached by the identity of the data array and dropped
+    # when the array is freed. The segments do not reference the array.
+    key = id(log.data)
+    segments = _segments_cache.get(key, None)
+    if segments is None:
+        segments = _set_log_segments(log, MotionProgramLogSegments(log))
+    return segments
+
+def _set_log_segments(log: "MotionProgramResultLog", segments: MotionProgramLogSegments) \
+    -> MotionProgramLogSegments:
+    key = id(log.data)
+    if key not in _segments_cache:
+        weakref.finalize(log.data, _segments_cache.pop, key, None)
+    _segments_cache[key] = segments
+    return segments
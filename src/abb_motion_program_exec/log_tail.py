@@ -0,0 +1,172 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import struct
+import time
+from typing import Iterator, List
+import numpy as np
+from .abb_motion_program_exec_client import MotionProgramExecClient, MotionProgramResultLog, \
+    _unpack_motion_program_result_log_header, _get_result_log_filename, _find_result_log_filename
+from .event_log import EventLogCursor, MOTION_PROGRAM_EVENT_CODE, index_entries_by_code
+from .rws_session import _read_file_range
+
+class _MotionProgramLogTailBase:
+    def __init__(self, prev_seqnum: int, poll_period: float, buffer_rows: int, delete_file: bool):
+        self.prev_seqnum = prev_seqnum
+        self.poll_period = poll_period
+        self.buffer_rows = buffer_rows
+        self.delete_file = delete_file
+        self.log_filename: str = None
+        """The filename of the result log on the controller RAMDISK, once it has been opened"""
+        self.result_log: MotionProgramResultLog = None
+        """The complete result log, once the program has completed"""
+        self.row_count = 0
+        """The number of rows read so far"""
+        self._entries = []
+        self._entries_by_code = dict()
+        self._file = bytearray()
+        self._timestamp: str = None
+        self._headers: List[str] = None
+        self._data_offset = 0
+        self._ring: np.ndarray = None
+
+    def _add_entries(self, entries):
+        # Event log entries are newest first
+        self._entries = entries + self._entries
+        for code, code_entries in index_entries_by_code(entries).items():
+            self._entries_by_code[code] = code_entries + self._entries_by_code.get(code, [])
+        if self.log_filename is not None:
+            return
+        for e in reversed(self._entries_by_code.get(MOTION_PROGRAM_EVENT_CODE, [])):
+            if len(e.args) > 1 and e.args[0].lower() == "motion program log file opened":
+                log_filename = _find_result_log_filename(e.args[1])
+                if log_filename is not None:
+                    self.log_filename = log_filename
+
+    def _read_header(self) -> bool:
+        if self._headers is not None:
+            return True
+        f = io.BytesIO(self._file)
+        try:
+            timestamp, headers = _unpack_motion_program_result_log_header(f)
+        except struct.error:
+            return False
+        # A truncated string is read without an error, so check the header is complete
+        offset = 12 + len(timestamp) + len(",".join(headers))
+        if f.tell() != offset:
+            return False
+        self._timestamp, self._headers, self._data_offset = timestamp, headers, offset
+        self._ring = np.zeros((self.buffer_rows, len(headers)), dtype=np.float32)
+        return True
+
+    def _append(self, b: bytes) -> MotionProgramResultLog:
+        self._file.extend(b)
+        if not self._read_header():
+            return None
+        row_size = 4*len(self._headers)
+        n = (len(self._file) - self._data_offset) // row_size - self.row_count
+        if n <= 0:
+            return None
+        rows = np.frombuffer(self._file, dtype="<f4", count=n*len(self._headers),
+            offset=self._data_offset + self.row_count*row_size).reshape((n,len(self._headers))).copy()
+        ring_rows = rows[-self.buffer_rows:]
+        ring_start = self.row_count + n - len(ring_rows)
+        self._ring[np.arange(ring_start, ring_start + len(ring_rows)) % self.buffer_rows] = ring_rows
+        self.row_count += n
+        return MotionProgramResultLog(self._timestamp, self._headers, rows)
+
+    @property
+    def latest(self) -> MotionProgramResultLog:
+        """The last ``buffer_rows`` rows read, oldest first. None if the log has not been opened"""
+        if self._headers is None:
+            return None
+        if self.row_count <= self.buffer_rows:
+            data = self._ring[:self.row_count].copy()
+        else:
+            i = self.row_count % self.buffer_rows
+            data = np.concatenate((self._ring[i:], self._ring[:i]))
+        return MotionProgramResultLog(self._timestamp, self._headers, data)
+
+    def _finish(self):
+        if not self._read_header():
+            raise Exception("Invalid result log file")
+        n = (len(self._file) - self._data_offset) // (4*len(self._headers))
+        # The data is a view of the downloaded bytes, so the file is not copied again
+        data = np.frombuffer(self._file, dtype="<f4", count=n*len(self._headers), offset=self._data_offset) \
+            .reshape((n,len(self._headers)))
+        self.result_log = MotionProgramResultLog(self._timestamp, self._headers, data)
+
+class MotionProgramLogTail(_MotionProgramLogTailBase):
+    """
+    Read the result log of a running motion program while it executes. Iterating the tail polls the controller
+    and yields a ``MotionProgramResultLog`` containing the rows added to the log file since the previous poll.
+    The last ``buffer_rows`` rows are kept in a ring buffer, available from ``latest``. When the program completes,
+    the complete log is assembled from the downloaded rows and stored in ``result_log``, and the iteration ends.
+    Errors are raised the same as ``read_motion_program_result_log()``.
+
+    Each poll requests only the new bytes of the log file using an HTTP Range request. If the controller does not
+    support Range requests, the whole file is downloaded on each poll and the new bytes are used.
+
+    .. code-block:: python
+
+        prev_seqnum = client.execute_motion_program(mp, wait=False)
+        tail = MotionProgramLogTail(client, prev_seqnum)
+        for rows in tail:
+            print(rows.cmd_num[-1], rows.joints[-1])
+        log_results = tail.result_log
+
+    :param client: The client used to execute the program
+    :param prev_seqnum: The previous seqnum, returned by ``execute_motion_program()`` if ``wait`` is False
+    :param poll_period: Time between polls in seconds
+    :param buffer_rows: Number of rows kept in the ring buffer
+    :param delete_file: Delete the log file from the controller once it has been read
+    """
+    def __init__(self, client: MotionProgramExecClient, prev_seqnum: int, poll_period: float = 0.1,
+        buffer_rows: int = 100000, delete_file: bool = True):
+        super().__init__(prev_seqnum, poll_period, buffer_rows, delete_file)
+        self.client = client
+
+    def __iter__(self) -> Iterator[MotionProgramResultLog]:
+        abb_client = self.client.abb_client
+        cursor = EventLogCursor(abb_client)
+        cursor.seqnum = self.prev_seqnum
+        ramdisk = abb_client.get_ramdisk_path()
+        while True:
+            running = self.client.is_motion_program_running()
+            self._add_entries(cursor.read_new())
+            if self.log_filename is not None:
+                rows = self._append(_read_file_range(abb_client, f"{ramdisk}/{self.log_filename}",
+                    len(self._file)))
+                if rows is not None:
+                    yield rows
+            if not running:
+                break
+            time.sleep(self.poll_period)
+
+        # Check for errors and the log closed message before the last read, so all rows are read
+        self._add_entries(cursor.read_new())
+        log_filename = _get_result_log_filename(self._entries, self._entries_by_code)
+        if self.log_filename is None:
+            self.log_filename = log_filename
+        rows = self._append(_read_file_range(abb_client, f"{ramdisk}/{self.log_filename}", len(self._file)))
+        if self.delete_file:
+            try:
+                abb_client.delete_file(f"{ramdisk}/{self.log_filename}")
+            except:
+                pass
+        if rows is not None:
+            yield rows
+        self._finish()
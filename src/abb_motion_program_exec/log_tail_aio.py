@@ -0,0 +1,73 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import AsyncIterator
+from .abb_motion_program_exec_client import MotionProgramResultLog, _get_result_log_filename
+from .abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from .event_log import EventLogCursorAIO
+from .log_tail import _MotionProgramLogTailBase
+from .rws_session import _read_file_range_aio
+
+class MotionProgramLogTailAIO(_MotionProgramLogTailBase):
+    """
+    Read the result log of a running motion program while it executes using AsyncIO
+
+    This class is functionally identical to :class:`abb_motion_program_exec.log_tail.MotionProgramLogTail`
+    except it uses AsyncIO instead of synchronous blocking operations. Use ``async for`` to iterate the tail.
+
+    :param client: The client used to execute the program
+    :param prev_seqnum: The previous seqnum, returned by ``execute_motion_program()`` if ``wait`` is False
+    :param poll_period: Time between polls in seconds
+    :param buffer_rows: Number of rows kept in the ring buffer
+    :param delete_file: Delete the log file from the controller once it has been read
+    """
+    def __init__(self, client: MotionProgramExecClientAIO, prev_seqnum: int, poll_period: float = 0.1,
+        buffer_rows: int = 100000, delete_file: bool = True):
+        super().__init__(prev_seqnum, poll_period, buffer_rows, delete_file)
+        self.client = client
+
+    async def __aiter__(self) -> AsyncIterator[MotionProgramResultLog]:
+        abb_client_aio = self.client.abb_client_aio
+        cursor = EventLogCursorAIO(abb_client_aio)
+        cursor.seqnum = self.prev_seqnum
+        ramdisk = await self.client._get_ramdisk_path()
+        while True:
+            running, entries = await asyncio.gather(self.client.is_motion_program_running(), cursor.read_new())
+            self._add_entries(entries)
+            if self.log_filename is not None:
+                rows = self._append(await _read_file_range_aio(abb_client_aio, f"{ramdisk}/{self.log_filename}",
+                    len(self._file)))
+                if rows is not None:
+                    yield rows
+            if not running:
+                break
+            await asyncio.sleep(self.poll_period)
+
+        # Check for errors and the log closed message before the last read, so all rows are read
+        self._add_entries(await cursor.read_new())
+        log_filename = _get_result_log_filename(self._entries, self._entries_by_code)
+        if self.log_filename is None:
+            self.log_filename = log_filename
+        rows = self._append(await _read_file_range_aio(abb_client_aio, f"{ramdisk}/{self.log_filename}",
+            len(self._file)))
+        if self.delete_file:
+            try:
+                await abb_client_aio.delete_file(f"{ramdisk}/{self.log_filename}")
+            except:
+                pass
+        if rows is not None:
+            yield rows
+        self._finish()
@@ -0,0 +1,839 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process stand-in for an ABB IRC5 controller running the ``motion_program_exec`` RAPID modules. The mock
+implements the subset of Robot Web Services used by ``MotionProgramExecClient`` and
+``MotionProgramExecClientAIO``, so the clients can be tested and benchmarked without RobotStudio or a robot.
+
+Uploaded motion program files are interpreted the same way as ``motion_program_exec.mod``, including
+preemption and MultiMove synchronization, and the same event log messages are written. The joint motion is
+simulated with a simple model: each motion command moves linearly in joint space from the current position to
+the target at constant speed. ``MoveAbsJ`` uses ``speeddata.v_ori`` as the joint speed in deg/s. Cartesian
+commands take the path length divided by ``speeddata.v_tcp``, and only move the joints if an inverse kinematics
+function is provided. Zones only affect read ahead, fine points stop read ahead like on the controller. EGM
+commands are accepted, but no EGM corrections are applied.
+
+The result log is written every 4 ms of simulated time in the ``MOTION_PROGRAM_FILE_VERSION`` format.
+If ``driver_mode`` is set, the tasks run ``motion_program_main_driver_mode`` instead, waiting for the
+``motion_program_seqno_command`` signal and running the matching ``motion_program---seqno-N.bin`` file.
+RWS subscriptions are not supported.
+"""
+
+import threading
+import socketserver
+import datetime
+import json
+import io
+import time
+from collections import deque
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+from typing import Callable, Dict, List
+import numpy as np
+from abb_robot_client.rws import EventLogEntry
+from .commands import util
+from .commands import commands
+from .commands import egm_commands
+from .commands import program_reader
+from .abb_motion_program_exec_client import MOTION_PROGRAM_FILE_VERSION
+
+_LOG_PERIOD = 0.004
+
+_EVENT_CODE_ERROR = 80001
+_EVENT_CODE_WARNING = 80002
+_EVENT_CODE_INFO = 80003
+
+class _MotionProgramError(Exception):
+    def __init__(self, err_title: str, err_str: str, err_code: int = 90000):
+        super().__init__(err_title)
+        self.err_title = err_title
+        self.err_str = err_str
+        self.err_code = err_code
+
+class _ProgramFileReader:
+    def __init__(self, b: bytes):
+        self.f = io.BytesIO(b)
+
+    def read_header(self):
+        try:
+            ver = util.read_num(self.f)
+        except Exception:
+            raise _MotionProgramError("Invalid Motion Program", "Invalid motion program file")
+        if ver != MOTION_PROGRAM_FILE_VERSION:
+            raise _MotionProgramError("Invalid Motion Program", "Invalid motion program file version")
+        try:
+            program_reader.read_tooldata(self.f)
+            program_reader.read_wobjdata(self.f)
+            program_reader.read_loaddata(self.f)
+            timestamp = program_reader.read_program_str(self.f)
+            seqno = int(util.read_num(self.f))
+            egm_commands.read_egm_config(self.f)
+        except Exception:
+            raise _MotionProgramError("Invalid Motion Program", "Invalid motion program file")
+        return timestamp, seqno
+
+    def read_command(self):
+        b = self.f.read(8)
+        if len(b) < 8:
+            return None
+        cmd_num, opcode = np.frombuffer(b, dtype="<f4").tolist()
+        cmd_cls = program_reader.get_command_class(int(opcode))
+        if cmd_cls is None:
+            raise _MotionProgramError("Invalid Motion Program", f"Invalid command opcode {int(opcode)}")
+        count = cmd_cls.command_params_count
+        b = self.f.read(count*4)
+        if len(b) < count*4:
+            return None
+        params = np.frombuffer(b, dtype="<f4").astype(np.float64).reshape((1,count))
+        return int(cmd_num), program_reader.commands_from_params(int(opcode), params)[0]
+
+class _Segment:
+    def __init__(self, cmd_num: int, target: np.ndarray, duration: float):
+        self.cmd_num = cmd_num
+        self.target = target
+        self.duration = duration
+        self.start = None
+        self.elapsed = 0.0
+
+class _TaskState:
+    def __init__(self, name: str, task_ind: int, joints: np.ndarray):
+        self.name = name
+        self.task_ind = task_ind
+        self.joints = joints
+        self.tcp = None
+        self.motion_queue = deque()
+        self.program = None
+        self.wait = None
+        self.done = False
+        self.current_cmd_num = -1
+        self.queued_count = 0
+        self.preempt_current = 0
+        self.sync_count = 0
+        self.timestamp = ""
+        self.seqno = -1
+        self.driver_seqno = -1
+        self.driver_last_seqno = 0
+        self.driver_idle = False
+
+class MockRWSController:
+    """
+    Simulated controller state used by :class:`MockRWSServer`. All methods are thread safe.
+
+    :param multimove: Simulate a MultiMove system with tasks ``T_ROB1`` and ``T_ROB2``
+    :param time_scale: Wall clock seconds per simulated second. Set to 0 to run programs as fast as possible
+    :param lookahead: The number of motion commands queued ahead of the executing command
+    :param ik: Optional inverse kinematics function ``ik(task, robtarget) -> joints`` returning joint angles in
+               degrees, used to move the joints for Cartesian commands
+    :param initial_joints: Initial joint angles in degrees of each robot
+    :param ramdisk: The path returned for the ``$RAMDISK`` variable
+    :param driver_mode: Simulate the RAPID modules with ``MOTION_PROGRAM_DRIVER_MODE`` set to 1
+    """
+    def __init__(self, multimove: bool = False, time_scale: float = 1.0, lookahead: int = 3,
+        ik: Callable[[str,"robtarget"],np.ndarray] = None, initial_joints: List[np.ndarray] = None,
+        ramdisk: str = "$TEMP", driver_mode: bool = False):
+        self.tasks = ["T_ROB1", "T_ROB2"] if multimove else ["T_ROB1"]
+        self.time_scale = time_scale
+        self.lookahead = lookahead
+        self.ik = ik
+        if initial_joints is None:
+            initial_joints = [np.zeros((6,)) for _ in self.tasks]
+        self.joints = [np.array(j, dtype=np.float64) for j in initial_joints]
+        self.ramdisk = ramdisk
+        self.driver_mode = driver_mode
+        self.controller_state = "motoron"
+        """The controller state returned by RWS. Programs can only be started in ``motoron``"""
+        self.opmode = "AUTO"
+        self.files: Dict[str,bytes] = dict()
+        self.signals: Dict[str,float] = {
+            "motion_program_executing": 0,
+            "motion_program_preempt": 0,
+            "motion_program_preempt_cmd_num": -1,
+            "motion_program_preempt_current": 0,
+            "motion_program_current_cmd_num": -1,
+            "motion_program_queued_cmd_num": -1,
+            "motion_program_seqno": -1,
+            "motion_program_log_motion": 1,
+            "motion_program_error": 0,
+            "motion_program_stop_egm": 0,
+            "motion_program_seqno_command": 0,
+            "motion_program_seqno_started": 0,
+            "motion_program_seqno_complete": 0,
+            "motion_program_driver_abort": 0
+        }
+        self.task_active = {t: True for t in self.tasks}
+        self.ctrlexecstate = "stopped"
+        self.cycle = "asis"
+        self.time = 0.0
+        self._events: List[EventLogEntry] = []
+        self._seqnum = 0
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop_requested = False
+        self._log_filename = None
+        self._log_data = None
+        self._log_t0 = 0.0
+        self._idle = False
+        self.write_event(1, 10000, ["Mock Controller Started", "Mock controller started"])
+
+    # Event log
+
+    def write_event(self, msgtype: int, code: int, args: List[str]):
+        """Add an entry to the event log, similar to ``ErrWrite``"""
+        with self._lock:
+            self._seqnum = (self._seqnum + 1) & 0xFFFF
+            tstamp = datetime.datetime.now().replace(microsecond=0)
+            self._events.append(EventLogEntry(self._seqnum, msgtype, code, tstamp, list(args), args[0], "", "",
+                "", ""))
+
+    def read_event_log(self, start: int = 0, limit: int = None) -> List[EventLogEntry]:
+        """Read the event log, newest entry first"""
+        with self._lock:
+            entries = self._events[::-1]
+        if limit is None:
+            return entries[start:]
+        return entries[start:start+limit]
+
+    # Files
+
+    def _normalize_filename(self, filename: str) -> str:
+        if filename.startswith("RAMDISK:"):
+            filename = f"{self.ramdisk}/{filename[len('RAMDISK:'):]}"
+        return filename.rstrip("/")
+
+    def write_file(self, filename: str, contents: bytes):
+        with self._lock:
+            self.files[self._normalize_filename(filename)] = bytes(contents)
+
+    def read_file(self, filename: str) -> bytes:
+        with self._lock:
+            filename = self._normalize_filename(filename)
+            if filename == self._log_filename:
+                return bytes(self._log_data)
+            return self.files[filename]
+
+    def delete_file(self, filename: str):
+        with self._lock:
+            self.files.pop(self._normalize_filename(filename), None)
+
+    def copy_file(self, src: str, dst: str):
+        with self._lock:
+            src = self._normalize_filename(src)
+            if "/" not in dst:
+                dst = src.rsplit("/",1)[0] + "/" + dst
+            self.files[self._normalize_filename(dst)] = self.read_file(src)
+
+    def list_dir(self, path: str) -> Dict[str,int]:
+        """Returns the files in ``path`` and their size, or None if ``path`` is not a directory"""
+        path = self._normalize_filename(path)
+        with self._lock:
+            if path != self.ramdisk:
+                return None
+            return {f.rsplit("/",1)[1]: len(b) for f, b in self.files.items() if f.rsplit("/",1)[0] == path}
+
+    # Signals
+
+    def get_signal(self, name: str) -> float:
+        with self._lock:
+            return self.signals[name]
+
+    def set_signal(self, name: str, value: float):
+        with self._lock:
+            if name not in self.signals:
+                raise KeyError(name)
+            self.signals[name] = value
+
+    # Execution
+
+    def get_execution_state(self):
+        with self._lock:
+            return self.ctrlexecstate, self.cycle
+
+    def resetpp(self):
+        with self._lock:
+            if self.ctrlexecstate == "running":
+                raise Exception("Cannot reset program pointer while running")
+
+    def start(self, cycle: str = "asis"):
+        with self._lock:
+            if self.ctrlexecstate == "running":
+                raise Exception("RAPID is already running")
+            if self.controller_state != "motoron":
+                raise Exception("Controller must be in motoron state")
+            if self._thread is not None:
+                self._thread.join()
+            self.cycle = cycle
+            self.ctrlexecstate = "running"
+            self._stop_requested = False
+            states = [_TaskState(t, i+1, self.joints[i].copy()) for i, t in enumerate(self.tasks)
+                if self.task_active[t]]
+            for s in states:
+                if self.driver_mode:
+                    s.driver_last_seqno = self.signals["motion_program_seqno_started"]
+                    s.program = self._task_program_driver(s, states)
+                else:
+                    s.program = self._task_program(s, states)
+            self._thread = threading.Thread(target=self._run, args=(states,))
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stop_requested = True
+
+    def wait_stopped(self, timeout: float = None):
+        """Wait for the current program to stop"""
+        t = self._thread
+        if t is not None:
+            t.join(timeout)
+
+    def _run(self, states: List[_TaskState]):
+        t0 = time.perf_counter()
+        n = 0
+        while True:
+            with self._lock:
+                if self._stop_requested or self._tick(states):
+                    # Stop in the same step, so clients never see a finished program still running
+                    for s in states:
+                        self.joints[s.task_ind-1] = s.joints
+                    self._close_log()
+                    self.signals["motion_program_executing"] = 0
+                    self.ctrlexecstate = "stopped"
+                    break
+            n += 1
+            if self.time_scale > 0:
+                delay = t0 + n*_LOG_PERIOD*self.time_scale - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            elif self._idle:
+                # Waiting for a driver mode command, don't spin
+                time.sleep(0.0005)
+            elif n % 64 == 0:
+                time.sleep(0)
+
+    def _tick(self, states: List[_TaskState]) -> bool:
+        self.signals["motion_program_executing"] = 1
+        if self.driver_mode and self.signals["motion_program_driver_abort"] != 0:
+            self._abort_driver_program(states)
+        for s in states:
+            while not s.done:
+                if s.wait is not None and not s.wait():
+                    break
+                try:
+                    s.wait = next(s.program)
+                except StopIteration:
+                    s.done = True
+                except _MotionProgramError as e:
+                    self._report_error(s, e)
+                    return True
+
+        for s in states:
+            self._step_motion(s, _LOG_PERIOD)
+
+        if self._log_data is not None:
+            row = [self.time - self._log_t0, states[0].current_cmd_num]
+            for s in states:
+                row.extend(s.joints)
+            for _ in range(len(self.tasks) - len(states)):
+                row.extend([0.0]*6)
+            self._log_data.extend(np.array(row, dtype="<f4").tobytes())
+        self.time += _LOG_PERIOD
+        self._idle = all(s.driver_idle for s in states)
+        return all(s.done for s in states)
+
+    def _step_motion(self, s: _TaskState, dt: float):
+        if len(s.motion_queue) == 0:
+            return
+        seg = s.motion_queue[0]
+        if seg.start is None:
+            seg.start = s.joints
+            if seg.cmd_num != -1:
+                s.current_cmd_num = seg.cmd_num
+                if s.task_ind == 1:
+                    self.signals["motion_program_current_cmd_num"] = seg.cmd_num
+        seg.elapsed += dt
+        if seg.elapsed >= seg.duration:
+            s.joints = seg.target
+            s.motion_queue.popleft()
+        else:
+            s.joints = seg.start + (seg.target - seg.start) * (seg.elapsed / seg.duration)
+
+    def _report_error(self, s: _TaskState, e: _MotionProgramError):
+        # Same messages as the RAPID module and error_reporter.mod
+        if self.driver_mode:
+            self._fini_driver_program(s)
+        self.write_event(3, _EVENT_CODE_ERROR, [e.err_title, e.err_str])
+        self.write_event(2, _EVENT_CODE_WARNING, ["Motion Program Failed",
+            f"Motion Program Failed at command number {s.current_cmd_num}",
+            f"with error code {e.err_code}",
+            f"error title '{e.err_title}'",
+            f"error string '{e.err_str}'"])
+        seqno = int(self.signals["motion_program_seqno_started"])
+        if seqno > 0:
+            err = {"seqno": seqno, "error_domain": e.err_code // 10000, "error_number": e.err_code % 10000,
+                "error_title": e.err_title, "error_string": e.err_str, "error_string2": ""}
+            self.files[self._normalize_filename(f"RAMDISK:motion_program_err---seqno-{seqno}.json")] = \
+                json.dumps(err).encode("ascii")
+        self.signals["motion_program_error"] = 1
+
+    def _open_program_file(self, s: _TaskState, filename: str) -> _ProgramFileReader:
+        try:
+            b = self.read_file(f"RAMDISK:{filename}")
+        except KeyError:
+            raise _MotionProgramError("File Open Error", f"Could not open file {filename}")
+        reader = _ProgramFileReader(b)
+        timestamp, seqno = reader.read_header()
+        s.timestamp = timestamp
+        s.seqno = seqno
+        if s.task_ind == 1:
+            self.signals["motion_program_seqno"] = seqno
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Opened",
+            f"Motion Program Opened with timestamp: {timestamp}"])
+        return reader
+
+    def _get_filename(self, s: _TaskState, preempt_number: int = None):
+        filename = "motion_program" if s.task_ind == 1 else f"motion_program{s.task_ind}"
+        if preempt_number is not None:
+            filename += f"_p{preempt_number}"
+        if self.driver_mode:
+            filename += f"---seqno-{s.driver_seqno if preempt_number is None else s.seqno}"
+        return filename + ".bin"
+
+    def _open_log(self, timestamp: str, filename: str):
+        self._close_log()
+        if self.signals["motion_program_log_motion"] == 0:
+            return
+        header_str = "timestamp,cmdnum,J1,J2,J3,J4,J5,J6"
+        if len(self.tasks) >= 2:
+            header_str = "timestamp,cmdnum,J1,J2,J3,J4,J5,J6,J1_2,J2_2,J3_2,J4_2,J5_2,J6_2"
+        log_filename = f"log-{filename}.bin"
+        self._log_filename = self._normalize_filename(f"RAMDISK:{log_filename}")
+        self._log_data = bytearray()
+        self._log_data.extend(util.num_to_bin(MOTION_PROGRAM_FILE_VERSION))
+        self._log_data.extend(util.num_to_bin(len(timestamp)) + timestamp.encode("ascii"))
+        self._log_data.extend(util.num_to_bin(len(header_str)) + header_str.encode("ascii"))
+        self._log_t0 = self.time
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Log File Opened",
+            f"Motion Program Log File Opened with filename: {log_filename}"])
+
+    def _close_log(self):
+        if self._log_data is None:
+            return
+        self.files[self._log_filename] = bytes(self._log_data)
+        self._log_filename = None
+        self._log_data = None
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Log File Closed", "Motion Program Log File Closed"])
+
+    def _move_duration(self, s: _TaskState, trans_path: List[np.ndarray], speed, target: np.ndarray):
+        duration = 0.0
+        if s.tcp is not None and speed.v_tcp > 0:
+            p = s.tcp
+            length = 0.0
+            for t in trans_path:
+                length += np.linalg.norm(t - p)
+                p = t
+            duration = length / speed.v_tcp
+        if speed.v_ori > 0:
+            duration = max(duration, np.max(np.abs(target - self._queued_joints(s))) / speed.v_ori)
+        return max(duration, _LOG_PERIOD)
+
+    def _queued_joints(self, s: _TaskState):
+        if len(s.motion_queue) > 0:
+            return s.motion_queue[-1].target
+        return s.joints
+
+    def _queue_motion(self, s: _TaskState, cmd_num: int, cmd):
+        if isinstance(cmd, commands.MoveAbsJCommand):
+            target = np.array(cmd.to_joint_pos.robax, dtype=np.float64)
+            duration = self._move_duration(s, [], cmd.speed, target)
+            s.tcp = None
+        else:
+            trans_path = [np.array(cmd.to_point.trans, dtype=np.float64)]
+            if hasattr(cmd, "cir_point"):
+                trans_path.insert(0, np.array(cmd.cir_point.trans, dtype=np.float64))
+            target = None
+            if self.ik is not None:
+                target = self.ik(s.name, cmd.to_point)
+            if target is None:
+                target = self._queued_joints(s)
+            target = np.array(target, dtype=np.float64)
+            duration = self._move_duration(s, trans_path, cmd.speed, target)
+            s.tcp = trans_path[-1]
+        s.motion_queue.append(_Segment(cmd_num, target, duration))
+
+    def _do_preempt(self, s: _TaskState):
+        preempt = int(self.signals["motion_program_preempt"])
+        if preempt > s.preempt_current:
+            preempt_cmd_num = int(self.signals["motion_program_preempt_cmd_num"])
+            if s.queued_count == preempt_cmd_num:
+                filename = self._get_filename(s, preempt)
+                self.write_event(1, _EVENT_CODE_INFO, ["Preempting Motion Program",
+                    f"Preempting motion program with file {filename}"])
+                if s.task_ind == 1:
+                    self.signals["motion_program_preempt_current"] = preempt
+                s.preempt_current = preempt
+                return self._open_program_file(s, filename)
+            elif s.queued_count > preempt_cmd_num:
+                self.write_event(3, _EVENT_CODE_ERROR, ["Missed Preempt", "Preempt command number missed"])
+                raise _MotionProgramError("Missed Preempt", "Preempt command number missed")
+        return None
+
+    def _init_task(self, s: _TaskState):
+        s.current_cmd_num = -1
+        s.queued_count = 0
+        s.preempt_current = 0
+        if s.task_ind == 1:
+            for n in ("motion_program_preempt", "motion_program_preempt_current"):
+                self.signals[n] = 0
+            for n in ("motion_program_preempt_cmd_num", "motion_program_current_cmd_num",
+                "motion_program_queued_cmd_num", "motion_program_seqno"):
+                self.signals[n] = -1
+            self.signals["motion_program_error"] = 0
+
+    def _task_program(self, s: _TaskState, states: List[_TaskState]):
+        # Generator that interprets the motion program of one task. Yields a function that returns True
+        # when the task can continue.
+        self._init_task(s)
+        yield from self._run_program_file(s, states)
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Complete", "Motion Program Complete"])
+
+    def _task_program_driver(self, s: _TaskState, states: List[_TaskState]):
+        # Same as motion_program_main_driver_mode. Each pass of the loop is one cycle of the RAPID program.
+        def command_ready():
+            command = self.signals["motion_program_seqno_command"]
+            # Only the first task sets seqno_started, the other tasks follow it
+            return self.signals["motion_program_driver_abort"] == 0 and command > s.driver_last_seqno \
+                and (s.task_ind != 1 or command > self.signals["motion_program_seqno_started"])
+        while True:
+            s.driver_seqno = -1
+            self._init_task(s)
+            s.driver_idle = True
+            yield command_ready
+            s.driver_idle = False
+            seqno = int(self.signals["motion_program_seqno_command"])
+            if s.task_ind == 1:
+                self.signals["motion_program_seqno_started"] = seqno
+            s.driver_seqno = seqno
+            s.driver_last_seqno = seqno
+            self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Driver Begin Program",
+                f"Motion Program Driver Begin Program seqno {seqno}"])
+            yield from self._run_program_file(s, states)
+            self._fini_driver_program(s)
+
+    def _fini_driver_program(self, s: _TaskState):
+        if s.driver_seqno > self.signals["motion_program_seqno_complete"]:
+            self.signals["motion_program_seqno_complete"] = s.driver_seqno
+            self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Driver Program Complete",
+                "Motion Program Complete"])
+
+    def _abort_driver_program(self, states: List[_TaskState]):
+        # motion_program_abort_driver_mode trap, only triggered while a program is running
+        if not any(s.driver_seqno > self.signals["motion_program_seqno_complete"] for s in states):
+            return
+        self._close_log()
+        for s in states:
+            s.motion_queue.clear()
+            self._fini_driver_program(s)
+            s.program = self._task_program_driver(s, states)
+            s.wait = None
+
+    def _run_program_file(self, s: _TaskState, states: List[_TaskState]):
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Begin", "Motion Program Begin"])
+        reader = self._open_program_file(s, self._get_filename(s))
+        self.write_event(1, _EVENT_CODE_INFO, ["Motion Program Start Program",
+            f"Motion Program Start Program timestamp: {s.timestamp}"])
+        if s.task_ind == 1:
+            log_filename = s.timestamp
+            if self.driver_mode:
+                log_filename = f"motion_program---seqno-{s.seqno}"
+            self._open_log(s.timestamp, log_filename)
+        motion_empty = lambda: len(s.motion_queue) == 0
+
+        while True:
+            preempt_reader = self._do_preempt(s)
+            if preempt_reader is not None:
+                reader = preempt_reader
+            c = reader.read_command()
+            if c is None:
+                break
+            cmd_num, cmd = c
+            s.queued_count += 1
+            if s.task_ind == 1:
+                self.signals["motion_program_queued_cmd_num"] = s.queued_count
+
+            if isinstance(cmd, (commands.MoveAbsJCommand, commands.MoveJCommand, commands.MoveLCommand,
+                commands.MoveCCommand, egm_commands.EGMMoveLCommand, egm_commands.EGMMoveCCommand)):
+                yield lambda: len(s.motion_queue) < self.lookahead
+                # Only commands executed with triggers update the current command number
+                trigg = isinstance(cmd, (commands.MoveJCommand, commands.MoveLCommand, commands.MoveCCommand))
+                self._queue_motion(s, cmd_num if trigg else -1, cmd)
+                if cmd.zone.finep:
+                    yield motion_empty
+            elif isinstance(cmd, commands.WaitTimeCommand):
+                yield motion_empty
+                self._set_current_cmd_num(s, cmd_num)
+                t_end = self.time + cmd.t
+                yield lambda: self.time >= t_end - 1e-9
+            elif isinstance(cmd, commands.CirPathModeCommand):
+                self._set_current_cmd_num(s, cmd_num)
+            elif isinstance(cmd, (commands.SyncMoveOnCommand, commands.SyncMoveOffCommand)):
+                yield motion_empty
+                s.sync_count += 1
+                sync_count = s.sync_count
+                yield lambda: all(s2.sync_count >= sync_count or s2.done for s2 in states)
+            elif isinstance(cmd, (egm_commands.EGMRunJointCommand, egm_commands.EGMRunPoseCommand)):
+                yield motion_empty
+                self.signals["motion_program_stop_egm"] = 0
+                yield lambda: self.signals["motion_program_stop_egm"] != 0
+
+        yield motion_empty
+        if s.task_ind == 1:
+            self._close_log()
+
+    def _set_current_cmd_num(self, s: _TaskState, cmd_num: int):
+        s.current_cmd_num = cmd_num
+        if s.task_ind == 1:
+            self.signals["motion_program_current_cmd_num"] = cmd_num
+
+def _state_json(state):
+    return {"_embedded": {"_state": state}}
+
+def _event_json(e: EventLogEntry):
+    return {
+        "_type": "elog-message-li",
+        "_title": f"/rw/elog/0/{e.seqnum}",
+        "msgtype": str(e.msgtype),
+        "code": str(e.code),
+        "tstamp": e.tstamp.strftime('%Y-%m-%d T  %H:%M:%S'),
+        "title": e.title,
+        "desc": e.desc,
+        "conseqs": e.conseqs,
+        "causes": e.causes,
+        "actions": e.actions,
+        "argc": str(len(e.args)),
+        "argv": [{"type": "STRING", "value": a} for a in e.args]
+    }
+
+class _RWSError(Exception):
+    def __init__(self, status: int, msg: str):
+        super().__init__(msg)
+        self.status = status
+
+class _MockRWSRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, avoid delayed ACK stalls on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = None):
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if len(body) > 0:
+            self.wfile.write(body)
+
+    def _send_json(self, res):
+        self._send(200, json.dumps(res).encode("utf-8"), "application/json")
+
+    def _read_body(self) -> bytes:
+        l = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(l) if l > 0 else b""
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        path = unquote(url.path).strip("/")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._read_body()
+        try:
+            res = self.server.rws_handler.handle(method, path, query, body)
+        except _RWSError as e:
+            self._send(e.status, json.dumps({"_embedded": {"status": {"code": -1, "msg": str(e)}}}).encode(),
+                "application/json")
+            return
+        except Exception as e:
+            self._send(400, json.dumps({"_embedded": {"status": {"code": -1, "msg": str(e)}}}).encode(),
+                "application/json")
+            return
+        if res is None:
+            self._send(204)
+        elif isinstance(res, bytes):
+            self._send(200, res, "application/octet-stream")
+        else:
+            self._send_json(res)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+class _MockRWSHandler:
+    def __init__(self, controller: MockRWSController):
+        self.c = controller
+
+    def handle(self, method: str, path: str, query: Dict[str,str], body: bytes):
+        c = self.c
+        form = {k: v[0] for k, v in parse_qs(body.decode("utf-8", "replace")).items()} \
+            if method == "POST" else dict()
+        action = query.get("action", None)
+
+        if path.startswith("fileservice/"):
+            return self._handle_file(method, path[len("fileservice/"):], action, form, body)
+        if path == "rw/rapid/execution":
+            if method == "GET":
+                state, cycle = c.get_execution_state()
+                return _state_json([{"_type": "rap-execution", "ctrlexecstate": state, "cycle": cycle}])
+            if action == "start":
+                c.start(form.get("cycle", "asis"))
+            elif action == "stop":
+                c.stop()
+            elif action == "resetpp":
+                c.resetpp()
+            else:
+                raise _RWSError(400, f"Invalid action {action}")
+            return None
+        if path == "rw/rapid/tasks" and method == "GET":
+            return _state_json([{"_type": "rap-task-li", "name": t, "type": "normal", "taskstate": "started",
+                "excstate": "started" if c.ctrlexecstate == "running" else "ready",
+                "active": "On" if c.task_active[t] else "Off", "motiontask": "TRUE"} for t in c.tasks])
+        if path.startswith("rw/rapid/tasks/") and method == "POST":
+            task = path[len("rw/rapid/tasks/"):]
+            if task not in c.task_active:
+                raise _RWSError(404, f"Unknown task {task}")
+            if action not in ("activate", "deactivate"):
+                raise _RWSError(400, f"Invalid action {action}")
+            c.task_active[task] = action == "activate"
+            return None
+        if path == "rw/panel/ctrlstate" and method == "GET":
+            return _state_json([{"_type": "pnl-ctrlstate", "ctrlstate": c.controller_state}])
+        if path == "rw/panel/opmode" and method == "GET":
+            return _state_json([{"_type": "pnl-opmode", "opmode": c.opmode}])
+        if path.startswith("rw/elog/") and method == "GET":
+            start = int(query.get("start", 0))
+            limit = int(query["limit"]) if "limit" in query else None
+            return _state_json([_event_json(e) for e in c.read_event_log(start, limit)])
+        if path == "rw/iosystem/signals" and method == "POST" and action == "signal-search-ex":
+            name = form.get("name", "")
+            with c._lock:
+                signals = [(n, v) for n, v in c.signals.items() if name in n]
+            return _state_json([{"_type": "ios-signal-li", "name": n, "lvalue": f"{v:g}"} for n, v in signals])
+        if path.startswith("rw/iosystem/signals/"):
+            signal = path.rsplit("/",1)[1]
+            try:
+                if method == "GET":
+                    v = c.get_signal(signal)
+                    return _state_json([{"_type": "ios-signal", "name": signal, "lvalue": f"{v:g}"}])
+                if action == "set":
+                    c.set_signal(signal, float(form["lvalue"]))
+                    return None
+            except KeyError:
+                raise _RWSError(404, f"Unknown signal {signal}")
+            raise _RWSError(400, f"Invalid action {action}")
+        if path == "ctrl/$RAMDISK" and method == "GET":
+            return _state_json([{"_type": "cfg-dt-instance-li", "_value": c.ramdisk}])
+        if path == "logout":
+            return None
+        raise _RWSError(404, f"Resource not found {path}")
+
+    def _handle_file(self, method: str, filename: str, action: str, form: Dict[str,str], body: bytes):
+        c = self.c
+        if method == "GET":
+            listing = c.list_dir(filename)
+            if listing is not None:
+                return _state_json([{"_type": "fs-file", "_title": n, "fs-size": str(l)}
+                    for n, l in listing.items()])
+            try:
+                return c.read_file(filename)
+            except KeyError:
+                raise _RWSError(404, f"File not found {filename}")
+        if method == "PUT":
+            c.write_file(filename, body)
+            return None
+        if method == "DELETE":
+            c.delete_file(filename)
+            return None
+        if method == "POST" and action == "copy":
+            try:
+                c.copy_file(filename, form["fs-newname"])
+            except KeyError:
+                raise _RWSError(404, f"File not found {filename}")
+            return None
+        raise _RWSError(400, f"Invalid file request {method} {filename}")
+
+class _MockRWSHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class MockRWSServer:
+    """
+    Local HTTP server implementing the Robot Web Services used by the motion program clients, backed by a
+    :class:`MockRWSController`. Use ``base_url`` as the client base URL.
+
+    .. code-block:: python
+
+        with MockRWSServer(time_scale=0) as server:
+            client = MotionProgramExecClient(base_url=server.base_url)
+            log_results = client.execute_motion_program(mp)
+
+    :param host: The address to listen on
+    :param port: The port to listen on. Defaults to a free port
+    :param controller: The simulated controller. If None, a controller is created using ``controller_kwargs``
+    :param controller_kwargs: Keyword arguments passed to :class:`MockRWSController`
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, controller: MockRWSController = None,
+        **controller_kwargs):
+        if controller is None:
+            controller = MockRWSController(**controller_kwargs)
+        self.controller = controller
+        self._httpd = _MockRWSHTTPServer((host, port), _MockRWSRequestHandler)
+        self._httpd.rws_handler = _MockRWSHandler(controller)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving requests in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def close(self):
+        """Stop the server"""
+        self.controller.stop()
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,217 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import time
+from collections import deque
+from typing import Deque, List, NamedTuple, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramExecClient, MotionProgramResultLog, \
+    _adaptive_poll_delays
+from .job_queue import _normalize_job_programs
+
+# Period over which the rate of queued commands is estimated
+_RATE_WINDOW = 2.0
+
+class PreemptResult(NamedTuple):
+    """Crossover chosen by :class:`PreemptScheduler` for one preemption"""
+    preempt_number: int
+    """The preempt number of the replacement program"""
+    preempt_cmdnum: int
+    """The command number after which the controller switches to the replacement program"""
+    queued_cmdnum: int
+    """The queued command number read before choosing the crossover"""
+    margin: int
+    """The number of commands allowed to be queued while the program is uploaded and the signals are set"""
+    latency: float
+    """Time from reading the queued command number until the preempt signals were set, in seconds"""
+
+def _get_command_count(motion_programs: List[MotionProgram]) -> int:
+    # The controller preempts all tasks at the same command number, so the shortest program limits the crossover
+    return min(len(mp._commands) for mp in motion_programs)
+
+class _PreemptSchedulerBase:
+    def __init__(self, safety_factor: float, min_margin: int, initial_latency: float, latency_history: int):
+        self.safety_factor = safety_factor
+        self.min_margin = min_margin
+        self.initial_latency = initial_latency
+        self.latencies: Deque[float] = deque(maxlen=latency_history)
+        """Measured preempt latencies in seconds, oldest first"""
+        self.preempt_number = 0
+        """The preempt number of the last preemption"""
+        self.tasks = None
+        self.prev_seqnum = None
+        self._samples = deque()
+        self._segment_end = 0
+        self._pending: PreemptResult = None
+        self._pending_segment_end = 0
+
+    def _begin(self, motion_programs, tasks, t: float):
+        self.tasks = tasks
+        self.preempt_number = 0
+        self._samples.clear()
+        self._samples.append((t, 0))
+        self._segment_end = _get_command_count(motion_programs)
+        self._pending = None
+
+    def _add_sample(self, t: float, queued_cmdnum: int):
+        self._samples.append((t, queued_cmdnum))
+        while len(self._samples) > 2 and self._samples[1][0] < t - _RATE_WINDOW:
+            self._samples.popleft()
+
+    def get_command_rate(self) -> float:
+        """Estimated number of commands queued by the controller per second"""
+        (t0, q0), (t1, q1) = self._samples[0], self._samples[-1]
+        if t1 <= t0:
+            return 0.0
+        return (q1 - q0) / (t1 - t0)
+
+    def get_latency(self) -> float:
+        """Estimated time to upload a replacement program and set the preempt signals, in seconds"""
+        if len(self.latencies) == 0:
+            return self.initial_latency
+        return max(self.latencies)
+
+    def _update_preempt_current(self, preempt_current: int):
+        if self._pending is not None and preempt_current >= self._pending.preempt_number:
+            self._segment_end = self._pending_segment_end
+            self._pending = None
+
+    def _plan(self, motion_programs: List[MotionProgram], queued_cmdnum: int, t: float) -> PreemptResult:
+        # The queued command number is -1 until the controller reads the first command
+        queued_cmdnum = max(queued_cmdnum, 0)
+        self._add_sample(t, queued_cmdnum)
+        margin = self.min_margin + math.ceil(self.get_command_rate() * self.get_latency() * self.safety_factor)
+        preempt_cmdnum = queued_cmdnum + 1 + margin
+        if preempt_cmdnum > self._segment_end:
+            raise Exception(f"Cannot preempt motion program, crossover command {preempt_cmdnum} is after the "
+                f"last command {self._segment_end}")
+        for mp in motion_programs:
+            mp.first_cmd_num = preempt_cmdnum + 1
+        return PreemptResult(self.preempt_number + 1, preempt_cmdnum, queued_cmdnum, margin, 0.0)
+
+    def _preempted(self, motion_programs: List[MotionProgram], res: PreemptResult, t0: float, t1: float) \
+        -> PreemptResult:
+        res = res._replace(latency = t1 - t0)
+        self.latencies.append(res.latency)
+        self.preempt_number = res.preempt_number
+        # A pending preemption that has not been reached is replaced by the new one
+        self._pending = res
+        self._pending_segment_end = res.preempt_cmdnum + _get_command_count(motion_programs)
+        return res
+
+class PreemptScheduler(_PreemptSchedulerBase):
+    """
+    Preempt a running motion program at the earliest crossover command that can still be reached.
+
+    ``preempt_motion_program()`` requires the caller to choose the crossover command number. The controller reads
+    ahead of the executing command, and the replacement program must be uploaded and the preempt signals set before
+    the controller queues the crossover command, otherwise the program fails with a missed preempt error. The
+    scheduler reads the queued command number, estimates how many commands the controller will queue while the
+    preemption is sent from the command rate and the latency of previous preemptions, and chooses the first
+    crossover after that margin. The replacement program is renumbered to start after the crossover, and the
+    preempt number is incremented for each preemption.
+
+    A preemption sent before the previous one has been reached replaces it. The programs passed to
+    :meth:`preempt()` are modified by setting ``first_cmd_num``.
+
+    :param client: The client used to execute the programs
+    :param safety_factor: Multiplier applied to the estimated number of commands queued during the latency
+    :param min_margin: Minimum number of commands between the queued command and the crossover
+    :param initial_latency: Latency in seconds used before a preemption has been measured
+    :param latency_history: Number of measured latencies used for the estimate. The largest is used
+    """
+    def __init__(self, client: MotionProgramExecClient, safety_factor: float = 1.5, min_margin: int = 1,
+        initial_latency: float = 0.1, latency_history: int = 10):
+        super().__init__(safety_factor, min_margin, initial_latency, latency_history)
+        self.client = client
+
+    def start(self, motion_programs: Union[MotionProgram,List[MotionProgram]], tasks: Union[str,List[str]] = None,
+        seqno: int = None):
+        """
+        Start executing a motion program, or a MultiMove program if a list of programs is passed. The program
+        should start with ``first_cmd_num`` of 1 so the command numbers match the number of queued commands.
+
+        :param motion_programs: The motion program or list of motion programs
+        :param tasks: The RAPID task or list of tasks. Defaults to ``T_ROB1``, or T_ROBn for MultiMove
+        :param seqno: Optional motion program seqno override
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_programs, tasks)
+        t = time.perf_counter()
+        if len(motion_programs) == 1:
+            self.prev_seqnum = self.client.execute_motion_program(motion_programs[0], tasks[0], wait=False,
+                seqno=seqno)
+        else:
+            self.prev_seqnum = self.client.execute_multimove_motion_program(motion_programs, tasks, wait=False,
+                seqno=seqno)
+        self._begin(motion_programs, tasks, t)
+
+    def preempt(self, motion_programs: Union[MotionProgram,List[MotionProgram]], seqno: int = None) \
+        -> PreemptResult:
+        """
+        Preempt the running program at the earliest safe crossover command.
+
+        :param motion_programs: The replacement motion program, or list of programs for MultiMove
+        :param seqno: Optional motion program seqno override
+        :return: The chosen crossover
+        """
+        if self.tasks is None:
+            raise Exception("Motion program has not been started")
+        motion_programs, _ = _normalize_job_programs(motion_programs, self.tasks)
+        if self._pending is not None:
+            self._update_preempt_current(int(self.client.get_current_preempt_number()))
+        t0 = time.perf_counter()
+        queued_cmdnum = int(self.client.get_queued_cmdnum())
+        if self._pending is not None and queued_cmdnum >= self._pending.preempt_cmdnum:
+            # The controller is switching to the pending program, wait until it has so the crossover is checked
+            # against the correct program
+            self.wait_preempt()
+            t0 = time.perf_counter()
+            queued_cmdnum = int(self.client.get_queued_cmdnum())
+        res = self._plan(motion_programs, queued_cmdnum, t0)
+        if len(motion_programs) == 1:
+            self.client.preempt_motion_program(motion_programs[0], self.tasks[0], res.preempt_number,
+                res.preempt_cmdnum, seqno=seqno)
+        else:
+            self.client.preempt_multimove_motion_program(motion_programs, self.tasks, res.preempt_number,
+                res.preempt_cmdnum, seqno=seqno)
+        return self._preempted(motion_programs, res, t0, time.perf_counter())
+
+    def wait_preempt(self, preempt_number: int = None):
+        """
+        Wait until the controller has switched to a replacement program.
+
+        :param preempt_number: The preempt number to wait for. Defaults to the last preemption
+        """
+        if preempt_number is None:
+            preempt_number = self.preempt_number
+        for delay in _adaptive_poll_delays():
+            preempt_current = int(self.client.get_current_preempt_number())
+            self._update_preempt_current(preempt_current)
+            if preempt_current >= preempt_number:
+                return
+            if not self.client.is_motion_program_running():
+                if int(self.client.get_current_preempt_number()) >= preempt_number:
+                    return
+                raise Exception(f"Motion program stopped before preempt {preempt_number} was reached")
+            time.sleep(delay)
+
+    def wait_complete(self) -> MotionProgramResultLog:
+        """
+        Wait for the motion program to complete and read the result log
+
+        :return: The result log
+        """
+        self.client.wait_motion_program_complete()
+        return self.client.read_motion_program_result_log(self.prev_seqnum)
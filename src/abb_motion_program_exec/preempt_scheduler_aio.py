@@ -0,0 +1,117 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from typing import List, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, _adaptive_poll_delays
+from .abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from .job_queue import _normalize_job_programs
+from .preempt_scheduler import _PreemptSchedulerBase, PreemptResult
+
+class PreemptSchedulerAIO(_PreemptSchedulerBase):
+    """
+    Preempt a running motion program at the earliest crossover command that can still be reached using AsyncIO
+
+    This class is functionally identical to :class:`abb_motion_program_exec.preempt_scheduler.PreemptScheduler`
+    except it uses AsyncIO instead of synchronous blocking operations.
+
+    :param client: The client used to execute the programs
+    :param safety_factor: Multiplier applied to the estimated number of commands queued during the latency
+    :param min_margin: Minimum number of commands between the queued command and the crossover
+    :param initial_latency: Latency in seconds used before a preemption has been measured
+    :param latency_history: Number of measured latencies used for the estimate. The largest is used
+    """
+    def __init__(self, client: MotionProgramExecClientAIO, safety_factor: float = 1.5, min_margin: int = 1,
+        initial_latency: float = 0.1, latency_history: int = 10):
+        super().__init__(safety_factor, min_margin, initial_latency, latency_history)
+        self.client = client
+
+    async def start(self, motion_programs: Union[MotionProgram,List[MotionProgram]],
+        tasks: Union[str,List[str]] = None, seqno: int = None):
+        """
+        Start executing a motion program, or a MultiMove program if a list of programs is passed. The program
+        should start with ``first_cmd_num`` of 1 so the command numbers match the number of queued commands.
+
+        :param motion_programs: The motion program or list of motion programs
+        :param tasks: The RAPID task or list of tasks. Defaults to ``T_ROB1``, or T_ROBn for MultiMove
+        :param seqno: Optional motion program seqno override
+        """
+        motion_programs, tasks = _normalize_job_programs(motion_programs, tasks)
+        t = time.perf_counter()
+        if len(motion_programs) == 1:
+            self.prev_seqnum = await self.client.execute_motion_program(motion_programs[0], tasks[0], wait=False,
+                seqno=seqno)
+        else:
+            self.prev_seqnum = await self.client.execute_multimove_motion_program(motion_programs, tasks,
+                wait=False, seqno=seqno)
+        self._begin(motion_programs, tasks, t)
+
+    async def preempt(self, motion_programs: Union[MotionProgram,List[MotionProgram]], seqno: int = None) \
+        -> PreemptResult:
+        """
+        Preempt the running program at the earliest safe crossover command.
+
+        :param motion_programs: The replacement motion program, or list of programs for MultiMove
+        :param seqno: Optional motion program seqno override
+        :return: The chosen crossover
+        """
+        if self.tasks is None:
+            raise Exception("Motion program has not been started")
+        motion_programs, _ = _normalize_job_programs(motion_programs, self.tasks)
+        if self._pending is not None:
+            self._update_preempt_current(int(await self.client.get_current_preempt_number()))
+        t0 = time.perf_counter()
+        queued_cmdnum = int(await self.client.get_queued_cmdnum())
+        if self._pending is not None and queued_cmdnum >= self._pending.preempt_cmdnum:
+            await self.wait_preempt()
+            t0 = time.perf_counter()
+            queued_cmdnum = int(await self.client.get_queued_cmdnum())
+        res = self._plan(motion_programs, queued_cmdnum, t0)
+        if len(motion_programs) == 1:
+            await self.client.preempt_motion_program(motion_programs[0], self.tasks[0], res.preempt_number,
+                res.preempt_cmdnum, seqno=seqno)
+        else:
+            await self.client.preempt_multimove_motion_program(motion_programs, self.tasks, res.preempt_number,
+                res.preempt_cmdnum, seqno=seqno)
+        return self._preempted(motion_programs, res, t0, time.perf_counter())
+
+    async def wait_preempt(self, preempt_number: int = None):
+        """
+        Wait until the controller has switched to a replacement program.
+
+        :param preempt_number: The preempt number to wait for. Defaults to the last preemption
+        """
+        if preempt_number is None:
+            preempt_number = self.preempt_number
+        for delay in _adaptive_poll_delays():
+            preempt_current = int(await self.client.get_current_preempt_number())
+            self._update_preempt_current(preempt_current)
+            if preempt_current >= preempt_number:
+                return
+            if not await self.client.is_motion_program_running():
+                if int(await self.client.get_current_preempt_number()) >= preempt_number:
+                    return
+                raise Exception(f"Motion program stopped before preempt {preempt_number} was reached")
+            await asyncio.sleep(delay)
+
+    async def wait_complete(self) -> MotionProgramResultLog:
+        """
+        Wait for the motion program to complete and read the result log
+
+        :return: The result log
+        """
+        await self.client.wait_motion_program_complete()
+        return await self.client.read_motion_program_result_log(self.prev_seqnum)
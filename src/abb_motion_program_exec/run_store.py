@@ -0,0 +1,278 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import os
+import threading
+import time
+from typing import List, NamedTuple, Union
+import numpy as np
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, load_motion_program_result_log
+from .commands import util
+from .log_segments import MotionProgramLogSegments, _SEGMENT_INDEX_DTYPE, _set_log_segments
+from .upload_cache import MotionProgramUploadCache
+
+_RUN_INDEX_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("seqno", "<i8"),
+    ("tasks", "S32"),
+    ("program_hash", "S32"),
+    ("duration", "<f4"),
+    ("command_count", "<i4"),
+    ("sample_count", "<i4")
+])
+
+class MotionProgramRunRecord(NamedTuple):
+    """
+    Index entry of a run stored in ``MotionProgramRunStore``
+    """
+    run_id: int
+    """The run number, in the order the runs were added"""
+    time: float
+    """The time the run was added, in seconds since the epoch"""
+    seqno: int
+    """The motion program seqno, or -1 if unknown"""
+    tasks: List[str]
+    """The RAPID tasks of the run. MultiMove runs have more than one task"""
+    program_hash: str
+    """The hash of the motion programs, from ``MotionProgramRunStore.get_program_hash()``"""
+    duration: float
+    """The duration of the result log in seconds"""
+    command_count: int
+    """The total number of commands in the motion programs"""
+    sample_count: int
+    """The number of samples in the result log"""
+
+def _get_program_digest(mp: MotionProgram) -> str:
+    # The timestamp and seqno in the header change each time the same program is generated, so they are left
+    # out of the digest
+    header_pre, header_post = mp._get_header_parts()
+    header_pre = header_pre[:len(header_pre) - len(util.str_to_bin(mp.get_timestamp()))]
+    commands_b = mp._commands.get_commands_bytes(mp.first_cmd_num)
+    return MotionProgramUploadCache.get_digest(header_pre + header_post + bytes(commands_b))
+
+class MotionProgramRunStore:
+    """
+    Local archive of motion program runs. Each run stores the result log file and the motion programs in a
+    directory, and appends a fixed size entry to an index file.
+
+    The directory contains:
+
+    * ``index.bin`` - The run index. Each run is one record containing the time, seqno, tasks, program hash,
+      duration, command count, and sample count
+    * ``logs/YYYY-MM-DD/<run_id>.bin`` - The result log of each run, in the controller file format
+    * ``logs/YYYY-MM-DD/<run_id>-segments.bin`` - The command segment index of each run, see
+      ``MotionProgramResultLog.segments``
+    * ``programs/<program_hash>/<task>.bin`` - The motion programs. Runs of the same program share the files
+
+    Queries are evaluated over a memory map of the index, and the result logs of the matching runs are loaded with
+    ``np.memmap``. Runs are never modified once added. Only one ``MotionProgramRunStore`` should add runs to a
+    directory at a time. Readers in other processes see runs added after they opened the store.
+
+    :param path: The directory of the store. Created if it does not exist
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(path, "logs"), exist_ok=True)
+        os.makedirs(os.path.join(path, "programs"), exist_ok=True)
+        self._index_filename = os.path.join(path, "index.bin")
+        # Drop a partial record left by an interrupted write, so the next record is aligned
+        with open(self._index_filename, "ab") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size % _RUN_INDEX_DTYPE.itemsize != 0:
+                f.truncate(size - size % _RUN_INDEX_DTYPE.itemsize)
+
+    @staticmethod
+    def get_program_hash(motion_programs: Union[MotionProgram,List[MotionProgram]]) -> str:
+        """
+        Get the hash used to find the runs of a motion program. The hash does not include the timestamp or seqno
+        of the program, so it is the same each time the program is generated.
+
+        :param motion_programs: The motion program, or list of motion programs for MultiMove
+        :return: The program hash
+        """
+        if isinstance(motion_programs, MotionProgram):
+            return _get_program_digest(motion_programs)
+        digests = [_get_program_digest(mp) for mp in motion_programs]
+        if len(digests) == 1:
+            return digests[0]
+        return MotionProgramUploadCache.get_digest(",".join(digests).encode("ascii"))
+
+    def add_run(self, result_log: MotionProgramResultLog, motion_programs: Union[MotionProgram,List[MotionProgram]],
+        tasks: Union[str,List[str]] = None, seqno: int = None, run_time: float = None) -> MotionProgramRunRecord:
+        """
+        Add a run to the store
+
+        :param result_log: The result log of the run
+        :param motion_programs: The motion program, or list of motion programs for MultiMove
+        :param tasks: The RAPID task or list of tasks. Defaults to ``T_ROB1``, or T_ROBn for MultiMove
+        :param seqno: The motion program seqno
+        :param run_time: The time of the run in seconds since the epoch. Defaults to the current time
+        :return: The index entry of the run
+        """
+        if isinstance(motion_programs, MotionProgram):
+            motion_programs = [motion_programs]
+        if tasks is None:
+            tasks = ["T_ROB1"] if len(motion_programs) == 1 else [f"T_ROB{i+1}" for i in range(len(motion_programs))]
+        elif isinstance(tasks, str):
+            tasks = [tasks]
+        if len(tasks) != len(motion_programs):
+            raise Exception("Number of tasks must match number of motion programs")
+        tasks_str = ",".join(tasks)
+        if len(tasks_str) > _RUN_INDEX_DTYPE["tasks"].itemsize:
+            raise Exception(f"Task names too long: {tasks_str}")
+        if run_time is None:
+            run_time = time.time()
+
+        program_hash = self.get_program_hash(motion_programs)
+        program_dir = os.path.join(self.path, "programs", program_hash)
+
+        data = result_log.data
+        r = np.zeros(1, dtype=_RUN_INDEX_DTYPE)
+        r["time"] = run_time
+        r["seqno"] = seqno if seqno is not None else -1
+        r["tasks"] = tasks_str.encode("ascii")
+        r["program_hash"] = program_hash.encode("ascii")
+        r["duration"] = float(data[-1,0] - data[0,0]) if len(data) > 0 else 0.0
+        r["command_count"] = sum(len(mp._commands) for mp in motion_programs)
+        r["sample_count"] = len(data)
+
+        with self._lock:
+            os.makedirs(program_dir, exist_ok=True)
+            for task, mp in zip(tasks, motion_programs):
+                # Each file is written to a temporary file and renamed, so an interrupted write never leaves a
+                # partial program. Runs of the same program on other tasks add their own files.
+                program_filename = os.path.join(program_dir, f"{task}.bin")
+                if not os.path.isfile(program_filename):
+                    with open(program_filename + ".tmp", "wb") as f:
+                        mp.write_program(f)
+                    os.replace(program_filename + ".tmp", program_filename)
+            with open(self._index_filename, "ab") as f:
+                run_id = f.seek(0, os.SEEK_END) // _RUN_INDEX_DTYPE.itemsize
+                log_filename = self._get_log_filename(run_id, run_time)
+                os.makedirs(os.path.dirname(log_filename), exist_ok=True)
+                result_log.save(log_filename)
+                result_log.segments.to_array().tofile(self._get_segments_filename(log_filename))
+                # The record is written after the log, so the index never refers to a missing file
+                f.write(r.tobytes())
+        return self._to_record(run_id, r[0])
+
+    def __len__(self) -> int:
+        return os.path.getsize(self._index_filename) // _RUN_INDEX_DTYPE.itemsize
+
+    def _read_index(self) -> np.ndarray:
+        n = len(self)
+        if n == 0:
+            return np.zeros(0, dtype=_RUN_INDEX_DTYPE)
+        return np.memmap(self._index_filename, dtype=_RUN_INDEX_DTYPE, mode="r", shape=(n,))
+
+    def find_runs(self, program_hash: str = None, task: str = None, start_time: float = None,
+        end_time: float = None, seqno: int = None) -> List[MotionProgramRunRecord]:
+        """
+        Find runs in the store. All specified conditions must match.
+
+        :param program_hash: Only return runs of this program hash. See ``get_program_hash()``
+        :param task: Only return runs that include this RAPID task
+        :param start_time: Only return runs added at or after this time, in seconds since the epoch
+        :param end_time: Only return runs added before this time, in seconds since the epoch
+        :param seqno: Only return runs with this seqno
+        :return: The matching runs, in the order they were added
+        """
+        index = self._read_index()
+        mask = np.ones(len(index), dtype=np.bool_)
+        if program_hash is not None:
+            mask &= index["program_hash"] == program_hash.encode("ascii")
+        if start_time is not None:
+            mask &= index["time"] >= start_time
+        if end_time is not None:
+            mask &= index["time"] < end_time
+        if seqno is not None:
+            mask &= index["seqno"] == seqno
+        run_ids = np.flatnonzero(mask)
+        records = [self._to_record(int(i), index[i]) for i in run_ids]
+        if task is not None:
+            records = [r for r in records if task in r.tasks]
+        return records
+
+    def get_run(self, run_id: int) -> MotionProgramRunRecord:
+        """
+        Get the index entry of a run
+
+        :param run_id: The run number
+        :return: The index entry
+        """
+        index = self._read_index()
+        if run_id < 0 or run_id >= len(index):
+            raise Exception(f"Invalid run_id {run_id}")
+        return self._to_record(run_id, index[run_id])
+
+    def load_log(self, run: Union[MotionProgramRunRecord,int], mmap: bool = True) -> MotionProgramResultLog:
+        """
+        Load the result log of a run
+
+        :param run: The index entry or run number
+        :param mmap: Memory map the log file instead of reading it
+        :return: The result log
+        """
+        if not isinstance(run, MotionProgramRunRecord):
+            run = self.get_run(run)
+        log_filename = self._get_log_filename(run.run_id, run.time)
+        log = load_motion_program_result_log(log_filename, mmap)
+        # Use the stored segment index instead of reading the cmd_num column of the log
+        segments_filename = self._get_segments_filename(log_filename)
+        if os.path.isfile(segments_filename):
+            index = np.fromfile(segments_filename, dtype=_SEGMENT_INDEX_DTYPE)
+            _set_log_segments(log, MotionProgramLogSegments(log, index))
+        return log
+
+    def load_logs(self, runs: List[MotionProgramRunRecord], mmap: bool = True) -> List[MotionProgramResultLog]:
+        """
+        Load the result logs of a list of runs, for example returned by ``find_runs()``
+
+        :param runs: The index entries
+        :param mmap: Memory map the log files instead of reading them
+        :return: The result logs
+        """
+        return [self.load_log(r, mmap) for r in runs]
+
+    def read_programs(self, run: Union[MotionProgramRunRecord,int]) -> List[bytes]:
+        """
+        Read the binary motion programs of a run, in the order of ``tasks``
+
+        :param run: The index entry or run number
+        :return: The motion program bytes
+        """
+        if not isinstance(run, MotionProgramRunRecord):
+            run = self.get_run(run)
+        o = []
+        for task in run.tasks:
+            with open(os.path.join(self.path, "programs", run.program_hash, f"{task}.bin"), "rb") as f:
+                o.append(f.read())
+        return o
+
+    def _get_log_filename(self, run_id: int, run_time: float) -> str:
+        day = datetime.datetime.fromtimestamp(run_time, datetime.timezone.utc).strftime("%Y-%m-%d")
+        return os.path.join(self.path, "logs", day, f"{run_id:09d}.bin")
+
+    @staticmethod
+    def _get_segments_filename(log_filename: str) -> str:
+        return log_filename[:-len(".bin")] + "-segments.bin"
+
+    @staticmethod
+    def _to_record(run_id: int, r) -> MotionProgramRunRecord:
+        return MotionProgramRunRecord(run_id, float(r["time"]), int(r["seqno"]),
+            r["tasks"].decode("ascii").split(","), r["program_hash"].decode("ascii"), float(r["duration"]),
+            int(r["command_count"]), int(r["sample_count"]))
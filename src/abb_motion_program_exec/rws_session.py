@@ -0,0 +1,70 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+
+# abb_robot_client does not provide requests with custom headers, or requests that return the status code instead of
+# raising an exception, so the private session of the RWS client is used for these requests. The helpers check the
+# private attributes exist, and callers fall back to the public API if they do not, for example with a different
+# version of abb_robot_client.
+
+def _get_rws_session(abb_client):
+    # Returns the requests session of an RWS client, or None if it is not available. Requests must pass
+    # auth=abb_client.auth.
+    if not all(hasattr(abb_client, a) for a in ("_session", "auth", "_process_response")):
+        return None
+    return abb_client._session
+
+def _get_rws_aio_session(abb_client_aio):
+    # Returns the httpx client of an RWS_AIO client, or None if it is not available
+    if not all(hasattr(abb_client_aio, a) for a in ("_session", "_process_response")):
+        return None
+    return abb_client_aio._session
+
+def _get_range_content(status_code: int, headers, content: bytes, offset: int) -> bytes:
+    # The Range header is ignored by servers that do not support it, in which case the whole file is returned
+    if status_code == 416:
+        return b""
+    if status_code == 206:
+        m = re.match(r"bytes (\d+)\-", headers.get("Content-Range", ""))
+        start = int(m.group(1)) if m else offset
+        return content[offset - start:] if start <= offset else b""
+    return content[offset:]
+
+def _read_file_range(abb_client, filename: str, offset: int) -> bytes:
+    # Read a file from the controller starting at offset
+    session = _get_rws_session(abb_client)
+    if session is None:
+        # Read the whole file with the public API, and drop the bytes before offset
+        return abb_client.read_file(filename)[offset:]
+    url = "/".join([abb_client.base_url, "fileservice", filename])
+    res = session.get(url, auth=abb_client.auth, headers={"Range": f"bytes={offset}-"})
+    try:
+        assert res.ok or res.status_code == 416, f"File not found {filename}"
+        return _get_range_content(res.status_code, res.headers, res.content, offset)
+    finally:
+        res.close()
+
+async def _read_file_range_aio(abb_client_aio, filename: str, offset: int) -> bytes:
+    session = _get_rws_aio_session(abb_client_aio)
+    if session is None:
+        return (await abb_client_aio.read_file(filename))[offset:]
+    url = "/".join([abb_client_aio.base_url, "fileservice", filename])
+    res = await session.get(url, headers={"Range": f"bytes={offset}-"})
+    try:
+        assert res.is_success or res.status_code == 416, f"File not found {filename}"
+        return _get_range_content(res.status_code, res.headers, res.content, offset)
+    finally:
+        await res.aclose()
@@ -0,0 +1,162 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import time
+from typing import Iterable, Iterator, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramExecClient, MotionProgramResultLog, \
+    _get_motion_program_file, _adaptive_poll_delays
+from .commands.command_base import CommandBase
+from .commands.rapid_types import tooldata, wobjdata, loaddata
+
+def _iter_stream_windows(commands: Union[MotionProgram,Iterable[CommandBase]], window_size: int, tool: tooldata,
+    wobj: wobjdata, gripload: loaddata) -> Iterator[MotionProgram]:
+    # Split the commands into motion programs of window_size commands, numbered as one continuous program. The
+    # first window carries the header of the program, the later windows are preempt programs.
+    timestamp = None
+    egm_config = None
+    if isinstance(commands, MotionProgram):
+        tool, wobj, gripload = commands.tool, commands.wobj, commands.gripload
+        timestamp = commands.get_timestamp()
+        egm_config = commands._egm_config
+        commands = (cmd for _, cmd in commands._iter_commands())
+    it = iter(commands)
+    first_cmd_num = 1
+    while True:
+        mp = MotionProgram(first_cmd_num=first_cmd_num, tool=tool, wobj=wobj, gripload=gripload,
+            timestamp=timestamp if first_cmd_num == 1 else None, egm_config=egm_config)
+        for cmd in itertools.islice(it, window_size):
+            # The window programs are discarded once uploaded, so they do not track changes to the commands
+            mp._append_command(cmd, track_modified=False)
+        n = len(mp._commands)
+        if n == 0:
+            return
+        yield mp
+        first_cmd_num += n
+
+class StreamingExecutor:
+    """
+    Execute a motion program of any length by uploading it in windows of ``window_size`` commands.
+
+    The first window is started as a normal motion program. Each following window is uploaded as a preempt
+    program with the crossover at the last command of the previous window, so the controller continues into the
+    next window without stopping. A window is uploaded while the window before the previous one is still
+    executing, and the preempt signals for it are set as soon as the controller switches to the previous window.
+    Only three windows are kept in memory and on the controller RAMDISK at a time, and motion starts as soon as the
+    first window is uploaded.
+
+    The time to execute a window must be longer than the time to set the preempt signals, otherwise the program
+    fails with a missed preempt error. Windows of a few hundred commands are sufficient for most programs.
+
+    :param client: The client used to execute the program
+    :param window_size: Number of commands in each window
+    :param task: The RAPID task used to execute the program. Defaults to ``T_ROB1``
+    :param delete_files: Delete the window files from the controller once they have been executed
+    """
+    def __init__(self, client: MotionProgramExecClient, window_size: int = 1000, task: str = "T_ROB1",
+        delete_files: bool = True):
+        self.client = client
+        self.window_size = window_size
+        self.task = task
+        self.delete_files = delete_files
+        self.window_count = 0
+        """Number of windows uploaded by the last ``execute()`` call"""
+        self.command_count = 0
+        """Number of commands uploaded by the last ``execute()`` call"""
+
+    def execute(self, commands: Union[MotionProgram,Iterable[CommandBase]], tool: tooldata = None,
+        wobj: wobjdata = None, gripload: loaddata = None) -> MotionProgramResultLog:
+        """
+        Stream commands to the controller and wait for the program to complete.
+
+        :param commands: A motion program, or an iterable of commands such as
+                         :class:`abb_motion_program_exec.commands.commands.MoveLCommand`. Generators are consumed
+                         one window at a time
+        :param tool: The tool used if ``commands`` is not a motion program
+        :param wobj: The work object used if ``commands`` is not a motion program
+        :param gripload: The grip load used if ``commands`` is not a motion program
+        :return: The result log of the program
+        """
+        client = self.client
+        windows = _iter_stream_windows(commands, self.window_size, tool, wobj, gripload)
+        mp = next(windows, None)
+        if mp is None:
+            raise Exception("Motion program must not be empty")
+        ramdisk = client.abb_client.get_ramdisk_path()
+        self.window_count = 1
+        self.command_count = len(mp._commands)
+        # The RAPID module clears the preempt signals when the program starts. motion_program_seqno is set to the
+        # seqno of the program once it has been opened, after the signals have been cleared.
+        client.abb_client.set_analog_io("motion_program_seqno", -1)
+        prev_seqnum = client.execute_motion_program(mp, self.task, wait=False)
+        self._wait_program_opened()
+
+        crossover = self.command_count
+        uploaded = dict()
+        next_mp = next(windows, None)
+        if next_mp is not None:
+            uploaded[1] = self._upload_window(ramdisk, next_mp, 1)
+        preempt_number = 0
+        while next_mp is not None:
+            preempt_number += 1
+            if preempt_number > 1:
+                if not self._wait_preempt(preempt_number - 1):
+                    # The program stopped early, read_motion_program_result_log() reports the error
+                    break
+                self._delete_window(uploaded.pop(preempt_number - 2, None))
+            client.abb_client.set_analog_io("motion_program_preempt_cmd_num", crossover)
+            client.abb_client.set_analog_io("motion_program_preempt", preempt_number)
+            crossover += len(next_mp._commands)
+            next_mp = next(windows, None)
+            if next_mp is not None:
+                uploaded[preempt_number + 1] = self._upload_window(ramdisk, next_mp, preempt_number + 1)
+
+        client.wait_motion_program_complete()
+        try:
+            return client.read_motion_program_result_log(prev_seqnum)
+        finally:
+            for filename in uploaded.values():
+                self._delete_window(filename)
+
+    def _upload_window(self, ramdisk: str, mp: MotionProgram, preempt_number: int) -> str:
+        filename, b = _get_motion_program_file(ramdisk, mp, self.task, preempt_number)
+        self.client.abb_client.upload_file(filename, b)
+        self.window_count += 1
+        self.command_count += len(mp._commands)
+        return filename
+
+    def _delete_window(self, filename: str):
+        if filename is None or not self.delete_files:
+            return
+        try:
+            self.client.abb_client.delete_file(filename)
+        except Exception:
+            pass
+
+    def _wait_program_opened(self):
+        for delay in _adaptive_poll_delays():
+            if self.client.abb_client.get_analog_io("motion_program_seqno") != -1:
+                return
+            if not self.client.is_motion_program_running():
+                return
+            time.sleep(delay)
+
+    def _wait_preempt(self, preempt_number: int) -> bool:
+        for delay in _adaptive_poll_delays():
+            if self.client.get_current_preempt_number() >= preempt_number:
+                return True
+            if not self.client.is_motion_program_running():
+                return self.client.get_current_preempt_number() >= preempt_number
+            time.sleep(delay)
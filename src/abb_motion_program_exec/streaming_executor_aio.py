@@ -0,0 +1,131 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Iterable, Union
+from .abb_motion_program_exec_client import MotionProgram, MotionProgramResultLog, _get_motion_program_file, \
+    _adaptive_poll_delays
+from .abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from .commands.command_base import CommandBase
+from .commands.rapid_types import tooldata, wobjdata, loaddata
+from .streaming_executor import _iter_stream_windows
+
+class StreamingExecutorAIO:
+    """
+    Execute a motion program of any length by uploading it in windows of ``window_size`` commands using AsyncIO
+
+    This class is functionally identical to :class:`abb_motion_program_exec.streaming_executor.StreamingExecutor`
+    except it uses AsyncIO instead of synchronous blocking operations.
+
+    :param client: The client used to execute the program
+    :param window_size: Number of commands in each window
+    :param task: The RAPID task used to execute the program. Defaults to ``T_ROB1``
+    :param delete_files: Delete the window files from the controller once they have been executed
+    """
+    def __init__(self, client: MotionProgramExecClientAIO, window_size: int = 1000, task: str = "T_ROB1",
+        delete_files: bool = True):
+        self.client = client
+        self.window_size = window_size
+        self.task = task
+        self.delete_files = delete_files
+        self.window_count = 0
+        """Number of windows uploaded by the last ``execute()`` call"""
+        self.command_count = 0
+        """Number of commands uploaded by the last ``execute()`` call"""
+
+    async def execute(self, commands: Union[MotionProgram,Iterable[CommandBase]], tool: tooldata = None,
+        wobj: wobjdata = None, gripload: loaddata = None) -> MotionProgramResultLog:
+        """
+        Stream commands to the controller and wait for the program to complete.
+
+        :param commands: A motion program, or an iterable of commands such as
+                         :class:`abb_motion_program_exec.commands.commands.MoveLCommand`. Generators are consumed
+                         one window at a time
+        :param tool: The tool used if ``commands`` is not a motion program
+        :param wobj: The work object used if ``commands`` is not a motion program
+        :param gripload: The grip load used if ``commands`` is not a motion program
+        :return: The result log of the program
+        """
+        client = self.client
+        windows = _iter_stream_windows(commands, self.window_size, tool, wobj, gripload)
+        mp = next(windows, None)
+        if mp is None:
+            raise Exception("Motion program must not be empty")
+        ramdisk = await client._get_ramdisk_path()
+        self.window_count = 1
+        self.command_count = len(mp._commands)
+        # The RAPID module clears the preempt signals when the program starts. motion_program_seqno is set to the
+        # seqno of the program once it has been opened, after the signals have been cleared.
+        await client.abb_client_aio.set_analog_io("motion_program_seqno", -1)
+        prev_seqnum = await client.execute_motion_program(mp, self.task, wait=False)
+        await self._wait_program_opened()
+
+        crossover = self.command_count
+        uploaded = dict()
+        next_mp = next(windows, None)
+        if next_mp is not None:
+            uploaded[1] = await self._upload_window(ramdisk, next_mp, 1)
+        preempt_number = 0
+        while next_mp is not None:
+            preempt_number += 1
+            if preempt_number > 1:
+                if not await self._wait_preempt(preempt_number - 1):
+                    # The program stopped early, read_motion_program_result_log() reports the error
+                    break
+                await self._delete_window(uploaded.pop(preempt_number - 2, None))
+            await client.abb_client_aio.set_analog_io("motion_program_preempt_cmd_num", crossover)
+            await client.abb_client_aio.set_analog_io("motion_program_preempt", preempt_number)
+            crossover += len(next_mp._commands)
+            next_mp = next(windows, None)
+            if next_mp is not None:
+                uploaded[preempt_number + 1] = await self._upload_window(ramdisk, next_mp, preempt_number + 1)
+
+        await client.wait_motion_program_complete()
+        try:
+            return await client.read_motion_program_result_log(prev_seqnum)
+        finally:
+            for filename in uploaded.values():
+                await self._delete_window(filename)
+
+    async def _upload_window(self, ramdisk: str, mp: MotionProgram, preempt_number: int) -> str:
+        filename, b = _get_motion_program_file(ramdisk, mp, self.task, preempt_number)
+        await self.client.abb_client_aio.upload_file(filename, b)
+        self.window_count += 1
+        self.command_count += len(mp._commands)
+        return filename
+
+    async def _delete_window(self, filename: str):
+        if filename is None or not self.delete_files:
+            return
+        try:
+            await self.client.abb_client_aio.delete_file(filename)
+        except Exception:
+            pass
+
+    async def _wait_program_opened(self):
+        for delay in _adaptive_poll_delays():
+            if await self.client.abb_client_aio.get_analog_io("motion_program_seqno") != -1:
+                return
+            if not await self.client.is_motion_program_running():
+                return
+            await asyncio.sleep(delay)
+
+    async def _wait_preempt(self, preempt_number: int) -> bool:
+        for delay in _adaptive_poll_delays():
+            if await self.client.get_current_preempt_number() >= preempt_number:
+                return True
+            if not await self.client.is_motion_program_running():
+                return await self.client.get_current_preempt_number() >= preempt_number
+            await asyncio.sleep(delay)
@@ -0,0 +1,157 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+class _CachedProgramFile(NamedTuple):
+    filename: str
+    size: int
+
+class MotionProgramUploadCache:
+    """
+    Cache of motion program files on the controller RAMDISK. Pass an instance to ``MotionProgramExecClient``
+    or ``MotionProgramExecClientAIO`` to enable the cache.
+
+    The controller always reads the motion program from a fixed filename, for example ``motion_program.bin``
+    for ``T_ROB1``. The cache remembers the hash of the program last uploaded to each filename, and skips the
+    upload if the same program is executed again and the file is still present on the RAMDISK with the
+    same size. Copies of recently used programs are also kept on the RAMDISK under content addressed filenames.
+    When a cached program is executed again after a different program, it is copied to the fixed filename on the
+    controller instead of being uploaded over the network. The number of cached copies is bounded, and the least
+    recently used copies are deleted from the RAMDISK.
+
+    The cache assumes the client is the only writer of motion program files on the controller. Call ``clear()``
+    if the files may have been modified by another client.
+
+    :param max_programs: The maximum number of program copies to keep on the RAMDISK
+    :param max_bytes: The maximum total size of the program copies kept on the RAMDISK
+    :param server_copy: Keep copies of programs on the RAMDISK. If False, only skip uploads of the program
+                        currently stored in each fixed filename
+    """
+    def __init__(self, max_programs: int = 32, max_bytes: int = 64*1024*1024, server_copy: bool = True):
+        self.max_programs = max_programs
+        self.max_bytes = max_bytes
+        self.server_copy = server_copy
+        self._targets: Dict[str,Tuple[str,int]] = dict()
+        self._programs: "OrderedDict[str,_CachedProgramFile]" = OrderedDict()
+        self._programs_bytes = 0
+        self.hits = 0
+        """Number of uploads skipped because the program was already in the target file"""
+        self.copies = 0
+        """Number of uploads replaced by a copy on the controller"""
+        self.misses = 0
+        """Number of programs uploaded"""
+
+    @staticmethod
+    def get_digest(b: bytes) -> str:
+        """Return the hash used to identify program bytes"""
+        return hashlib.blake2b(b, digest_size=16).hexdigest()
+
+    def is_target_current(self, filename: str, digest: str, size: int, ramdisk_files: Dict[str,int]) -> bool:
+        """
+        Check if ``filename`` already contains the program with ``digest``
+
+        :param filename: The full path of the target file
+        :param digest: The program digest
+        :param size: The program size in bytes
+        :param ramdisk_files: The files on the RAMDISK and their size, or None if the size is unknown
+        """
+        target = self._targets.get(filename, None)
+        if target is None or target != (digest, size):
+            return False
+        return _file_matches(filename, size, ramdisk_files)
+
+    def get_program_copy(self, digest: str, ramdisk_files: Dict[str,int]) -> str:
+        """
+        Return the filename of the cached copy of program ``digest``, or None if there is no valid copy.
+        Marks the copy as recently used.
+        """
+        p = self._programs.get(digest, None)
+        if p is None:
+            return None
+        if not _file_matches(p.filename, p.size, ramdisk_files):
+            self.discard_program_copy(digest)
+            return None
+        self._programs.move_to_end(digest)
+        return p.filename
+
+    def set_target(self, filename: str, digest: str, size: int):
+        """Record that ``filename`` contains the program with ``digest``"""
+        self._targets[filename] = (digest, size)
+
+    def forget_target(self, filename: str):
+        """Forget the contents of ``filename``, for instance before it is overwritten"""
+        self._targets.pop(filename, None)
+
+    def add_program_copy(self, digest: str, size: int, ramdisk: str) -> Tuple[str,List[str]]:
+        """
+        Add a copy of a program to the cache.
+
+        :param digest: The program digest
+        :param size: The program size in bytes
+        :param ramdisk: The RAMDISK path
+        :return: The filename to copy the program to, and the list of evicted copies to delete from the controller.
+                 The filename is None if the program should not be copied
+        """
+        if not self.server_copy or digest in self._programs or size > self.max_bytes:
+            return None, []
+        filename = f"{ramdisk}/motion_program-cache-{digest}.bin"
+        self._programs[digest] = _CachedProgramFile(filename, size)
+        self._programs_bytes += size
+        evicted = []
+        while len(self._programs) > self.max_programs or self._programs_bytes > self.max_bytes:
+            _, p = self._programs.popitem(last=False)
+            self._programs_bytes -= p.size
+            evicted.append(p.filename)
+        return filename, evicted
+
+    def discard_program_copy(self, digest: str):
+        """Remove a program copy from the cache, for instance if copying the file failed"""
+        p = self._programs.pop(digest, None)
+        if p is not None:
+            self._programs_bytes -= p.size
+
+    def clear(self) -> List[str]:
+        """
+        Clear the cache.
+
+        :return: The filenames of the program copies, which may be deleted from the controller
+        """
+        filenames = [p.filename for p in self._programs.values()]
+        self._targets.clear()
+        self._programs.clear()
+        self._programs_bytes = 0
+        return filenames
+
+def _file_matches(filename, size, ramdisk_files):
+    name = filename.rsplit("/",1)[-1]
+    if name not in ramdisk_files:
+        return False
+    file_size = ramdisk_files[name]
+    return file_size is None or file_size == size
+
+def parse_file_listing(res_json) -> Dict[str,int]:
+    # RWS directory listings include the file size as fs-size
+    ret = dict()
+    for f in res_json["_embedded"]["_state"]:
+        size = f.get("fs-size", None)
+        ret[f["_title"]] = int(size) if size is not None else None
+    return ret
+
+def copy_file_url_and_payload(src: str, dst: str):
+    # RWS copies files on the controller using the fileservice copy action
+    return f"fileservice/{src}?action=copy", {"fs-newname": dst, "fs-overwrite": "true"}
@@ -0,0 +1,44 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import abb_motion_program_exec as abb
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+
+def _program(command_storage=None):
+    mp = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000", command_storage=command_storage)
+    mp.MoveAbsJ(j1, abb.v1000, abb.fine)
+    cmd = mp.MoveL(r1, abb.v1000, abb.z10)
+    mp.MoveAbsJ_batch(np.array([[i,2*i,3*i,0,10,0] for i in range(5)], dtype=np.float64), None, abb.v500,
+        abb.z10)
+    mp.WaitTime(0.1)
+    return mp, cmd
+
+def test_compact_storage_matches_list_storage():
+    mp, _ = _program(abb.CompactCommandStorage())
+    ref, _ = _program()
+    assert mp.get_program_bytes() == ref.get_program_bytes()
+
+def test_compact_storage_command_modified():
+    mp, cmd = _program(abb.CompactCommandStorage())
+    b = mp.get_program_bytes()
+    with pytest.raises(Exception):
+        cmd.speed = abb.v50
+    assert cmd.speed == abb.v1000
+    assert mp.get_program_bytes() == b
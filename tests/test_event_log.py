@@ -0,0 +1,67 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.event_log import EventLogCursor, MOTION_PROGRAM_EVENT_CODE, seqnum_after
+from abb_motion_program_exec.mock_rws import MockRWSServer
+
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+
+def _program():
+    mp = abb.MotionProgram()
+    mp.MoveL(r1, abb.v1000, abb.fine)
+    mp.WaitTime(0.05)
+    return mp
+
+def test_seqnum_after():
+    assert seqnum_after(2, 1)
+    assert not seqnum_after(1, 1)
+    assert not seqnum_after(1, 2)
+    assert seqnum_after(0, 0xFFFF)
+    assert not seqnum_after(0xFFFF, 0)
+
+def test_event_log_cursor():
+    with MockRWSServer(time_scale=0) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        cursor = EventLogCursor(client.abb_client, page_size=2)
+        assert cursor.read_new() == []
+        prev_seqnum = cursor.seqnum
+        client.execute_motion_program(_program())
+        entries = cursor.read_new()
+        assert len(entries) > 2
+        assert [e.seqnum for e in entries] == sorted((e.seqnum for e in entries), reverse=True)
+        assert all(seqnum_after(e.seqnum, prev_seqnum) for e in entries)
+        assert cursor.seqnum == entries[0].seqnum
+        # The entries of the motion program RAPID modules are indexed by code
+        log_messages = [e.args[0].lower() for e in reversed(cursor.entries_by_code[MOTION_PROGRAM_EVENT_CODE])]
+        opened = log_messages.index("motion program log file opened")
+        assert log_messages.index("motion program log file closed") > opened
+        assert sum(len(v) for v in cursor.entries_by_code.values()) == len(entries)
+        assert cursor.read_new() == []
+        assert cursor.entries_by_code == {}
+
+def test_motion_program_progress():
+    with MockRWSServer(time_scale=0) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        events = list(client.execute_motion_program_progress(_program()))
+        event_types = [e.event_type for e in events]
+        assert event_types[0] == "started"
+        assert event_types[-1] == "completed"
+        assert "log_opened" in event_types
+        assert "log_closed" in event_types
+        log_filename = next(e.log_filename for e in events if e.event_type == "log_opened")
+        assert log_filename.startswith("log-")
+        assert len(events[-1].result_log.data) > 0
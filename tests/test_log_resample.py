@@ -0,0 +1,57 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.log_resample import resample_motion_program_result_log, \
+    resample_motion_program_result_logs, get_motion_program_log_jitter
+
+_headers = ["timestamp", "cmdnum", "J1", "J2", "J3", "J4", "J5", "J6"]
+
+def _uniform_log(n, t0=0.0):
+    rng = np.random.default_rng(1)
+    data = np.empty((n, len(_headers)), dtype=np.float32)
+    data[:,0] = t0 + np.arange(n)*0.004
+    data[:,1] = np.arange(n)//10 - 1
+    data[:,2:] = rng.uniform(-1, 1, (n, 6))
+    return abb.MotionProgramResultLog("2024-01-01-00-00-00-0000", _headers, data)
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+@pytest.mark.parametrize("t0", [0.0, 12.5])
+def test_resample_uniform_log(method, t0):
+    log = _uniform_log(1000, t0)
+    resampled = resample_motion_program_result_log(log, method=method)
+    np.testing.assert_array_equal(resampled.data, log.data)
+
+def test_resample_logs():
+    logs = [_uniform_log(100), _uniform_log(50, 3.0)]
+    data = resample_motion_program_result_logs(logs)
+    assert data.shape == (2, 100, len(_headers))
+    np.testing.assert_array_equal(data[0,:,1:], logs[0].data[:,1:])
+    np.testing.assert_array_equal(data[1,:50,1:], logs[1].data[:,1:])
+    assert np.all(np.isnan(data[1,50:]))
+    with pytest.raises(Exception):
+        resample_motion_program_result_logs([_uniform_log(0)])
+
+def test_log_jitter():
+    log = _uniform_log(100)
+    log.data[50:,0] += 0.004
+    jitter = get_motion_program_log_jitter(log)
+    assert jitter.sample_count == 100
+    assert jitter.missed_samples == 1
+    assert jitter.gap_count == 1
+    np.testing.assert_allclose(jitter.longest_gap, 0.008, atol=1e-6)
+    assert jitter.histogram.sum() == 99
@@ -0,0 +1,71 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.mock_rws import MockRWSServer
+
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+def _movel_program(n, first_cmd_num=1):
+    # Only commands executed with triggers, such as MoveL and WaitTime, update the logged command number
+    mp = abb.MotionProgram(first_cmd_num=first_cmd_num)
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, abb.v1000, abb.z10)
+    return mp
+
+def test_log_segments():
+    with MockRWSServer(time_scale=0) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        mp = _movel_program(4)
+        mp.WaitTime(0.1)
+        log = client.execute_motion_program(mp)
+    segments = log.segments
+    assert segments is log.segments
+    assert list(segments.cmd_num) == [1,2,3,4,5]
+    assert list(segments.program) == [0]*5
+    for i in range(len(segments)):
+        rows = segments.rows(i)
+        assert np.all(log.cmd_num[rows] == segments.cmd_num[i])
+        np.testing.assert_array_equal(segments.entry_joints[i], log.joints[rows.start])
+    assert segments.find(3) == 2
+    assert segments.find(9) == -1
+    np.testing.assert_allclose(segments.duration[4], 0.1, atol=0.02)
+
+def _log(cmd_num):
+    data = np.zeros((len(cmd_num), 8), dtype=np.float32)
+    data[:,0] = np.arange(len(cmd_num))*0.004
+    data[:,1] = cmd_num
+    data[:,2] = np.arange(len(cmd_num))
+    return abb.MotionProgramResultLog("2024-01-01-00-00-00-0000", ["timestamp", "cmdnum", "J1", "J2", "J3", "J4",
+        "J5", "J6"], data)
+
+def test_log_segments_programs():
+    # A driver starts the next program from command number 1. A preempt continues the numbering and is not a new
+    # program.
+    log = _log([-1,1,1,2,2,2,3,-1,-1,1,1,4,4])
+    segments = abb.MotionProgramLogSegments(log)
+    assert list(segments.cmd_num) == [1,2,3,1,4]
+    assert list(segments.program) == [0,0,0,1,1]
+    assert segments.find(1) == 3
+    assert segments.find(1, program=0) == 0
+    assert list(segments.start) == [1,3,6,9,11]
+    assert list(segments.stop) == [3,6,7,11,13]
+    # Measured to the first sample after the segment, and the last segment to its own last sample
+    np.testing.assert_allclose(segments.duration, np.array([2,3,1,2,1])*0.004, atol=1e-6)
+    np.testing.assert_array_equal(segments.exit_joints[:,0], [2,5,6,10,12])
@@ -0,0 +1,81 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import numpy as np
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.mock_rws import MockRWSServer
+
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+def _egm_movel_program(n):
+    # EGMRunJoint keeps the program running in its first command until stop_egm() is called
+    mp = abb.MotionProgram()
+    mp.EGMRunJoint(10, 0.05, 0.05)
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, abb.v1000, abb.z10)
+    return mp
+
+def _logged_cmd_nums(log):
+    return set(log.cmd_num[log.cmd_num >= 0].astype(int).tolist())
+
+def _wait_queued_cmd_num(client, cmd_num):
+    # The program reads the commands ahead of the motion. Wait until the mock controller has read cmd_num.
+    for _ in range(1000):
+        if client.abb_client.get_analog_io("motion_program_queued_cmd_num") >= cmd_num:
+            return
+        time.sleep(0.01)
+    assert False, "Motion program did not start"
+
+def test_log_tail():
+    with MockRWSServer(time_scale=1) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        prev_seqnum = client.execute_motion_program(_egm_movel_program(6), wait=False)
+        tail = abb.MotionProgramLogTail(client, prev_seqnum, poll_period=0.05, buffer_rows=50)
+        it = iter(tail)
+        # The program is held in EGMRunJoint, so the first block is read while the program is running
+        blocks = [next(it).data]
+        _wait_queued_cmd_num(client, 1)
+        assert client.is_motion_program_running()
+        client.stop_egm()
+        blocks.extend(rows.data for rows in it)
+        assert len(blocks) > 1
+        data = np.concatenate(blocks)
+        assert tail.row_count == len(data) == len(tail.result_log.data)
+        np.testing.assert_array_equal(data, tail.result_log.data)
+        np.testing.assert_array_equal(tail.latest.data, tail.result_log.data[-50:])
+        assert _logged_cmd_nums(tail.result_log) == set(range(2,8))
+        assert not any(tail.log_filename in f for f in server.controller.files)
+
+def test_log_tail_without_rws_session(monkeypatch):
+    # Without the private RWS session, the tail reads the whole file and the status reads each signal
+    from abb_motion_program_exec import rws_session, abb_motion_program_exec_client
+    monkeypatch.setattr(rws_session, "_get_rws_session", lambda abb_client: None)
+    monkeypatch.setattr(abb_motion_program_exec_client, "_get_rws_session", lambda abb_client: None)
+    with MockRWSServer(time_scale=1) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        prev_seqnum = client.execute_motion_program(_egm_movel_program(4), wait=False)
+        tail = abb.MotionProgramLogTail(client, prev_seqnum, poll_period=0.05)
+        _wait_queued_cmd_num(client, 1)
+        status = client.get_motion_program_status()
+        assert status.executing
+        assert status.queued_cmd_num >= 1
+        client.stop_egm()
+        data = np.concatenate([rows.data for rows in tail])
+        np.testing.assert_array_equal(data, tail.result_log.data)
+        assert _logged_cmd_nums(tail.result_log) == set(range(2,6))
@@ -0,0 +1,101 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import numpy as np
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.mock_rws import MockRWSServer
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+def _movel_program(n, first_cmd_num=1):
+    # Only commands executed with triggers, such as MoveL and WaitTime, update the logged command number
+    mp = abb.MotionProgram(first_cmd_num=first_cmd_num)
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, abb.v1000, abb.z10)
+    return mp
+
+def _egm_movel_program(n):
+    # EGMRunJoint keeps the program running in its first command until stop_egm() is called
+    mp = abb.MotionProgram()
+    mp.EGMRunJoint(10, 0.05, 0.05)
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, abb.v1000, abb.z10)
+    return mp
+
+def _logged_cmd_nums(log):
+    return set(log.cmd_num[log.cmd_num >= 0].astype(int).tolist())
+
+def _wait_queued_cmd_num(client, cmd_num):
+    # The program reads the commands ahead of the motion. Wait until the mock controller has read cmd_num.
+    for _ in range(1000):
+        if client.abb_client.get_analog_io("motion_program_queued_cmd_num") >= cmd_num:
+            return
+        time.sleep(0.01)
+    assert False, "Motion program did not start"
+
+def test_execute_motion_program():
+    with MockRWSServer(time_scale=0) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        mp = abb.MotionProgram()
+        mp.MoveAbsJ(j1, abb.v1000, abb.fine)
+        mp.MoveL(r1, abb.v1000, abb.z10)
+        mp.MoveL(r2, abb.v1000, abb.fine)
+        mp.WaitTime(0.1)
+        log = client.execute_motion_program(mp)
+        assert log.column_headers == ["timestamp", "cmdnum", "J1", "J2", "J3", "J4", "J5", "J6"]
+        assert np.all(np.diff(log.time) > 0)
+        np.testing.assert_allclose(log.joints[-1], j1.robax, atol=1e-3)
+        assert _logged_cmd_nums(log) == {2,3,4}
+        assert not any("log-" in f for f in server.controller.files)
+
+def test_preempt_motion_program():
+    with MockRWSServer(time_scale=1) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        mp = _egm_movel_program(9)
+        mp_p = abb.MotionProgram(first_cmd_num=7)
+        mp_p.MoveL(r1, abb.v1000, abb.fine)
+        mp_p.WaitTime(0.05)
+
+        prev_seqnum = client.execute_motion_program(mp, wait=False)
+        _wait_queued_cmd_num(client, 1)
+        client.preempt_motion_program(mp_p, preempt_number=1, preempt_cmdnum=6)
+        client.stop_egm()
+        client.wait_motion_program_complete()
+        log = client.read_motion_program_result_log(prev_seqnum)
+        assert client.get_current_preempt_number() == 1
+        assert _logged_cmd_nums(log) == set(range(2,9))
+
+def test_prefetch_and_commit_preempt():
+    with MockRWSServer(time_scale=1) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        mp = _egm_movel_program(9)
+        candidates = [_movel_program(1, first_cmd_num=7), _movel_program(3, first_cmd_num=7)]
+
+        prev_seqnum = client.execute_motion_program(mp, wait=False)
+        _wait_queued_cmd_num(client, 1)
+        prefetched = client.prefetch_preempt_motion_programs(candidates, preempt_number=1)
+        assert prefetched.preempt_numbers == [1,2]
+        client.commit_preempt_motion_program(prefetched, 1, 6)
+        client.stop_egm()
+        client.wait_motion_program_complete()
+        log = client.read_motion_program_result_log(prev_seqnum)
+        assert client.get_current_preempt_number() == 2
+        assert _logged_cmd_nums(log) == set(range(2,10))
+        assert not any(prefetched.filenames[0] in f for f in server.controller.files)
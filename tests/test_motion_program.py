@@ -0,0 +1,125 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.commands.egm_commands import egm_minmax, egmframetype, EGMStreamConfig, \
+    EGMJointTargetConfig, EGMPoseTargetConfig, EGMPathCorrectionConfig
+
+j1 = abb.jointtarget([10,20,30,40,50,60],[0]*6)
+j2 = abb.jointtarget([-10,15,35,10,95,-95],[0]*6)
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+_mm = egm_minmax(-0.1,0.1)
+_egm_configs = [
+    None,
+    EGMStreamConfig(),
+    EGMJointTargetConfig(_mm, _mm, _mm, _mm, _mm, _mm, 1000., 1000.),
+    EGMPoseTargetConfig(abb.pose([0,0,0],[1,0,0,0]), egmframetype.EGM_FRAME_WOBJ, abb.pose([1,2,3],[1,0,0,0]),
+        egmframetype.EGM_FRAME_WOBJ, _mm, _mm, _mm, _mm, _mm, _mm, 1000., 1000.),
+    EGMPathCorrectionConfig(abb.pose([0,0,0],[1,0,0,0]))
+]
+
+def _append_all_commands(mp, n, start=0):
+    for i in range(start, start + n):
+        mp.MoveAbsJ(j1 if i%2 else j2, abb.v1000, abb.z10)
+        mp.MoveJ(r1, abb.v500, abb.fine)
+        mp.MoveL(r2, abb.v50, abb.z200)
+        mp.MoveC(r1, r2, abb.v50, abb.z1)
+        mp.WaitTime(0.1*i)
+        mp.CirPathMode(abb.CirPathModeSwitch(1+i%6))
+        mp.SyncMoveOn()
+        mp.SyncMoveOff()
+        mp.EGMRunJoint(10, 0.05, 0.05)
+        mp.EGMRunPose(10, 0.05, 0.05, abb.pose([0,0,0],[1,0,0,0]))
+        mp.EGMMoveL(r1, abb.v50, abb.fine)
+        mp.EGMMoveC(r1, r2, abb.v50, abb.fine)
+
+def _program(speed):
+    mp = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    mp.MoveL(r1, abb.v1000, abb.z10)
+    mp.MoveL(r2, speed, abb.fine)
+    return mp
+
+def test_shared_command_modified():
+    mp1 = _program(abb.v1000)
+    cmd = mp1._commands._commands[1]
+    mp2 = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    mp2.WaitTime(0.1)
+    mp2._append_command(cmd)
+    b1 = mp1.get_program_bytes()
+    b2 = mp2.get_program_bytes()
+
+    # The command is held by both programs, so modifying it must invalidate the cache of both
+    cmd.speed = abb.v50
+    assert mp1.get_program_bytes() != b1
+    assert mp1.get_program_bytes() == _program(abb.v50).get_program_bytes()
+    ref2 = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    ref2.WaitTime(0.1)
+    ref2.MoveL(r2, abb.v50, abb.fine)
+    assert mp2.get_program_bytes() != b2
+    assert mp2.get_program_bytes() == ref2.get_program_bytes()
+
+@pytest.mark.parametrize("egm_config", _egm_configs)
+@pytest.mark.parametrize("use_batch", [False, True])
+def test_program_round_trip(egm_config, use_batch):
+    mp = abb.MotionProgram(first_cmd_num=3, egm_config=egm_config, seqno=5)
+    _append_all_commands(mp, 4)
+    b = mp.get_program_bytes()
+    mp2 = abb.MotionProgram.from_bytes(b, use_batch=use_batch)
+    assert mp2.first_cmd_num == 3
+    assert mp2.get_seqno() == 5
+    assert mp2.get_program_bytes() == b
+
+def test_program_cache_matches_full_encode():
+    mp = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    for i in range(3):
+        _append_all_commands(mp, 2, 2*i)
+        b = mp.get_program_bytes()
+    ref = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    _append_all_commands(ref, 6)
+    assert b == ref.get_program_bytes()
+    assert mp.get_program_bytes(seqno=7) == ref.get_program_bytes(seqno=7)
+
+def test_batch_resize_and_renumber():
+    robax = np.array([[i,2*i,3*i,0,10,0] for i in range(5)], dtype=np.float64)
+    mp = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    batch = mp.MoveAbsJ_batch(robax[:3], None, abb.v1000, abb.z10)
+    mp.WaitTime(0.5)
+    mp.get_program_bytes()
+
+    # Grow the batch and renumber the program after it has been encoded
+    batch.robax = robax
+    assert len(batch) == 5
+    mp.first_cmd_num = 10
+
+    ref = abb.MotionProgram(first_cmd_num=10, timestamp="2024-01-01-00-00-00-0000")
+    for r in robax:
+        ref.MoveAbsJ(abb.jointtarget(r,[0]*6), abb.v1000, abb.z10)
+    ref.WaitTime(0.5)
+    assert mp.get_program_bytes() == ref.get_program_bytes()
+
+    # Modify a batch array in place
+    robax[1,0] = 45
+    mp.invalidate_program_cache()
+    ref = abb.MotionProgram(first_cmd_num=10, timestamp="2024-01-01-00-00-00-0000")
+    for r in robax:
+        ref.MoveAbsJ(abb.jointtarget(r,[0]*6), abb.v1000, abb.z10)
+    ref.WaitTime(0.5)
+    assert mp.get_program_bytes() == ref.get_program_bytes()
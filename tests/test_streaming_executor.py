@@ -0,0 +1,43 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import abb_motion_program_exec as abb
+from abb_motion_program_exec.streaming_executor import _iter_stream_windows
+
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+def _movel_program(n, speed=abb.v1000):
+    mp = abb.MotionProgram(timestamp="2024-01-01-00-00-00-0000")
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, speed, abb.z10)
+    return mp
+
+def test_stream_windows_keep_program_cache():
+    mp = _movel_program(5)
+    mp.get_program_bytes()
+    windows = list(_iter_stream_windows(mp, 2, None, None, None))
+    assert [w.first_cmd_num for w in windows] == [1,3,5]
+    assert b"".join(bytes(w._commands.get_commands_bytes(w.first_cmd_num)) for w in windows) \
+        == bytes(mp._commands.get_commands_bytes(1))
+
+    # The windows do not take ownership of the commands, and modifying a command after streaming must still
+    # invalidate the cache of the original program
+    for cmd in mp._commands:
+        assert len(cmd._command_owners) == 1
+        cmd.speed = abb.v50
+    assert mp.get_program_bytes() == _movel_program(5, abb.v50).get_program_bytes()
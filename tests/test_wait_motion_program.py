@@ -0,0 +1,128 @@
+# Copyright 2022 Wason Technology, LLC
+#                     Rensselaer Polytechnic Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+import abb_motion_program_exec as abb
+from abb_motion_program_exec import abb_motion_program_exec_client
+from abb_motion_program_exec.abb_motion_program_exec_client_aio import MotionProgramExecClientAIO
+from abb_motion_program_exec.mock_rws import MockRWSServer
+
+r1 = abb.robtarget([350., -100., 600.], [ 0.0868241, -0.0868241, 0.9924039, 0.0075961 ], abb.confdata(-1,0,-1,0),
+    [0]*6)
+r2 = abb.robtarget([370., 120., 620. ], [ 0.0868241, 0.0868241, 0.9924039, -0.0075961], abb.confdata(0,-1,0,0),
+    [0]*6)
+
+def _movel_program(n):
+    mp = abb.MotionProgram()
+    for i in range(n):
+        mp.MoveL(r1 if i%2 else r2, abb.v1000, abb.z10)
+    return mp
+
+def _logged_cmd_nums(log):
+    return set(log.cmd_num[log.cmd_num >= 0].astype(int).tolist())
+
+class _ControllerExecutionStateSubscription:
+    # Stand-in for the RWS subscription, publishing the execution state changes of the mock controller
+    def __init__(self, controller):
+        self.changed = threading.Event()
+        self.failed = False
+        self.event_count = 0
+        self.closed = False
+        self._controller = controller
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        state = None
+        while not self.closed:
+            new_state = self._controller.ctrlexecstate
+            if new_state != state:
+                state = new_state
+                self.event_count += 1
+                self.changed.set()
+            time.sleep(0.001)
+
+    def close(self):
+        self.closed = True
+
+def test_wait_subscription_unavailable():
+    # The mock controller does not support RWS subscriptions, so the wait falls back to adaptive polling
+    with MockRWSServer(time_scale=0) as server:
+        client = abb.MotionProgramExecClient(base_url=server.base_url, use_subscription_wait=True)
+        for _ in range(2):
+            prev_seqnum = client.execute_motion_program(_movel_program(4), wait=False)
+            client.wait_motion_program_complete()
+            assert client._exec_state_sub is None
+            assert client._exec_state_sub_unavailable
+            assert not client.is_motion_program_running()
+            assert _logged_cmd_nums(client.read_motion_program_result_log(prev_seqnum)) == {1,2,3,4}
+
+def test_wait_subscription(monkeypatch):
+    with MockRWSServer(time_scale=0) as server:
+        subs = []
+        def _subscribe(abb_client):
+            subs.append(_ControllerExecutionStateSubscription(server.controller))
+            return subs[-1]
+        monkeypatch.setattr(abb_motion_program_exec_client, "_ExecutionStateSubscription", _subscribe)
+        client = abb.MotionProgramExecClient(base_url=server.base_url)
+        for _ in range(2):
+            prev_seqnum = client.execute_motion_program(_movel_program(4), wait=False)
+            client.wait_motion_program_complete(use_subscription=True)
+            assert not client.is_motion_program_running()
+            assert _logged_cmd_nums(client.read_motion_program_result_log(prev_seqnum)) == {1,2,3,4}
+        # The subscription is kept open for later calls
+        assert len(subs) == 1
+        assert client._exec_state_sub is subs[0]
+        assert subs[0].event_count > 0
+        client._close_execution_state_subscription()
+        assert subs[0].closed
+
+def test_wait_subscription_unavailable_aio():
+    async def _run(base_url):
+        client = MotionProgramExecClientAIO(base_url=base_url, use_subscription_wait=True)
+        # EGMRunJoint keeps the program running until stop_egm() is called
+        mp = abb.MotionProgram()
+        mp.EGMRunJoint(10, 0.05, 0.05)
+        mp.MoveL(r1, abb.v1000, abb.fine)
+        prev_seqnum = await client.execute_motion_program(mp, wait=False)
+        wait_task = asyncio.ensure_future(client.wait_motion_program_complete())
+        while await client.abb_client_aio.get_analog_io("motion_program_queued_cmd_num") < 1:
+            await asyncio.sleep(0.01)
+        # The subscription fails in the background, and the wait continues with adaptive polling
+        while not client._exec_state_sub_unavailable:
+            await asyncio.sleep(0.01)
+        assert not wait_task.done()
+        await client.stop_egm()
+        await wait_task
+        assert client._exec_state_sub is None
+        assert not await client.is_motion_program_running()
+        log = await client.read_motion_program_result_log(prev_seqnum)
+        assert _logged_cmd_nums(log) == {2}
+
+        # Later calls do not try to subscribe again
+        prev_seqnum = await client.execute_motion_program(_movel_program(4), wait=False)
+        await client.wait_motion_program_complete()
+        assert client._exec_state_sub is None
+        log = await client.read_motion_program_result_log(prev_seqnum)
+        assert _logged_cmd_nums(log) == {1,2,3,4}
+
+    with MockRWSServer(time_scale=1) as server:
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asyncio.wait_for(_run(server.base_url), 30))
+        finally:
+            loop.close()